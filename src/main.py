@@ -1,5 +1,6 @@
 import os
 import logging
+import click
 from datetime import timedelta, datetime
 from dotenv import load_dotenv
 from flask import Flask, jsonify, request
@@ -8,6 +9,7 @@ from flask_migrate import Migrate
 from flask_talisman import Talisman
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from sqlalchemy.orm import configure_mappers
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
@@ -46,8 +48,36 @@ class Config:
     RATE_LIMIT_STRATEGY = "fixed-window"
     # Add explicit configuration for CORS
     CORS_SUPPORTS_CREDENTIALS = True
-    CORS_EXPOSE_HEADERS = ["Content-Disposition"]
+    CORS_EXPOSE_HEADERS = ["Content-Disposition", "Content-Range", "Accept-Ranges", "ETag"]
     CORS_MAX_AGE = 600
+    # File storage
+    UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", os.path.join(os.getcwd(), "uploads"))
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+    MAX_RESUMABLE_UPLOAD_BYTES = int(os.getenv("MAX_RESUMABLE_UPLOAD_BYTES", str(8 * 1024 * 1024 * 1024)))
+    UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+    # Downloads: '' streams from Python, 'x-sendfile' (Apache/lighttpd) or
+    # 'x-accel-redirect' (nginx, internal location mapped to UPLOAD_FOLDER)
+    FILE_SERVE_MODE = os.getenv("FILE_SERVE_MODE", "").lower()
+    USE_X_SENDFILE = FILE_SERVE_MODE == "x-sendfile"
+    FILE_ACCEL_PREFIX = os.getenv("FILE_ACCEL_PREFIX", "/protected-uploads/")
+    # Blob storage: 'local' (UPLOAD_FOLDER) or 's3' (any S3-compatible endpoint)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+    S3_BUCKET = os.getenv("S3_BUCKET")
+    S3_PREFIX = os.getenv("S3_PREFIX", "")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+    S3_REGION = os.getenv("S3_REGION")
+    S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")
+    S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
+    S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+    S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024)))
+    S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "8"))
+    S3_PRESIGN_EXPIRES = int(os.getenv("S3_PRESIGN_EXPIRES", "300"))
+    STORAGE_REDIRECT_DOWNLOADS = os.getenv("STORAGE_REDIRECT_DOWNLOADS", "False").lower() == "true"
+    # Unreferenced blobs are kept this long before the collector removes them
+    BLOB_GC_GRACE_HOURS = int(os.getenv("BLOB_GC_GRACE_HOURS", "24"))
+    # Background text extraction / OCR
+    OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "eng")
+    JOB_TIMEOUT_MINUTES = int(os.getenv("JOB_TIMEOUT_MINUTES", "30"))
 
 
 def create_app():
@@ -110,12 +140,21 @@ def create_app():
     from src.models.user import User
     from src.models.organization import Organization, OrganizationType
     from src.models.agreement import Agreement, AgreementType
-    from src.models.ballot import BallotElection, BallotPosition, BallotCandidate, BallotResult
+    from src.models.ballot import BallotElection, BallotPosition, BallotCandidate, BallotResult, BallotStationReturn, BallotStationTally
     from src.models.training import TrainingWorkshop, TrainingType, WorkshopParticipant
     from src.models.compliance import ComplianceRequirement, ComplianceRecord, Inspection, NonComplianceIssue
     from src.models.document import Document, DocumentType
     from src.models.notification import Notification, UserNotification
     from src.models.region import Region, District
+    from src.models.membership import OrganizationMember, MembershipList, MembershipListEntry, MembershipListChange, MemberIdentityIndex, MembershipVettingHistory
+    from src.models.upload import UploadSession
+    from src.models.blob import StoredBlob
+    from src.models.job import ProcessingJob
+    from src.models.election import UnionElection, ExecutivePosition, ElectionNominee, NomineeVerification, ElectionResult, ElectionObserver, ElectionDocument
+
+    # Resolve every relationship now, so a broken mapping fails at startup
+    # instead of on the first query
+    configure_mappers()
 
     # Import and register blueprints
     from src.routes.auth import auth_bp
@@ -123,12 +162,16 @@ def create_app():
     from src.routes.organizations import organizations_bp
     from src.routes.agreements import agreements_bp
     from src.routes.ballots import ballots_bp
+    from src.routes.elections import elections_bp
     from src.routes.trainings_enhanced import trainings_enhanced_bp
     from src.routes.compliance import compliance_bp
     from src.routes.documents import documents_bp
     from src.routes.users_enhanced import users_enhanced_bp
     from src.routes.settings_enhanced import settings_enhanced_bp
     from src.routes.dashboard_extensions import dashboard_ext_bp
+    from src.routes.uploads import uploads_bp, expire_stale_upload_sessions
+    from src.routes.files import files_bp
+    from src.routes.jobs import jobs_bp
 
     blueprints = [
         (auth_bp, "/api/auth"),
@@ -137,9 +180,13 @@ def create_app():
         (organizations_bp, "/api/organizations"),
         (agreements_bp, "/api/agreements"),
         (ballots_bp, "/api/ballots"),
+        (elections_bp, "/api/union-elections"),
         (trainings_enhanced_bp, "/api/trainings"),
         (compliance_bp, "/api/compliance"),
         (documents_bp, "/api/documents"),
+        (uploads_bp, "/api/uploads"),
+        (files_bp, "/api/files"),
+        (jobs_bp, "/api/jobs"),
         (users_enhanced_bp, "/api/users"),
         (settings_enhanced_bp, "/api/settings")
     ]
@@ -247,6 +294,109 @@ def create_app():
             db.create_all()
         logger.info("Database tables created")
 
+    @app.cli.command("upgrade-schema")
+    def upgrade_schema_command():
+        """Add the columns, indexes and constraints create_all() skips on existing tables."""
+        from src.utils.schema import upgrade_schema
+        with app.app_context():
+            upgrade_schema(log=logger.info)
+
+    @app.cli.command("expire-uploads")
+    def expire_uploads():
+        """Expire stale resumable upload sessions and delete their partial files."""
+        with app.app_context():
+            expired = expire_stale_upload_sessions()
+        logger.info(f"Expired {expired} upload sessions")
+
+    @app.cli.command("migrate-blobs")
+    def migrate_blobs():
+        """Move files referenced by plain paths into the content-addressed blob store."""
+        from src.utils.blobs import migrate_legacy_files
+        with app.app_context():
+            migrated, removed = migrate_legacy_files(log=logger.warning)
+        logger.info(f"Migrated {migrated} files into the blob store, removed {removed} legacy copies")
+
+    @app.cli.command("run-workers")
+    @click.option("--processes", type=int, default=None, help="Worker processes (default: CPU count)")
+    @click.option("--batch-size", type=int, default=None, help="Jobs claimed per poll")
+    @click.option("--poll-interval", type=float, default=5.0, help="Seconds to wait when the queue is empty")
+    @click.option("--once", is_flag=True, help="Process one batch and exit")
+    def run_workers(processes, batch_size, poll_interval, once):
+        """Run background processing jobs (text extraction, OCR, previews) on a process pool."""
+        from src.utils.jobs import run_worker
+        with app.app_context():
+            run_worker(processes=processes, batch_size=batch_size, poll_interval=poll_interval, once=once, log=logger.info)
+
+    @app.cli.command("render-previews")
+    @click.option("--limit", type=int, default=None, help="Maximum number of blobs to queue")
+    def render_previews(limit):
+        """Queue thumbnail/preview rendering for stored files that have none yet."""
+        from src.utils.jobs import enqueue_missing_previews
+        with app.app_context():
+            queued = enqueue_missing_previews(limit=limit)
+        logger.info(f"Queued preview rendering for {queued} files")
+
+    @app.cli.command("collect-garbage")
+    @click.option("--grace-hours", type=int, default=None, help="Minimum hours unreferenced (default: BLOB_GC_GRACE_HOURS)")
+    @click.option("--batch-size", type=int, default=500, help="Blobs deleted per transaction")
+    @click.option("--dry-run", is_flag=True, help="Report what would be deleted without deleting")
+    def collect_garbage(grace_hours, batch_size, dry_run):
+        """Delete stored files that nothing has referenced for the grace period."""
+        from src.utils.blob_gc import collect_garbage as collect
+        with app.app_context():
+            grace_hours = app.config["BLOB_GC_GRACE_HOURS"] if grace_hours is None else grace_hours
+            collect(grace_hours=grace_hours, batch_size=batch_size, dry_run=dry_run, log=logger.info)
+
+    @app.cli.command("reconcile-storage")
+    @click.option("--fix", is_flag=True, help="Correct reference counts that drifted")
+    @click.option("--delete-orphans", is_flag=True, help="Delete files older than the grace period that no row references")
+    def reconcile_storage(fix, delete_orphans):
+        """Find files with no row and rows with no file."""
+        from src.utils.blob_gc import reconcile_storage as reconcile
+        with app.app_context():
+            report = reconcile(
+                fix=fix,
+                delete_orphans=delete_orphans,
+                grace_hours=app.config["BLOB_GC_GRACE_HOURS"],
+                log=logger.warning
+            )
+        logger.info(
+            f"{report['driftedCounts']} drifted counts, {len(report['missingContent'])} blobs without content, "
+            f"{len(report['missingLegacyFiles'])} missing legacy files, {report['orphanedObjects']} orphaned objects, "
+            f"{report['staleLocalFiles']} stale local files"
+        )
+
+    @app.cli.command("rebuild-member-index")
+    def rebuild_member_index():
+        """Rebuild the cross-organization member identity index from the latest membership lists."""
+        from src.utils.member_index import rebuild_member_index as rebuild
+        with app.app_context():
+            rebuild(log=logger.info)
+
+    @app.cli.command("sync-member-register")
+    def sync_member_register():
+        """Update each organization's member register from its latest imported membership list."""
+        from src.utils.member_register import rebuild_member_register
+        with app.app_context():
+            rebuild_member_register(log=logger.info)
+
+    @app.cli.command("import-organizations")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--dry-run", is_flag=True, help="Validate and report without writing")
+    @click.option("--chunk-size", type=int, default=1000, help="Rows upserted per transaction")
+    def import_organizations_command(path, dry_run, chunk_size):
+        """Create or update organizations from a CSV/XLSX file, keyed by registration number."""
+        from src.utils.organization_import import import_organizations
+        with app.app_context():
+            report = import_organizations(path, dry_run=dry_run, chunk_size=chunk_size, log=logger.info)
+        for error in report["errors"]:
+            logger.warning(f"Row {error['row']}: {error['message']}")
+        logger.info(
+            f"{'Would create' if dry_run else 'Created'} {report['created']}, "
+            f"{'would update' if dry_run else 'updated'} {report['updated']}, "
+            f"{report['errorCount']} rows with errors out of {report['rows']}"
+        )
+
     return app
 
 
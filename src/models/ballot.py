@@ -16,6 +16,7 @@ class BallotElection(db.Model):
     supervisor_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'))
     location = db.Column(db.String(255))
     notes = db.Column(db.Text)
+    certified_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -36,6 +37,7 @@ class BallotElection(db.Model):
             'location': self.location,
             'notes': self.notes,
             'positions': [p.to_dict() for p in self.positions],
+            'certifiedAt': self.certified_at.isoformat() if self.certified_at else None,
             'createdAt': self.created_at.isoformat(),
             'updatedAt': self.updated_at.isoformat()
         }
@@ -87,6 +89,9 @@ class BallotCandidate(db.Model):
 
 class BallotResult(db.Model):
     __tablename__ = 'ballot_results'
+    __table_args__ = (
+        db.UniqueConstraint('election_id', 'position_id', 'candidate_id', name='uq_ballot_results_election_position_candidate'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     election_id = db.Column(UUID(as_uuid=True), db.ForeignKey('ballot_elections.id'), nullable=False)
@@ -106,3 +111,64 @@ class BallotResult(db.Model):
             'votesReceived': self.votes_received,
             'isElected': self.is_elected
         }
+
+class BallotStationReturn(db.Model):
+    __tablename__ = 'ballot_station_returns'
+    __table_args__ = (
+        db.UniqueConstraint('election_id', 'station_code', name='uq_ballot_station_returns_election_station'),
+    )
+    
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    election_id = db.Column(UUID(as_uuid=True), db.ForeignKey('ballot_elections.id'), nullable=False)
+    station_code = db.Column(db.String(50), nullable=False)
+    sheet_checksum = db.Column(db.String(64), nullable=False)
+    ballots_cast = db.Column(db.Integer)
+    registered_voters = db.Column(db.Integer)
+    total_votes = db.Column(db.Integer, nullable=False, default=0)
+    line_count = db.Column(db.Integer, nullable=False, default=0)
+    source = db.Column(db.String(20), nullable=False)  # 'api', 'csv'
+    submitted_by = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    election = db.relationship('BallotElection', backref='station_returns')
+    submitter = db.relationship('User')
+    tallies = db.relationship('BallotStationTally', backref='station_return', lazy='dynamic', cascade='all, delete-orphan')
+    
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'stationCode': self.station_code,
+            'sheetChecksum': self.sheet_checksum,
+            'ballotsCast': self.ballots_cast,
+            'registeredVoters': self.registered_voters,
+            'totalVotes': self.total_votes,
+            'lineCount': self.line_count,
+            'source': self.source,
+            'submittedBy': str(self.submitted_by) if self.submitted_by else None,
+            'createdAt': self.created_at.isoformat(),
+            'updatedAt': self.updated_at.isoformat()
+        }
+
+class BallotStationTally(db.Model):
+    __tablename__ = 'ballot_station_tallies'
+    __table_args__ = (
+        db.UniqueConstraint('station_return_id', 'candidate_id', name='uq_ballot_station_tallies_return_candidate'),
+    )
+    
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    station_return_id = db.Column(UUID(as_uuid=True), db.ForeignKey('ballot_station_returns.id', ondelete='CASCADE'), nullable=False)
+    election_id = db.Column(UUID(as_uuid=True), db.ForeignKey('ballot_elections.id'), nullable=False)
+    position_id = db.Column(UUID(as_uuid=True), db.ForeignKey('ballot_positions.id'), nullable=False)
+    candidate_id = db.Column(UUID(as_uuid=True), db.ForeignKey('ballot_candidates.id'), nullable=False)
+    votes = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'positionId': str(self.position_id),
+            'candidateId': str(self.candidate_id),
+            'votes': self.votes
+        }
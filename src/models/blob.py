@@ -0,0 +1,27 @@
+#from src.main import db
+from src.extensions import db
+from datetime import datetime
+
+class StoredBlob(db.Model):
+    __tablename__ = 'stored_blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    mime_type = db.Column(db.String(100))
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    unreferenced_since = db.Column(db.DateTime, index=True)
+    # Rendered derivatives by kind ('thumbnail', 'preview'): key, mimeType, size
+    derivatives = db.Column(db.JSON)
+    derivatives_rendered_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'size': self.size,
+            'mimeType': self.mime_type,
+            'refCount': self.ref_count,
+            'unreferencedSince': self.unreferenced_since.isoformat() if self.unreferenced_since else None,
+            'derivatives': sorted(self.derivatives) if self.derivatives else [],
+            'createdAt': self.created_at.isoformat()
+        }
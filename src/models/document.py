@@ -2,7 +2,7 @@
 from src.extensions import db
 import uuid
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 
 class DocumentType(db.Model):
     __tablename__ = 'document_types'
@@ -22,6 +22,9 @@ class DocumentType(db.Model):
 
 class Document(db.Model):
     __tablename__ = 'documents'
+    __table_args__ = (
+        db.Index('ix_documents_search_vector', 'search_vector', postgresql_using='gin'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     document_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -32,12 +35,25 @@ class Document(db.Model):
     election_id = db.Column(UUID(as_uuid=True), db.ForeignKey('ballot_elections.id'))
     workshop_id = db.Column(UUID(as_uuid=True), db.ForeignKey('training_workshops.id'))
     file_path = db.Column(db.String(255), nullable=False)
-    file_size = db.Column(db.Integer)
+    file_size = db.Column(db.BigInteger)
     file_type = db.Column(db.String(50))
+    mime_type = db.Column(db.String(100))
+    sha256 = db.Column(db.String(64), index=True)
     upload_date = db.Column(db.Date, nullable=False)
     uploaded_by = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'))
     is_public = db.Column(db.Boolean, default=False)
     description = db.Column(db.Text)
+    # Filled in by the text-extraction worker; deferred so listings do not load it
+    content_text = db.deferred(db.Column(db.Text))
+    # Maintained by PostgreSQL, so extracted text is indexed as soon as the
+    # worker stores it. Content is capped to stay under the tsvector size limit
+    search_vector = db.deferred(db.Column(TSVECTOR, db.Computed(
+        "setweight(to_tsvector('simple', coalesce(document_number, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(document_name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+        "setweight(to_tsvector('english', left(coalesce(content_text, ''), 500000)), 'C')",
+        persisted=True
+    )))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -58,6 +74,8 @@ class Document(db.Model):
             'filePath': self.file_path,
             'fileSize': self.file_size,
             'fileType': self.file_type,
+            'mimeType': self.mime_type,
+            'sha256': self.sha256,
             'uploadDate': self.upload_date.isoformat() if self.upload_date else None,
             'uploadedBy': self.uploader.to_dict() if self.uploader else None,
             'isPublic': self.is_public,
@@ -1,6 +1,7 @@
 #from src.main import db
 from src.extensions import db
 import datetime
+from sqlalchemy.dialects.postgresql import UUID
 
 class ExecutivePosition(db.Model):
     __tablename__ = 'executive_positions'
@@ -26,27 +27,31 @@ class UnionElection(db.Model):
     __tablename__ = 'union_elections'
     
     id = db.Column(db.Integer, primary_key=True)
-    organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False)
-    election_date = db.Column(db.Date, nullable=False)
+    organization_id = db.Column(UUID(as_uuid=True), db.ForeignKey('organizations.id'), nullable=False, index=True)
+    election_date = db.Column(db.Date, nullable=False, index=True)
     status = db.Column(db.String(20), nullable=False)
     voter_turnout = db.Column(db.Numeric(5, 2))
     total_eligible_voters = db.Column(db.Integer)
     actual_voters = db.Column(db.Integer)
     quorum_met = db.Column(db.Boolean)
-    supervised_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    supervised_by = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'))
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
     # Relationships
     organization = db.relationship('Organization', backref='elections')
-    supervisor = db.relationship('User', backref='supervised_elections')
+    supervisor = db.relationship('User', backref='supervised_union_elections')
     nominees = db.relationship('ElectionNominee', backref='election', cascade='all, delete-orphan')
     
-    def to_dict(self, include_nominees=False):
+    def to_dict(self, include_nominees=False, positions_count=None, nominees_count=None):
+        # Listings pass pre-aggregated counts so the nominees are not loaded per row
+        if positions_count is None:
+            positions_count = len(set([n.position_id for n in self.nominees])) if self.nominees else 0
+        
         result = {
             'id': self.id,
-            'organization_id': self.organization_id,
+            'organization_id': str(self.organization_id) if self.organization_id else None,
             'unionName': self.organization.organization_name if self.organization else None,
             'registrationNumber': self.organization.registration_number if self.organization else None,
             'election_date': self.election_date.isoformat() if self.election_date else None,
@@ -55,14 +60,17 @@ class UnionElection(db.Model):
             'total_eligible_voters': self.total_eligible_voters,
             'actual_voters': self.actual_voters,
             'quorum_met': self.quorum_met,
-            'supervised_by': self.supervised_by,
-            'supervisor_name': self.supervisor.full_name if self.supervisor else None,
+            'supervised_by': str(self.supervised_by) if self.supervised_by else None,
+            'supervisor_name': f"{self.supervisor.first_name} {self.supervisor.last_name}" if self.supervisor else None,
             'notes': self.notes,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'positionsCount': len(set([n.position_id for n in self.nominees])) if self.nominees else 0
+            'positionsCount': positions_count
         }
         
+        if nominees_count is not None:
+            result['nomineesCount'] = nominees_count
+        
         if include_nominees:
             result['nominees'] = [nominee.to_dict() for nominee in self.nominees]
         
@@ -72,7 +80,7 @@ class ElectionNominee(db.Model):
     __tablename__ = 'election_nominees'
     
     id = db.Column(db.Integer, primary_key=True)
-    election_id = db.Column(db.Integer, db.ForeignKey('union_elections.id'), nullable=False)
+    election_id = db.Column(db.Integer, db.ForeignKey('union_elections.id'), nullable=False, index=True)
     position_id = db.Column(db.Integer, db.ForeignKey('executive_positions.id'), nullable=False)
     member_id = db.Column(db.Integer, db.ForeignKey('organization_members.id'), nullable=False)
     nomination_date = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -112,7 +120,7 @@ class NomineeVerification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nominee_id = db.Column(db.Integer, db.ForeignKey('election_nominees.id'), nullable=False)
     verification_step = db.Column(db.String(30), nullable=False)
-    verified_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    verified_by = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'))
     verification_date = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     status = db.Column(db.String(20), nullable=False)
     comments = db.Column(db.Text)
@@ -127,8 +135,8 @@ class NomineeVerification(db.Model):
             'id': self.id,
             'nominee_id': self.nominee_id,
             'verification_step': self.verification_step,
-            'verified_by': self.verified_by,
-            'verifier_name': self.verifier.full_name if self.verifier else None,
+            'verified_by': str(self.verified_by) if self.verified_by else None,
+            'verifier_name': f"{self.verifier.first_name} {self.verifier.last_name}" if self.verifier else None,
             'verification_date': self.verification_date.isoformat() if self.verification_date else None,
             'status': self.status,
             'comments': self.comments
@@ -196,7 +204,7 @@ class ElectionDocument(db.Model):
     document_type = db.Column(db.String(50), nullable=False)
     file_name = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(255), nullable=False)
-    uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    uploaded_by = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'))
     upload_date = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -213,8 +221,8 @@ class ElectionDocument(db.Model):
             'document_type': self.document_type,
             'file_name': self.file_name,
             'file_path': self.file_path,
-            'uploaded_by': self.uploaded_by,
-            'uploader_name': self.uploader.full_name if self.uploader else None,
+            'uploaded_by': str(self.uploaded_by) if self.uploaded_by else None,
+            'uploader_name': f"{self.uploader.first_name} {self.uploader.last_name}" if self.uploader else None,
             'upload_date': self.upload_date.isoformat() if self.upload_date else None,
             'notes': self.notes
         }
@@ -0,0 +1,46 @@
+#from src.main import db
+from src.extensions import db
+import uuid
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import UUID
+
+class ProcessingJob(db.Model):
+    __tablename__ = 'processing_jobs'
+    __table_args__ = (
+        db.Index('ix_processing_jobs_status_run_after', 'status', 'run_after'),
+        db.Index('ix_processing_jobs_target', 'target_type', 'target_id'),
+    )
+    
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_type = db.Column(db.String(30), nullable=False)  # 'extract_text', 'render_previews', 'import_members'
+    target_type = db.Column(db.String(30), nullable=False)  # 'document', 'constitution', 'membership_list', 'blob'
+    target_id = db.Column(db.String(64), nullable=False)  # record id, or SHA-256 for blobs
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'completed', 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'jobType': self.job_type,
+            'targetType': self.target_type,
+            'targetId': self.target_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'maxAttempts': self.max_attempts,
+            'runAfter': self.run_after.isoformat() if self.run_after else None,
+            'startedAt': self.started_at.isoformat() if self.started_at else None,
+            'finishedAt': self.finished_at.isoformat() if self.finished_at else None,
+            'result': self.result,
+            'error': self.error,
+            'createdAt': self.created_at.isoformat(),
+            'updatedAt': self.updated_at.isoformat()
+        }
@@ -0,0 +1,216 @@
+#from src.main import db
+from src.extensions import db
+import uuid
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import UUID
+
+class OrganizationMember(db.Model):
+    __tablename__ = 'organization_members'
+    __table_args__ = (
+        db.UniqueConstraint('organization_id', 'member_number', name='uq_organization_members_org_number'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    organization_id = db.Column(UUID(as_uuid=True), db.ForeignKey('organizations.id'), nullable=False, index=True)
+    member_number = db.Column(db.String(50))
+    first_name = db.Column(db.String(50), nullable=False)
+    last_name = db.Column(db.String(50), nullable=False)
+    national_id = db.Column(db.String(50), index=True)
+    date_of_birth = db.Column(db.Date)
+    gender = db.Column(db.String(10))
+    join_date = db.Column(db.Date)
+    status = db.Column(db.String(20), nullable=False, default='active')  # 'active', 'suspended', 'lapsed', 'resigned', 'expelled'
+    dues_paid_until = db.Column(db.Date)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    organization = db.relationship('Organization', backref=db.backref('members', lazy='dynamic'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'organizationId': str(self.organization_id),
+            'memberNumber': self.member_number,
+            'firstName': self.first_name,
+            'lastName': self.last_name,
+            'nationalId': self.national_id,
+            'dateOfBirth': self.date_of_birth.isoformat() if self.date_of_birth else None,
+            'gender': self.gender,
+            'joinDate': self.join_date.isoformat() if self.join_date else None,
+            'status': self.status,
+            'duesPaidUntil': self.dues_paid_until.isoformat() if self.dues_paid_until else None
+        }
+
+class MembershipList(db.Model):
+    __tablename__ = 'membership_lists'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    organization_id = db.Column(UUID(as_uuid=True), db.ForeignKey('organizations.id'), nullable=False, index=True)
+    submission_date = db.Column(db.Date, nullable=False)
+    submitted_by = db.Column(db.String(100))
+    member_count = db.Column(db.Integer, nullable=False)
+    declared_count = db.Column(db.Integer)  # as stated by the submitter
+    previous_count = db.Column(db.Integer)
+    change_percentage = db.Column(db.Numeric(7, 2))
+    status = db.Column(db.String(20), nullable=False)  # 'submitted', 'under_review', 'approved', 'rejected'
+    document_path = db.Column(db.String(255))
+    import_status = db.Column(db.String(20))  # 'pending', 'completed', 'failed'
+    import_error_count = db.Column(db.Integer)
+    # First MAX_IMPORT_ERRORS row errors: row, field, message
+    import_errors = db.deferred(db.Column(db.JSON))
+    imported_at = db.Column(db.DateTime)
+    # Counts by change type against the previous list, plus its id
+    diff_summary = db.Column(db.JSON)
+    # Members also listed by other organizations, by organization
+    overlap_summary = db.Column(db.JSON)
+    notes = db.Column(db.Text)
+    reviewed_by = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'))
+    review_date = db.Column(db.Date)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    organization = db.relationship('Organization', backref=db.backref('membership_lists', lazy='dynamic'))
+    reviewer = db.relationship('User')
+    vetting_history = db.relationship('MembershipVettingHistory', backref='membership_list', lazy='dynamic')
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'organizationId': str(self.organization_id),
+            'submissionDate': self.submission_date.isoformat() if self.submission_date else None,
+            'submittedBy': self.submitted_by,
+            'memberCount': self.member_count,
+            'declaredCount': self.declared_count,
+            'previousCount': self.previous_count,
+            'changePercentage': float(self.change_percentage) if self.change_percentage is not None else None,
+            'status': self.status,
+            'documentPath': self.document_path,
+            'importStatus': self.import_status,
+            'importErrorCount': self.import_error_count,
+            'importedAt': self.imported_at.isoformat() if self.imported_at else None,
+            'diffSummary': self.diff_summary,
+            'overlapSummary': self.overlap_summary,
+            'notes': self.notes,
+            'reviewedBy': str(self.reviewed_by) if self.reviewed_by else None,
+            'reviewDate': self.review_date.isoformat() if self.review_date else None,
+            'createdAt': self.created_at.isoformat(),
+            'updatedAt': self.updated_at.isoformat()
+        }
+
+class MembershipListEntry(db.Model):
+    __tablename__ = 'membership_list_entries'
+    __table_args__ = (
+        db.Index('ix_membership_list_entries_list_key', 'membership_list_id', 'member_key'),
+        db.Index('ix_membership_list_entries_list_name_key', 'membership_list_id', 'name_key'),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    membership_list_id = db.Column(UUID(as_uuid=True), db.ForeignKey('membership_lists.id', ondelete='CASCADE'), nullable=False)
+    row_number = db.Column(db.Integer, nullable=False)
+    # SHA-256 of the normalized identity (national ID, else name and date of birth)
+    member_key = db.Column(db.String(64), nullable=False)
+    # SHA-256 of the normalized name and date of birth; only set with a date of birth
+    name_key = db.Column(db.String(64))
+    member_number = db.Column(db.String(50))
+    first_name = db.Column(db.String(100), nullable=False)
+    last_name = db.Column(db.String(100), nullable=False)
+    national_id = db.Column(db.String(50))
+    date_of_birth = db.Column(db.Date)
+    gender = db.Column(db.String(10))
+    join_date = db.Column(db.Date)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'membershipListId': str(self.membership_list_id),
+            'rowNumber': self.row_number,
+            'memberKey': self.member_key,
+            'memberNumber': self.member_number,
+            'firstName': self.first_name,
+            'lastName': self.last_name,
+            'nationalId': self.national_id,
+            'dateOfBirth': self.date_of_birth.isoformat() if self.date_of_birth else None,
+            'gender': self.gender,
+            'joinDate': self.join_date.isoformat() if self.join_date else None
+        }
+
+class MembershipListChange(db.Model):
+    __tablename__ = 'membership_list_changes'
+    __table_args__ = (
+        db.Index('ix_membership_list_changes_list_type', 'membership_list_id', 'change_type'),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    membership_list_id = db.Column(UUID(as_uuid=True), db.ForeignKey('membership_lists.id', ondelete='CASCADE'), nullable=False)
+    change_type = db.Column(db.String(20), nullable=False)  # 'added', 'removed', 'changed', 'duplicate'
+    member_key = db.Column(db.String(64), nullable=False)
+    entry_id = db.Column(db.BigInteger, db.ForeignKey('membership_list_entries.id', ondelete='CASCADE'))
+    previous_entry_id = db.Column(db.BigInteger, db.ForeignKey('membership_list_entries.id', ondelete='CASCADE'))
+    duplicate_of_id = db.Column(db.BigInteger, db.ForeignKey('membership_list_entries.id', ondelete='CASCADE'))
+    changed_fields = db.Column(db.JSON)
+    match_reason = db.Column(db.String(20))  # duplicates: 'member_key', 'name_dob'
+
+    # Relationships
+    entry = db.relationship('MembershipListEntry', foreign_keys=[entry_id])
+    previous_entry = db.relationship('MembershipListEntry', foreign_keys=[previous_entry_id])
+    duplicate_of = db.relationship('MembershipListEntry', foreign_keys=[duplicate_of_id])
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'membershipListId': str(self.membership_list_id),
+            'changeType': self.change_type,
+            'memberKey': self.member_key,
+            'entry': self.entry.to_dict() if self.entry else None,
+            'previousEntry': self.previous_entry.to_dict() if self.previous_entry else None,
+            'duplicateOf': self.duplicate_of.to_dict() if self.duplicate_of else None,
+            'changedFields': self.changed_fields,
+            'matchReason': self.match_reason
+        }
+
+# Blocking index of who each organization currently lists: one row per
+# identifier per organization, from its latest imported list. Members of
+# several organizations share a block_key.
+class MemberIdentityIndex(db.Model):
+    __tablename__ = 'member_identity_index'
+    __table_args__ = (
+        db.UniqueConstraint('key_type', 'block_key', 'organization_id', name='uq_member_identity_index_key_org'),
+        db.Index('ix_member_identity_index_organization', 'organization_id'),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    key_type = db.Column(db.String(20), nullable=False)  # 'national_id', 'name_dob'
+    # member_key for national IDs, name_key for name and date of birth
+    block_key = db.Column(db.String(64), nullable=False)
+    organization_id = db.Column(UUID(as_uuid=True), db.ForeignKey('organizations.id', ondelete='CASCADE'), nullable=False)
+    membership_list_id = db.Column(UUID(as_uuid=True), db.ForeignKey('membership_lists.id', ondelete='CASCADE'), nullable=False)
+    entry_id = db.Column(db.BigInteger, db.ForeignKey('membership_list_entries.id', ondelete='CASCADE'), nullable=False)
+
+    # Relationships
+    organization = db.relationship('Organization')
+    entry = db.relationship('MembershipListEntry')
+
+class MembershipVettingHistory(db.Model):
+    __tablename__ = 'membership_vetting_history'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    membership_list_id = db.Column(UUID(as_uuid=True), db.ForeignKey('membership_lists.id'), nullable=False, index=True)
+    vetting_date = db.Column(db.Date, nullable=False)
+    vetted_by = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'))
+    status = db.Column(db.String(20), nullable=False)
+    issues_found = db.Column(db.Text)
+    resolution = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'membershipListId': str(self.membership_list_id),
+            'vettingDate': self.vetting_date.isoformat() if self.vetting_date else None,
+            'vettedBy': str(self.vetted_by) if self.vetted_by else None,
+            'status': self.status,
+            'issuesFound': self.issues_found,
+            'resolution': self.resolution
+        }
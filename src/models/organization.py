@@ -121,6 +121,7 @@ class OrganizationConstitution(db.Model):
     document_path = db.Column(db.String(255))
     status = db.Column(db.String(20), nullable=False)  # 'draft', 'pending', 'approved', 'rejected'
     notes = db.Column(db.Text)
+    ocr_content = db.deferred(db.Column(db.Text))  # filled in by the text-extraction worker
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -0,0 +1,37 @@
+#from src.main import db
+from src.extensions import db
+import uuid
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import UUID
+
+class UploadSession(db.Model):
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    target = db.Column(db.String(30), nullable=False)  # 'document', 'constitution', 'membership_list'
+    file_name = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received_size = db.Column(db.BigInteger, nullable=False, default=0)
+    temp_path = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='active')  # 'active', 'completed', 'cancelled', 'expired'
+    upload_metadata = db.Column(db.JSON, nullable=False, default=dict)
+    result_id = db.Column(db.String(36))
+    created_by = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'target': self.target,
+            'fileName': self.file_name,
+            'totalSize': self.total_size,
+            'offset': self.received_size,
+            'status': self.status,
+            'metadata': self.upload_metadata,
+            'resultId': self.result_id,
+            'expiresAt': self.expires_at.isoformat(),
+            'createdAt': self.created_at.isoformat(),
+            'updatedAt': self.updated_at.isoformat()
+        }
@@ -2,13 +2,65 @@ from flask import Blueprint, request, jsonify
 from functools import wraps
 import uuid
 from datetime import datetime
+from sqlalchemy.orm import aliased
 
 from src.extensions import db
 from src.models.agreement import Agreement, AgreementType, AgreementAmendment, Dispute, DisputeType
+from src.models.organization import Organization
 from src.routes.auth import token_required
+from src.utils.blobs import client_reference_error
+from src.utils.export import export_format_error, export_response
 
 agreements_bp = Blueprint('agreements', __name__)
 
+EXPORT_AGREEMENT_TYPE = aliased(AgreementType)
+EXPORT_DISPUTE_TYPE = aliased(DisputeType)
+EXPORT_AGREEMENT = aliased(Agreement)
+EXPORT_ORGANIZATION = aliased(Organization)
+EXPORT_COUNTERPARTY = aliased(Organization)
+
+AGREEMENT_EXPORT_COLUMNS = [
+    ('agreementNumber', Agreement.agreement_number),
+    ('agreementName', Agreement.agreement_name),
+    ('agreementType', EXPORT_AGREEMENT_TYPE.type_name),
+    ('primaryOrganizationRegistrationNumber', EXPORT_ORGANIZATION.registration_number),
+    ('primaryOrganization', EXPORT_ORGANIZATION.organization_name),
+    ('counterpartyName', Agreement.counterparty_name),
+    ('counterpartyOrganization', EXPORT_COUNTERPARTY.organization_name),
+    ('effectiveDate', Agreement.effective_date),
+    ('expiryDate', Agreement.expiry_date),
+    ('status', Agreement.status),
+    ('notes', Agreement.notes),
+    ('id', Agreement.id),
+]
+
+AGREEMENT_EXPORT_JOINS = [
+    (EXPORT_AGREEMENT_TYPE, EXPORT_AGREEMENT_TYPE.id == Agreement.agreement_type_id),
+    (EXPORT_ORGANIZATION, EXPORT_ORGANIZATION.id == Agreement.primary_organization_id),
+    (EXPORT_COUNTERPARTY, EXPORT_COUNTERPARTY.id == Agreement.counterparty_organization_id),
+]
+
+DISPUTE_EXPORT_COLUMNS = [
+    ('disputeNumber', Dispute.dispute_number),
+    ('disputeType', EXPORT_DISPUTE_TYPE.type_name),
+    ('agreementNumber', EXPORT_AGREEMENT.agreement_number),
+    ('organizationRegistrationNumber', EXPORT_ORGANIZATION.registration_number),
+    ('organization', EXPORT_ORGANIZATION.organization_name),
+    ('counterparty', EXPORT_COUNTERPARTY.organization_name),
+    ('filingDate', Dispute.filing_date),
+    ('resolutionDate', Dispute.resolution_date),
+    ('status', Dispute.status),
+    ('resolutionSummary', Dispute.resolution_summary),
+    ('id', Dispute.id),
+]
+
+DISPUTE_EXPORT_JOINS = [
+    (EXPORT_DISPUTE_TYPE, EXPORT_DISPUTE_TYPE.id == Dispute.dispute_type_id),
+    (EXPORT_AGREEMENT, EXPORT_AGREEMENT.id == Dispute.agreement_id),
+    (EXPORT_ORGANIZATION, EXPORT_ORGANIZATION.id == Dispute.organization_id),
+    (EXPORT_COUNTERPARTY, EXPORT_COUNTERPARTY.id == Dispute.counterparty_id),
+]
+
 # Get all agreements with pagination and filtering
 @agreements_bp.route('', methods=['GET'])
 @token_required
@@ -22,6 +74,14 @@ def get_agreements(current_user):
     organization_id = request.args.get('organization', None)
     expiring_before = request.args.get('expiringBefore', None)
     expiring_after = request.args.get('expiringAfter', None)
+    export_format = request.args.get('format', None)
+    
+    if export_format and export_format_error(export_format):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': export_format_error(export_format)
+        }), 400
     
     # Build query
     query = Agreement.query
@@ -67,6 +127,16 @@ def get_agreements(current_user):
                 'message': 'Invalid expiring after date format'
             }), 400
     
+    # Stream every matching row instead of a page
+    if export_format:
+        return export_response(
+            query.order_by(Agreement.agreement_name),
+            AGREEMENT_EXPORT_COLUMNS,
+            'agreements',
+            export_format,
+            joins=AGREEMENT_EXPORT_JOINS
+        )
+    
     # Paginate results
     paginated_agreements = query.order_by(Agreement.agreement_name).paginate(page=page, per_page=per_page)
     
@@ -160,6 +230,15 @@ def create_agreement(current_user):
                 'message': 'Invalid expiry date format'
             }), 400
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Create new agreement
     new_agreement = Agreement(
         id=uuid.uuid4(),
@@ -207,6 +286,15 @@ def update_agreement(current_user, agreement_id):
             'message': 'Agreement not found'
         }), 404
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user, agreement.document_path)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Check if agreement number already exists for another agreement
     if 'agreementNumber' in data and data['agreementNumber'] != agreement.agreement_number:
         existing_agreement = Agreement.query.filter_by(agreement_number=data['agreementNumber']).first()
@@ -391,6 +479,15 @@ def create_agreement_amendment(current_user, agreement_id):
             'message': 'Invalid amendment date format'
         }), 400
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Create new amendment
     new_amendment = AgreementAmendment(
         id=uuid.uuid4(),
@@ -432,6 +529,15 @@ def update_agreement_amendment(current_user, amendment_id):
             'message': 'Amendment not found'
         }), 404
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user, amendment.document_path)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Check if amendment number already exists for another amendment
     if 'amendmentNumber' in data and data['amendmentNumber'] != amendment.amendment_number:
         existing_amendment = AgreementAmendment.query.filter_by(
@@ -520,6 +626,14 @@ def get_disputes(current_user):
     organization_id = request.args.get('organization', None)
     date_from = request.args.get('dateFrom', None)
     date_to = request.args.get('dateTo', None)
+    export_format = request.args.get('format', None)
+    
+    if export_format and export_format_error(export_format):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': export_format_error(export_format)
+        }), 400
     
     # Build query
     query = Dispute.query
@@ -565,6 +679,16 @@ def get_disputes(current_user):
                 'message': 'Invalid date to format'
             }), 400
     
+    # Stream every matching row instead of a page
+    if export_format:
+        return export_response(
+            query.order_by(Dispute.filing_date.desc()),
+            DISPUTE_EXPORT_COLUMNS,
+            'disputes',
+            export_format,
+            joins=DISPUTE_EXPORT_JOINS
+        )
+    
     # Paginate results
     paginated_disputes = query.order_by(Dispute.filing_date.desc()).paginate(page=page, per_page=per_page)
     
@@ -651,6 +775,15 @@ def create_dispute(current_user):
                 'message': 'Invalid resolution date format'
             }), 400
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Create new dispute
     new_dispute = Dispute(
         id=uuid.uuid4(),
@@ -697,6 +830,15 @@ def update_dispute(current_user, dispute_id):
             'message': 'Dispute not found'
         }), 404
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user, dispute.document_path)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Check if dispute number already exists for another dispute
     if 'disputeNumber' in data and data['disputeNumber'] != dispute.dispute_number:
         existing_dispute = Dispute.query.filter_by(dispute_number=data['disputeNumber']).first()
@@ -1,11 +1,22 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from functools import wraps
 import uuid
+import csv
+import io
+import hashlib
 from datetime import datetime
+from sqlalchemy import func, select, update, insert, literal, and_
+from sqlalchemy.orm import joinedload, aliased
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from src.extensions import db
-from src.models.ballot import BallotElection, BallotPosition, BallotCandidate, BallotResult
+from src.models.ballot import BallotElection, BallotPosition, BallotCandidate, BallotResult, BallotStationReturn, BallotStationTally
+from src.models.organization import Organization, OrganizationOfficial
+from src.models.region import District
+from src.models.user import User, Role
 from src.routes.auth import token_required
+from src.utils.cache import response_cache
+from src.utils.tally import get_election_tally, refresh_election_tally, discard_election_tally, results_digest
 
 ballots_bp = Blueprint('ballots', __name__)
 
@@ -94,6 +105,142 @@ def get_ballot_election(current_user, election_id):
         'message': 'Ballot election retrieved successfully'
     }), 200
 
+ELECTION_TREE_CACHE = 'ballot_election_tree'
+
+# Get the full election tree (positions, candidates, results) in a fixed number of queries
+@ballots_bp.route('/elections/<election_id>/detail', methods=['GET'])
+@token_required
+def get_ballot_election_detail(current_user, election_id):
+    try:
+        election_uuid = uuid.UUID(election_id)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Ballot election not found'
+        }), 404
+    
+    fingerprint = _election_tree_fingerprint(election_uuid)
+    
+    if fingerprint is None:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Ballot election not found'
+        }), 404
+    
+    etag = hashlib.sha1(repr(fingerprint).encode('utf-8')).hexdigest()
+    
+    # Polling clients that already hold the current tree get a bodyless 304
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    cached = response_cache.get(ELECTION_TREE_CACHE, str(election_uuid))
+    if cached and cached[0] == etag:
+        tree = cached[1]
+    else:
+        tree = _load_election_tree(election_uuid)
+        response_cache.set(ELECTION_TREE_CACHE, str(election_uuid), (etag, tree), ttl=300)
+    
+    response = jsonify({
+        'success': True,
+        'data': tree,
+        'message': 'Ballot election retrieved successfully'
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response, 200
+
+def _election_tree_fingerprint(election_id):
+    # Counts catch deletes, max(updated_at) catches edits; one round trip
+    def child_stats(model, criterion):
+        return (
+            select(func.count(model.id)).where(criterion).scalar_subquery(),
+            select(func.max(model.updated_at)).where(criterion).scalar_subquery()
+        )
+    
+    position_stats = child_stats(BallotPosition, BallotPosition.election_id == election_id)
+    candidate_stats = child_stats(
+        BallotCandidate,
+        BallotCandidate.position_id.in_(select(BallotPosition.id).where(BallotPosition.election_id == election_id))
+    )
+    result_stats = child_stats(BallotResult, BallotResult.election_id == election_id)
+    return_stats = child_stats(BallotStationReturn, BallotStationReturn.election_id == election_id)
+    
+    # The digest covers votes and winner flags even when a bulk write leaves
+    # updated_at untouched
+    return db.session.query(
+        BallotElection.updated_at,
+        select(Organization.updated_at).where(Organization.id == BallotElection.organization_id).scalar_subquery(),
+        select(User.updated_at).where(User.id == BallotElection.supervisor_id).scalar_subquery(),
+        *position_stats,
+        *candidate_stats,
+        *result_stats,
+        results_digest(election_id),
+        *return_stats
+    ).filter(BallotElection.id == election_id).first()
+
+def _load_election_tree(election_id):
+    # 1-2: election with organization and supervisor (role permissions via selectin)
+    election = BallotElection.query.options(
+        joinedload(BallotElection.organization).joinedload(Organization.organization_type),
+        joinedload(BallotElection.organization).joinedload(Organization.district).joinedload(District.region),
+        joinedload(BallotElection.supervisor).joinedload(User.position),
+        joinedload(BallotElection.supervisor).joinedload(User.role).selectinload(Role.permissions)
+    ).filter(BallotElection.id == election_id).first()
+    
+    # 3-5: the tree below the election, one query per level
+    positions = BallotPosition.query.filter(
+        BallotPosition.election_id == election_id
+    ).order_by(BallotPosition.created_at).all()
+    
+    candidates = BallotCandidate.query.join(
+        BallotPosition, BallotPosition.id == BallotCandidate.position_id
+    ).filter(
+        BallotPosition.election_id == election_id
+    ).order_by(BallotCandidate.last_name, BallotCandidate.first_name).all()
+    
+    results = BallotResult.query.filter(
+        BallotResult.election_id == election_id
+    ).order_by(BallotResult.votes_received.desc()).all()
+    
+    candidates_by_position = {}
+    for candidate in candidates:
+        candidates_by_position.setdefault(candidate.position_id, []).append(candidate.to_dict())
+    
+    results_by_position = {}
+    for result in results:
+        results_by_position.setdefault(result.position_id, []).append(result.to_dict())
+    
+    # Same shape as BallotElection.to_dict without the per-position lazy queries
+    return {
+        'id': str(election.id),
+        'electionNumber': election.election_number,
+        'organization': election.organization.to_dict() if election.organization else None,
+        'electionDate': election.election_date.isoformat() if election.election_date else None,
+        'purpose': election.purpose,
+        'status': election.status,
+        'supervisor': election.supervisor.to_dict() if election.supervisor else None,
+        'location': election.location,
+        'notes': election.notes,
+        'positions': [
+            {
+                'id': str(position.id),
+                'positionName': position.position_name,
+                'description': position.description,
+                'candidates': candidates_by_position.get(position.id, []),
+                'results': results_by_position.get(position.id, [])
+            }
+            for position in positions
+        ],
+        'certifiedAt': election.certified_at.isoformat() if election.certified_at else None,
+        'createdAt': election.created_at.isoformat(),
+        'updatedAt': election.updated_at.isoformat()
+    }
+
 # Create ballot election
 @ballots_bp.route('/elections', methods=['POST'])
 @token_required
@@ -251,12 +398,422 @@ def delete_ballot_election(current_user, election_id):
     
     db.session.delete(election)
     db.session.commit()
+    discard_election_tally(election_id)
     
     return jsonify({
         'success': True,
         'message': 'Ballot election deleted successfully'
     }), 200
 
+# Copy positions (and optionally candidates) from a previous election of the same organization
+@ballots_bp.route('/elections/<election_id>/clone-structure', methods=['POST'])
+@token_required
+def clone_ballot_structure(current_user, election_id):
+    data = request.get_json(silent=True) or {}
+    
+    election = BallotElection.query.filter_by(id=election_id).first()
+    
+    if not election:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Ballot election not found'
+        }), 404
+    
+    if election.status in ('completed', 'cancelled'):
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': f'Cannot change the ballot of a {election.status} election'
+        }), 409
+    
+    if data.get('sourceElectionId'):
+        source = BallotElection.query.filter_by(id=data['sourceElectionId']).first()
+        if not source or source.organization_id != election.organization_id or source.id == election.id:
+            return jsonify({
+                'success': False,
+                'error': 'Bad request',
+                'message': 'Source election must be another election of the same organization'
+            }), 400
+        pairs = {election: source}
+    else:
+        pairs = _find_previous_elections([election])
+        if election not in pairs:
+            return jsonify({
+                'success': False,
+                'error': 'Not found',
+                'message': 'No previous election with positions found for this organization'
+            }), 404
+    
+    summary = _clone_ballot_structures(pairs, bool(data.get('includeCandidates', False)))
+    discard_election_tally(election.id)
+    
+    return jsonify({
+        'success': True,
+        'data': summary[0],
+        'message': 'Ballot structure cloned successfully'
+    }), 201
+
+# Clone ballot structures for many elections at once from each organization's previous election
+@ballots_bp.route('/elections/clone-structure', methods=['POST'])
+@token_required
+def clone_ballot_structures(current_user):
+    data = request.get_json()
+    
+    if not data or not data.get('electionIds'):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'electionIds is required'
+        }), 400
+    
+    elections = BallotElection.query.filter(
+        BallotElection.id.in_(data['electionIds']),
+        BallotElection.status.notin_(['completed', 'cancelled'])
+    ).all()
+    
+    pairs = _find_previous_elections(elections)
+    summary = _clone_ballot_structures(pairs, bool(data.get('includeCandidates', False)))
+    for election in pairs:
+        discard_election_tally(election.id)
+    
+    found_ids = {str(election.id) for election in elections}
+    cloned_ids = {str(election.id) for election in pairs}
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'cloned': summary,
+            'skipped': [
+                {
+                    'electionId': str(election_id),
+                    'reason': 'No previous election with positions' if str(election_id) in found_ids else 'Election not found or already closed'
+                }
+                for election_id in data['electionIds']
+                if str(election_id) not in cloned_ids
+            ]
+        },
+        'message': f'Ballot structure cloned for {len(summary)} elections'
+    }), 201
+
+def _find_previous_elections(elections):
+    if not elections:
+        return {}
+    
+    # Every earlier election of the same organizations that has a ballot, newest first
+    candidates = db.session.query(
+        BallotElection.id,
+        BallotElection.organization_id,
+        BallotElection.election_date
+    ).filter(
+        BallotElection.organization_id.in_({election.organization_id for election in elections}),
+        select(BallotPosition.id).where(BallotPosition.election_id == BallotElection.id).exists()
+    ).order_by(BallotElection.election_date.desc(), BallotElection.created_at.desc()).all()
+    
+    by_organization = {}
+    for row in candidates:
+        by_organization.setdefault(row.organization_id, []).append(row)
+    
+    sources = {}
+    for election in elections:
+        previous = next(
+            (row for row in by_organization.get(election.organization_id, [])
+             if row.id != election.id and row.election_date <= election.election_date),
+            None
+        )
+        if previous:
+            sources[election] = previous
+    return sources
+
+def _clone_ballot_structures(pairs, include_candidates):
+    source_ids = {source.id for source in pairs.values()}
+    target_ids = [target.id for target in pairs]
+    
+    source_positions = BallotPosition.query.filter(
+        BallotPosition.election_id.in_(source_ids)
+    ).order_by(BallotPosition.created_at).all()
+    
+    # Positions already on a target ballot are kept, which makes re-running safe
+    existing = {
+        (election_id, position_name.strip().lower())
+        for election_id, position_name in db.session.query(
+            BallotPosition.election_id,
+            BallotPosition.position_name
+        ).filter(BallotPosition.election_id.in_(target_ids)).all()
+    }
+    
+    candidates_by_position = {}
+    if include_candidates and source_positions:
+        for candidate in BallotCandidate.query.filter(
+            BallotCandidate.position_id.in_([position.id for position in source_positions])
+        ).all():
+            candidates_by_position.setdefault(candidate.position_id, []).append(candidate)
+    
+    positions_by_source = {}
+    for position in source_positions:
+        positions_by_source.setdefault(position.election_id, []).append(position)
+    
+    now = datetime.utcnow()
+    position_rows = []
+    candidate_rows = []
+    summary = []
+    
+    for target, source in pairs.items():
+        created_positions = 0
+        created_candidates = 0
+        
+        for position in positions_by_source.get(source.id, []):
+            if (target.id, position.position_name.strip().lower()) in existing:
+                continue
+            
+            new_position_id = uuid.uuid4()
+            position_rows.append({
+                'id': new_position_id,
+                'election_id': target.id,
+                'position_name': position.position_name,
+                'description': position.description,
+                'created_at': now,
+                'updated_at': now
+            })
+            created_positions += 1
+            
+            for candidate in candidates_by_position.get(position.id, []):
+                candidate_rows.append({
+                    'id': uuid.uuid4(),
+                    'position_id': new_position_id,
+                    'first_name': candidate.first_name,
+                    'last_name': candidate.last_name,
+                    'bio': candidate.bio,
+                    'created_at': now,
+                    'updated_at': now
+                })
+                created_candidates += 1
+        
+        summary.append({
+            'electionId': str(target.id),
+            'sourceElectionId': str(source.id),
+            'positionsCreated': created_positions,
+            'candidatesCreated': created_candidates
+        })
+    
+    if position_rows:
+        db.session.execute(BallotPosition.__table__.insert(), position_rows)
+    if candidate_rows:
+        db.session.execute(BallotCandidate.__table__.insert(), candidate_rows)
+    db.session.commit()
+    
+    return summary
+
+# Promote the elected candidates of a completed election into organization officials
+@ballots_bp.route('/elections/<election_id>/certify', methods=['POST'])
+@token_required
+def certify_ballot_election(current_user, election_id):
+    if not _can_certify(current_user):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to certify elections'
+        }), 403
+    
+    # Row lock so concurrent certifications of the same election serialise
+    election = BallotElection.query.filter_by(id=election_id).with_for_update().first()
+    
+    if not election:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Ballot election not found'
+        }), 404
+    
+    if election.status != 'completed':
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': 'Only completed elections can be certified'
+        }), 409
+    
+    if election.certified_at:
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': 'Election is already certified'
+        }), 409
+    
+    if BallotElection.query.filter(_superseded_by_certified()).filter(BallotElection.id == election.id).first():
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': 'A later election of this organization is already certified'
+        }), 409
+    
+    summary = _certify_elections([election])
+    
+    return jsonify({
+        'success': True,
+        'data': summary,
+        'message': 'Election certified successfully'
+    }), 200
+
+# Certify every completed election in a period
+@ballots_bp.route('/elections/certify', methods=['POST'])
+@token_required
+def certify_ballot_elections(current_user):
+    if not _can_certify(current_user):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to certify elections'
+        }), 403
+    
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'No data provided'
+        }), 400
+    
+    required_fields = ['dateFrom', 'dateTo']
+    for field in required_fields:
+        if field not in data:
+            return jsonify({
+                'success': False,
+                'error': 'Bad request',
+                'message': f'{field} is required'
+            }), 400
+    
+    try:
+        date_from = datetime.fromisoformat(data['dateFrom'].replace('Z', '+00:00')).date()
+        date_to = datetime.fromisoformat(data['dateTo'].replace('Z', '+00:00')).date()
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'Invalid date format'
+        }), 400
+    
+    # Already certified elections and ones older than an organization's
+    # latest certified election are left out
+    query = BallotElection.query.filter(
+        BallotElection.status == 'completed',
+        BallotElection.certified_at.is_(None),
+        BallotElection.election_date >= date_from,
+        BallotElection.election_date <= date_to,
+        ~_superseded_by_certified()
+    )
+    if data.get('organizationId'):
+        query = query.filter(BallotElection.organization_id == data['organizationId'])
+    
+    summary = _certify_elections(query.with_for_update().all())
+    
+    return jsonify({
+        'success': True,
+        'data': summary,
+        'message': f'{summary["electionsCertified"]} elections certified successfully'
+    }), 200
+
+def _can_certify(user):
+    return user.role and any(role in user.role.role_code for role in ['ADMIN', 'REGISTRAR', 'DEPUTY_REGISTRAR'])
+
+def _superseded_by_certified():
+    later = aliased(BallotElection)
+    return select(later.id).where(
+        later.organization_id == BallotElection.organization_id,
+        later.certified_at.isnot(None),
+        later.election_date > BallotElection.election_date
+    ).exists()
+
+def _certify_elections(elections):
+    officials_closed = 0
+    officials_created = 0
+    now = datetime.utcnow()
+    
+    # Elections are applied in date order so that a later election in the
+    # same batch closes the terms created by an earlier one
+    by_date = {}
+    for election in elections:
+        by_date.setdefault(election.election_date, []).append(election.id)
+    
+    for election_date in sorted(by_date):
+        election_ids = by_date[election_date]
+        
+        # Positions of these ballots that produced a winner
+        decided = select(
+            BallotElection.organization_id,
+            func.lower(BallotPosition.position_name).label('position_key')
+        ).join(
+            BallotPosition, BallotPosition.election_id == BallotElection.id
+        ).join(
+            BallotResult, BallotResult.position_id == BallotPosition.id
+        ).where(
+            BallotElection.id.in_(election_ids),
+            BallotResult.is_elected.is_(True)
+        ).distinct().subquery()
+        
+        close_outgoing = update(OrganizationOfficial).where(
+            OrganizationOfficial.is_current.is_(True),
+            OrganizationOfficial.start_date < election_date,
+            select(decided.c.organization_id).where(
+                decided.c.organization_id == OrganizationOfficial.organization_id,
+                decided.c.position_key == func.lower(OrganizationOfficial.position)
+            ).exists()
+        ).values(
+            is_current=False,
+            end_date=election_date
+        ).execution_options(synchronize_session=False)
+        officials_closed += db.session.execute(close_outgoing).rowcount
+        
+        # Winners not yet recorded for this term; the NOT EXISTS keeps re-runs idempotent
+        already_recorded = select(OrganizationOfficial.id).where(
+            OrganizationOfficial.organization_id == BallotElection.organization_id,
+            func.lower(OrganizationOfficial.position) == func.lower(BallotPosition.position_name),
+            OrganizationOfficial.first_name == BallotCandidate.first_name,
+            OrganizationOfficial.last_name == BallotCandidate.last_name,
+            OrganizationOfficial.start_date == BallotElection.election_date
+        ).exists()
+        
+        winners = select(
+            func.gen_random_uuid(),
+            BallotElection.organization_id,
+            BallotPosition.position_name,
+            BallotCandidate.first_name,
+            BallotCandidate.last_name,
+            BallotElection.election_date,
+            literal(True),
+            literal(now),
+            literal(now)
+        ).select_from(BallotResult).join(
+            BallotElection, BallotElection.id == BallotResult.election_id
+        ).join(
+            BallotPosition, BallotPosition.id == BallotResult.position_id
+        ).join(
+            BallotCandidate, BallotCandidate.id == BallotResult.candidate_id
+        ).where(
+            and_(
+                BallotResult.election_id.in_(election_ids),
+                BallotResult.is_elected.is_(True),
+                ~already_recorded
+            )
+        )
+        
+        insert_winners = insert(OrganizationOfficial).from_select(
+            ['id', 'organization_id', 'position', 'first_name', 'last_name', 'start_date', 'is_current', 'created_at', 'updated_at'],
+            winners
+        )
+        officials_created += db.session.execute(insert_winners).rowcount
+    
+    for election in elections:
+        election.certified_at = now
+    db.session.commit()
+    
+    return {
+        'electionsCertified': len(elections),
+        'electionIds': [str(election.id) for election in elections],
+        'officialsClosed': officials_closed,
+        'officialsCreated': officials_created
+    }
+
 # Get ballot positions for an election
 @ballots_bp.route('/elections/<election_id>/positions', methods=['GET'])
 @token_required
@@ -374,8 +931,10 @@ def delete_ballot_position(current_user, position_id):
             'message': 'Ballot position not found'
         }), 404
     
+    election_id = position.election_id
     db.session.delete(position)
     db.session.commit()
+    discard_election_tally(election_id)
     
     return jsonify({
         'success': True,
@@ -504,8 +1063,10 @@ def delete_ballot_candidate(current_user, candidate_id):
             'message': 'Ballot candidate not found'
         }), 404
     
+    election_id = candidate.position.election_id
     db.session.delete(candidate)
     db.session.commit()
+    discard_election_tally(election_id)
     
     return jsonify({
         'success': True,
@@ -533,6 +1094,55 @@ def get_ballot_results(current_user, election_id):
         'message': 'Ballot results retrieved successfully'
     }), 200
 
+# Get the computed tally (rankings, shares, winners, turnout) for an election
+@ballots_bp.route('/elections/<election_id>/tally', methods=['GET'])
+@token_required
+def get_election_tally_summary(current_user, election_id):
+    election = BallotElection.query.filter_by(id=election_id).first()
+    
+    if not election:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Ballot election not found'
+        }), 404
+    
+    summary = get_election_tally(election.id)
+    
+    return jsonify({
+        'success': True,
+        'data': summary,
+        'message': 'Election tally retrieved successfully'
+    }), 200
+
+# Force a full recomputation of an election's tally
+@ballots_bp.route('/elections/<election_id>/tally/recompute', methods=['POST'])
+@token_required
+def recompute_election_tally(current_user, election_id):
+    election = _lock_election(election_id)
+    
+    if not election:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Ballot election not found'
+        }), 404
+    
+    error = _certified_error(election)
+    if error:
+        return error
+    
+    refresh_election_tally(election.id)
+    db.session.commit()
+    discard_election_tally(election.id)
+    summary = get_election_tally(election.id)
+    
+    return jsonify({
+        'success': True,
+        'data': summary,
+        'message': 'Election tally recomputed successfully'
+    }), 200
+
 # Create or update ballot result
 @ballots_bp.route('/elections/<election_id>/results', methods=['POST'])
 @token_required
@@ -546,7 +1156,7 @@ def create_ballot_result(current_user, election_id):
             'message': 'No data provided'
         }), 400
     
-    election = BallotElection.query.filter_by(id=election_id).first()
+    election = _lock_election(election_id)
     
     if not election:
         return jsonify({
@@ -555,6 +1165,10 @@ def create_ballot_result(current_user, election_id):
             'message': 'Ballot election not found'
         }), 404
     
+    error = _certified_error(election)
+    if error:
+        return error
+    
     # Check required fields
     required_fields = ['positionId', 'candidateId', 'votesReceived']
     for field in required_fields:
@@ -583,6 +1197,15 @@ def create_ballot_result(current_user, election_id):
             'message': 'Invalid candidate ID'
         }), 400
     
+    # Once station sheets are counted, votes only change through the sheets;
+    # overwriting the total here would discard their atomic increments
+    if BallotStationReturn.query.filter_by(election_id=election.id).first():
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': 'Results for this election come from station tally sheets; submit a corrected sheet instead'
+        }), 409
+    
     # Check if result already exists
     existing_result = BallotResult.query.filter_by(
         election_id=election_id,
@@ -593,8 +1216,8 @@ def create_ballot_result(current_user, election_id):
     if existing_result:
         # Update existing result
         existing_result.votes_received = data['votesReceived']
-        existing_result.is_elected = data.get('isElected', False)
         
+        refresh_election_tally(election.id, [existing_result.position_id])
         db.session.commit()
         
         return jsonify({
@@ -610,10 +1233,11 @@ def create_ballot_result(current_user, election_id):
             position_id=data['positionId'],
             candidate_id=data['candidateId'],
             votes_received=data['votesReceived'],
-            is_elected=data.get('isElected', False)
+            is_elected=False
         )
         
         db.session.add(new_result)
+        refresh_election_tally(election.id, [new_result.position_id])
         db.session.commit()
         
         return jsonify({
@@ -622,10 +1246,346 @@ def create_ballot_result(current_user, election_id):
             'message': 'Ballot result created successfully'
         }), 201
 
+# Get polling-station returns recorded for an election
+@ballots_bp.route('/elections/<election_id>/tallies', methods=['GET'])
+@token_required
+def get_station_returns(current_user, election_id):
+    election = BallotElection.query.filter_by(id=election_id).first()
+    
+    if not election:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Ballot election not found'
+        }), 404
+    
+    returns = BallotStationReturn.query.filter_by(election_id=election_id).order_by(BallotStationReturn.station_code).all()
+    
+    return jsonify({
+        'success': True,
+        'data': [station_return.to_dict() for station_return in returns],
+        'message': 'Station returns retrieved successfully'
+    }), 200
+
+# Submit a polling station's tally sheet as JSON
+@ballots_bp.route('/elections/<election_id>/tallies', methods=['POST'])
+@token_required
+def submit_station_tally(current_user, election_id):
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'No data provided'
+        }), 400
+    
+    required_fields = ['stationCode', 'tallies']
+    for field in required_fields:
+        if field not in data:
+            return jsonify({
+                'success': False,
+                'error': 'Bad request',
+                'message': f'{field} is required'
+            }), 400
+    
+    return _ingest_station_sheet(
+        current_user,
+        election_id,
+        station_code=str(data['stationCode']).strip(),
+        lines=data['tallies'],
+        ballots_cast=data.get('ballotsCast'),
+        registered_voters=data.get('registeredVoters'),
+        replace=bool(data.get('replace', False)),
+        source='api'
+    )
+
+# Upload a polling station's tally sheet as CSV (positionId,candidateId,votes)
+@ballots_bp.route('/elections/<election_id>/tallies/upload', methods=['POST'])
+@token_required
+def upload_station_tally(current_user, election_id):
+    if 'file' not in request.files:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'No file provided'
+        }), 400
+    
+    station_code = (request.form.get('stationCode') or '').strip()
+    if not station_code:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'stationCode is required'
+        }), 400
+    
+    reader = csv.DictReader(io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig'))
+    try:
+        lines = [
+            {
+                'positionId': row.get('positionId') or row.get('position_id'),
+                'candidateId': row.get('candidateId') or row.get('candidate_id'),
+                'votes': row.get('votes') or row.get('votesReceived')
+            }
+            for row in reader
+        ]
+    except (UnicodeDecodeError, csv.Error):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'Tally sheet must be a UTF-8 encoded CSV file'
+        }), 400
+    
+    return _ingest_station_sheet(
+        current_user,
+        election_id,
+        station_code=station_code,
+        lines=lines,
+        ballots_cast=request.form.get('ballotsCast'),
+        registered_voters=request.form.get('registeredVoters'),
+        replace=request.form.get('replace', 'false').lower() == 'true',
+        source='csv'
+    )
+
+def _lock_election(election_id):
+    # Tally writes to one election run one at a time, so winners are ranked
+    # and persisted in the same transaction as the votes they reflect
+    return BallotElection.query.filter(BallotElection.id == election_id).with_for_update().first()
+
+def _certified_error(election):
+    # Certified results have been promoted to organization officials; any
+    # later change to votes or winners would silently contradict them
+    if election.certified_at:
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': 'Election is certified; its results can no longer change'
+        }), 409
+    return None
+
+def _tally_error(message, status_code=400, details=None):
+    body = {
+        'success': False,
+        'error': 'Conflict' if status_code == 409 else 'Bad request',
+        'message': message
+    }
+    if details:
+        body['details'] = details
+    return jsonify(body), status_code
+
+def _ingest_station_sheet(current_user, election_id, station_code, lines, ballots_cast, registered_voters, replace, source):
+    election = _lock_election(election_id)
+    
+    if not election:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Ballot election not found'
+        }), 404
+    
+    error = _certified_error(election)
+    if error:
+        return error
+    
+    if election.status in ('cancelled', 'completed'):
+        return _tally_error(f'Cannot record tallies for a {election.status} election', 409)
+    
+    if not station_code:
+        return _tally_error('stationCode is required')
+    
+    if not isinstance(lines, list) or not lines:
+        return _tally_error('Tally sheet has no lines')
+    
+    # Turnout figures are optional but must be whole numbers
+    try:
+        ballots_cast = int(ballots_cast) if ballots_cast not in (None, '') else None
+        registered_voters = int(registered_voters) if registered_voters not in (None, '') else None
+    except (TypeError, ValueError):
+        return _tally_error('ballotsCast and registeredVoters must be whole numbers')
+    
+    if (ballots_cast is not None and ballots_cast < 0) or (registered_voters is not None and registered_voters < 0):
+        return _tally_error('ballotsCast and registeredVoters cannot be negative')
+    
+    # Normalise lines and reject malformed or repeated candidates
+    votes_by_candidate = {}
+    claimed_positions = {}
+    errors = []
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            candidate_id = str(uuid.UUID(str(line.get('candidateId'))))
+            position_id = str(uuid.UUID(str(line.get('positionId'))))
+            votes = int(line.get('votes'))
+        except (TypeError, ValueError, AttributeError):
+            errors.append({'line': line_number, 'message': 'positionId, candidateId and votes are required'})
+            continue
+        
+        if votes < 0:
+            errors.append({'line': line_number, 'message': 'votes cannot be negative'})
+        elif candidate_id in votes_by_candidate:
+            errors.append({'line': line_number, 'message': 'Candidate appears more than once on the sheet'})
+        else:
+            votes_by_candidate[candidate_id] = votes
+            claimed_positions[candidate_id] = position_id
+    
+    # Validate every candidate/position pair against the election in one query
+    valid_pairs = dict(
+        (str(candidate_id), str(position_id))
+        for candidate_id, position_id in db.session.query(
+            BallotCandidate.id,
+            BallotCandidate.position_id
+        ).join(
+            BallotPosition, BallotPosition.id == BallotCandidate.position_id
+        ).filter(
+            BallotPosition.election_id == election.id,
+            BallotCandidate.id.in_(list(votes_by_candidate.keys()))
+        ).all()
+    ) if votes_by_candidate else {}
+    
+    for candidate_id, position_id in claimed_positions.items():
+        if valid_pairs.get(candidate_id) != position_id:
+            errors.append({'candidateId': candidate_id, 'message': 'Candidate does not stand for this position in this election'})
+    
+    if errors:
+        return _tally_error('Tally sheet contains invalid lines', details=errors)
+    
+    checksum_source = '|'.join(
+        [station_code, str(ballots_cast), str(registered_voters)] +
+        [f'{claimed_positions[c]}:{c}:{votes_by_candidate[c]}' for c in sorted(votes_by_candidate)]
+    )
+    checksum = hashlib.sha256(checksum_source.encode('utf-8')).hexdigest()
+    total_votes = sum(votes_by_candidate.values())
+    
+    # The unique (election, station) key makes concurrent submissions of the
+    # same sheet serialise here; only one of them inserts the header row
+    header = pg_insert(BallotStationReturn.__table__).values(
+        id=uuid.uuid4(),
+        election_id=election.id,
+        station_code=station_code,
+        sheet_checksum=checksum,
+        ballots_cast=ballots_cast,
+        registered_voters=registered_voters,
+        total_votes=total_votes,
+        line_count=len(votes_by_candidate),
+        source=source,
+        submitted_by=current_user.id,
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow()
+    ).on_conflict_do_nothing(
+        index_elements=['election_id', 'station_code']
+    ).returning(BallotStationReturn.__table__.c.id)
+    return_id = db.session.execute(header).scalar()
+    
+    deltas = dict(votes_by_candidate)
+    replaced = False
+    
+    if return_id is None:
+        existing = BallotStationReturn.query.filter_by(
+            election_id=election.id,
+            station_code=station_code
+        ).with_for_update().first()
+        
+        if existing.sheet_checksum == checksum:
+            db.session.rollback()
+            return jsonify({
+                'success': True,
+                'data': {
+                    'stationCode': station_code,
+                    'counted': False,
+                    'replaced': False,
+                    'linesApplied': 0,
+                    'totalVotes': existing.total_votes
+                },
+                'message': 'Tally sheet was already recorded for this station'
+            }), 200
+        
+        if not replace:
+            db.session.rollback()
+            return _tally_error('A different tally sheet is already recorded for this station; resubmit with replace to correct it', 409)
+        
+        # Correction: apply only the difference against the previous sheet
+        previous = db.session.query(
+            BallotStationTally.candidate_id,
+            BallotStationTally.position_id,
+            BallotStationTally.votes
+        ).filter(BallotStationTally.station_return_id == existing.id).all()
+        for candidate_id, position_id, votes in previous:
+            candidate_id = str(candidate_id)
+            deltas[candidate_id] = deltas.get(candidate_id, 0) - votes
+            claimed_positions.setdefault(candidate_id, str(position_id))
+        
+        db.session.query(BallotStationTally).filter(
+            BallotStationTally.station_return_id == existing.id
+        ).delete(synchronize_session=False)
+        
+        existing.sheet_checksum = checksum
+        existing.ballots_cast = ballots_cast
+        existing.registered_voters = registered_voters
+        existing.total_votes = total_votes
+        existing.line_count = len(votes_by_candidate)
+        existing.source = source
+        existing.submitted_by = current_user.id
+        return_id = existing.id
+        replaced = True
+    
+    db.session.execute(BallotStationTally.__table__.insert(), [
+        {
+            'id': uuid.uuid4(),
+            'station_return_id': return_id,
+            'election_id': election.id,
+            'position_id': claimed_positions[candidate_id],
+            'candidate_id': candidate_id,
+            'votes': votes,
+            'created_at': datetime.utcnow()
+        }
+        for candidate_id, votes in votes_by_candidate.items()
+    ])
+    
+    # Atomic increments; rows are sorted so concurrent stations lock in the same order
+    increments = [
+        {
+            'id': uuid.uuid4(),
+            'election_id': election.id,
+            'position_id': claimed_positions[candidate_id],
+            'candidate_id': candidate_id,
+            'votes_received': delta,
+            'is_elected': False,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+        for candidate_id, delta in sorted(deltas.items())
+        if delta != 0 or not replaced
+    ]
+    if increments:
+        upsert = pg_insert(BallotResult.__table__).values(increments)
+        upsert = upsert.on_conflict_do_update(
+            constraint='uq_ballot_results_election_position_candidate',
+            set_={
+                'votes_received': BallotResult.__table__.c.votes_received + upsert.excluded.votes_received,
+                'updated_at': datetime.utcnow()
+            }
+        )
+        db.session.execute(upsert)
+    
+    refresh_election_tally(election.id, set(claimed_positions.values()))
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'stationCode': station_code,
+            'counted': True,
+            'replaced': replaced,
+            'linesApplied': len(increments),
+            'totalVotes': total_votes
+        },
+        'message': 'Tally sheet replaced successfully' if replaced else 'Tally sheet recorded successfully'
+    }), 200 if replaced else 201
+
 # Delete ballot result
 @ballots_bp.route('/results/<result_id>', methods=['DELETE'])
 @token_required
 def delete_ballot_result(current_user, result_id):
+    election = _lock_election(select(BallotResult.election_id).where(BallotResult.id == result_id).scalar_subquery())
     result = BallotResult.query.filter_by(id=result_id).first()
     
     if not result:
@@ -635,7 +1595,13 @@ def delete_ballot_result(current_user, result_id):
             'message': 'Ballot result not found'
         }), 404
     
+    error = _certified_error(election)
+    if error:
+        return error
+    
+    election_id, position_id = result.election_id, result.position_id
     db.session.delete(result)
+    refresh_election_tally(election_id, [position_id])
     db.session.commit()
     
     return jsonify({
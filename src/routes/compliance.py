@@ -1,14 +1,66 @@
 from flask import Blueprint, request, jsonify
 from functools import wraps
 import uuid
-from datetime import datetime
+import heapq
+from datetime import datetime, timedelta
+from sqlalchemy import func, case, or_, select
+from sqlalchemy.orm import aliased
 
 from src.extensions import db
 from src.models.compliance import ComplianceRequirement, ComplianceRecord, Inspection, NonComplianceIssue
+from src.models.organization import Organization
+from src.models.user import User
 from src.routes.auth import token_required
+from src.utils.blobs import client_reference_error
+from src.utils.cache import response_cache
+from src.utils.export import export_format_error, export_response
+from src.utils.filters import apply_organization_filters
 
 compliance_bp = Blueprint('compliance', __name__)
 
+# Status codes used in the compliance matrix payload; 0 means no record
+MATRIX_STATUSES = ['none', 'pending', 'submitted', 'approved', 'rejected', 'overdue']
+MATRIX_CACHE = 'compliance_matrix'
+
+EXPORT_ORGANIZATION = aliased(Organization)
+EXPORT_REQUIREMENT = aliased(ComplianceRequirement)
+EXPORT_USER = aliased(User)
+
+RECORD_EXPORT_COLUMNS = [
+    ('organizationRegistrationNumber', EXPORT_ORGANIZATION.registration_number),
+    ('organization', EXPORT_ORGANIZATION.organization_name),
+    ('requirement', EXPORT_REQUIREMENT.requirement_name),
+    ('dueDate', ComplianceRecord.due_date),
+    ('submissionDate', ComplianceRecord.submission_date),
+    ('status', ComplianceRecord.status),
+    ('approvedBy', EXPORT_USER.username),
+    ('notes', ComplianceRecord.notes),
+    ('id', ComplianceRecord.id),
+]
+
+RECORD_EXPORT_JOINS = [
+    (EXPORT_ORGANIZATION, EXPORT_ORGANIZATION.id == ComplianceRecord.organization_id),
+    (EXPORT_REQUIREMENT, EXPORT_REQUIREMENT.id == ComplianceRecord.requirement_id),
+    (EXPORT_USER, EXPORT_USER.id == ComplianceRecord.approved_by),
+]
+
+INSPECTION_EXPORT_COLUMNS = [
+    ('organizationRegistrationNumber', EXPORT_ORGANIZATION.registration_number),
+    ('organization', EXPORT_ORGANIZATION.organization_name),
+    ('inspectionDate', Inspection.inspection_date),
+    ('inspectionType', Inspection.inspection_type),
+    ('inspector', EXPORT_USER.username),
+    ('status', Inspection.status),
+    ('findings', Inspection.findings),
+    ('recommendations', Inspection.recommendations),
+    ('id', Inspection.id),
+]
+
+INSPECTION_EXPORT_JOINS = [
+    (EXPORT_ORGANIZATION, EXPORT_ORGANIZATION.id == Inspection.organization_id),
+    (EXPORT_USER, EXPORT_USER.id == Inspection.inspector_id),
+]
+
 # Get all compliance requirements
 @compliance_bp.route('/requirements', methods=['GET'])
 @token_required
@@ -21,6 +73,95 @@ def get_compliance_requirements(current_user):
         'message': 'Compliance requirements retrieved successfully'
     }), 200
 
+# Get organization x requirement compliance matrix
+@compliance_bp.route('/matrix', methods=['GET'])
+@token_required
+def get_compliance_matrix(current_user):
+    region_id = request.args.get('region', None, type=int)
+    district_id = request.args.get('district', None, type=int)
+    type_id = request.args.get('type', None, type=int)
+    status = request.args.get('status', None)
+    
+    # Cached matrices are only served while the tables they were built from
+    # are unchanged, whichever process or command wrote to them
+    cache_key = (region_id, district_id, type_id, status)
+    version = _matrix_version()
+    cached = response_cache.get(MATRIX_CACHE, cache_key)
+    if cached and cached[0] == version:
+        data = cached[1]
+    else:
+        data = _build_compliance_matrix(region_id, district_id, type_id, status)
+        response_cache.set(MATRIX_CACHE, cache_key, (version, data))
+    
+    return jsonify({
+        'success': True,
+        'data': data,
+        'message': 'Compliance matrix retrieved successfully'
+    }), 200
+
+def _matrix_version():
+    # Counts catch deletes, max(updated_at) catches edits; one round trip
+    return tuple(db.session.query(*[
+        stat
+        for model in (ComplianceRecord, ComplianceRequirement, Organization)
+        for stat in (
+            select(func.count(model.id)).scalar_subquery(),
+            select(func.max(model.updated_at)).scalar_subquery()
+        )
+    ]).one())
+
+def _build_compliance_matrix(region_id, district_id, type_id, status):
+    organizations = apply_organization_filters(
+        db.session.query(Organization.id, Organization.organization_name),
+        region_id, district_id, type_id, status
+    ).order_by(Organization.organization_name).all()
+    
+    requirements = db.session.query(
+        ComplianceRequirement.id,
+        ComplianceRequirement.requirement_name
+    ).order_by(ComplianceRequirement.id).all()
+    
+    # Latest record per (organization, requirement) pair in a single DISTINCT ON pass
+    latest_records = apply_organization_filters(
+        db.session.query(
+            ComplianceRecord.organization_id,
+            ComplianceRecord.requirement_id,
+            ComplianceRecord.status
+        ).join(Organization, Organization.id == ComplianceRecord.organization_id),
+        region_id, district_id, type_id, status
+    ).distinct(
+        ComplianceRecord.organization_id,
+        ComplianceRecord.requirement_id
+    ).order_by(
+        ComplianceRecord.organization_id,
+        ComplianceRecord.requirement_id,
+        ComplianceRecord.due_date.desc(),
+        ComplianceRecord.created_at.desc()
+    ).all()
+    
+    org_index = {org.id: i for i, org in enumerate(organizations)}
+    requirement_index = {req.id: i for i, req in enumerate(requirements)}
+    status_codes = list(MATRIX_STATUSES)
+    
+    # Row-major cells: cells[orgIndex * len(requirementIds) + requirementIndex]
+    width = len(requirements)
+    cells = [0] * (len(organizations) * width)
+    
+    for organization_id, requirement_id, record_status in latest_records:
+        if record_status not in status_codes:
+            status_codes.append(record_status)
+        cells[org_index[organization_id] * width + requirement_index[requirement_id]] = status_codes.index(record_status)
+    
+    return {
+        'organizationIds': [str(org.id) for org in organizations],
+        'organizationNames': [org.organization_name for org in organizations],
+        'requirementIds': [req.id for req in requirements],
+        'requirementNames': [req.requirement_name for req in requirements],
+        'statusCodes': status_codes,
+        'cells': cells,
+        'generatedAt': datetime.utcnow().isoformat()
+    }
+
 # Get compliance records with pagination and filtering
 @compliance_bp.route('/records', methods=['GET'])
 @token_required
@@ -33,6 +174,14 @@ def get_compliance_records(current_user):
     status = request.args.get('status', None)
     due_before = request.args.get('dueBefore', None)
     due_after = request.args.get('dueAfter', None)
+    export_format = request.args.get('format', None)
+    
+    if export_format and export_format_error(export_format):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': export_format_error(export_format)
+        }), 400
     
     # Build query
     query = ComplianceRecord.query
@@ -69,6 +218,16 @@ def get_compliance_records(current_user):
                 'message': 'Invalid due after date format'
             }), 400
     
+    # Stream every matching row instead of a page
+    if export_format:
+        return export_response(
+            query.order_by(ComplianceRecord.due_date),
+            RECORD_EXPORT_COLUMNS,
+            'compliance-records',
+            export_format,
+            joins=RECORD_EXPORT_JOINS
+        )
+    
     # Paginate results
     paginated_records = query.order_by(ComplianceRecord.due_date).paginate(page=page, per_page=per_page)
     
@@ -147,6 +306,15 @@ def create_compliance_record(current_user):
                 'message': 'Invalid submission date format'
             }), 400
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Create new compliance record
     new_record = ComplianceRecord(
         id=uuid.uuid4(),
@@ -191,6 +359,15 @@ def update_compliance_record(current_user, record_id):
             'message': 'Compliance record not found'
         }), 404
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user, record.document_path)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Update fields
     if 'organizationId' in data:
         record.organization_id = data['organizationId']
@@ -272,6 +449,14 @@ def get_inspections(current_user):
     status = request.args.get('status', None)
     date_from = request.args.get('dateFrom', None)
     date_to = request.args.get('dateTo', None)
+    export_format = request.args.get('format', None)
+    
+    if export_format and export_format_error(export_format):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': export_format_error(export_format)
+        }), 400
     
     # Build query
     query = Inspection.query
@@ -308,6 +493,16 @@ def get_inspections(current_user):
                 'message': 'Invalid date to format'
             }), 400
     
+    # Stream every matching row instead of a page
+    if export_format:
+        return export_response(
+            query.order_by(Inspection.inspection_date.desc()),
+            INSPECTION_EXPORT_COLUMNS,
+            'inspections',
+            export_format,
+            joins=INSPECTION_EXPORT_JOINS
+        )
+    
     # Paginate results
     paginated_inspections = query.order_by(Inspection.inspection_date.desc()).paginate(page=page, per_page=per_page)
     
@@ -375,6 +570,15 @@ def create_inspection(current_user):
             'message': 'Invalid inspection date format'
         }), 400
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Create new inspection
     new_inspection = Inspection(
         id=uuid.uuid4(),
@@ -397,6 +601,253 @@ def create_inspection(current_user):
         'message': 'Inspection created successfully'
     }), 201
 
+# Schedule an inspection campaign across many organizations in one call
+@compliance_bp.route('/inspections/campaigns', methods=['POST'])
+@token_required
+def create_inspection_campaign(current_user):
+    # Check if user has appropriate role
+    if not current_user.role or not any(role in current_user.role.role_code for role in ['ADMIN', 'REGISTRAR', 'DEPUTY_REGISTRAR']):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to schedule inspection campaigns'
+        }), 403
+    
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'No data provided'
+        }), 400
+    
+    # Check required fields
+    required_fields = ['inspectionType', 'startDate', 'inspectorIds']
+    for field in required_fields:
+        if field not in data:
+            return jsonify({
+                'success': False,
+                'error': 'Bad request',
+                'message': f'{field} is required'
+            }), 400
+    
+    try:
+        start_date = datetime.fromisoformat(data['startDate'].replace('Z', '+00:00')).date()
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'Invalid start date format'
+        }), 400
+    
+    per_inspector_per_day = data.get('perInspectorPerDay')
+    if per_inspector_per_day is not None and (not isinstance(per_inspector_per_day, int) or per_inspector_per_day < 1):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'perInspectorPerDay must be a positive integer'
+        }), 400
+    
+    filters = data.get('filters') or {}
+    risk_levels = filters.get('risk')
+    if isinstance(risk_levels, str):
+        risk_levels = [risk_levels]
+    if risk_levels and any(level not in ('high', 'medium', 'low') for level in risk_levels):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'risk must be one of high, medium, low'
+        }), 400
+    
+    # Bounded so the cutoff date stays within the calendar
+    last_inspected_days_ago = filters.get('lastInspectedDaysAgo')
+    if last_inspected_days_ago is not None and (not isinstance(last_inspected_days_ago, int) or not 0 <= last_inspected_days_ago <= 36500):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'lastInspectedDaysAgo must be a whole number of days between 0 and 36500'
+        }), 400
+    
+    # Validate the inspector pool in one query
+    inspector_ids = list(dict.fromkeys(str(i) for i in data['inspectorIds']))
+    if not inspector_ids:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'At least one inspector is required'
+        }), 400
+    
+    inspectors = User.query.filter(User.id.in_(inspector_ids), User.is_active.is_(True)).all()
+    missing_inspectors = set(inspector_ids) - {str(inspector.id) for inspector in inspectors}
+    if missing_inspectors:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': f'Unknown or inactive inspectors: {", ".join(sorted(missing_inspectors))}'
+        }), 400
+    
+    organizations = _select_campaign_organizations(
+        filters,
+        risk_levels,
+        start_date,
+        data.get('skipScheduled', True)
+    )
+    
+    # Existing scheduled workload from the start date onwards, per inspector
+    existing_load = dict(db.session.query(
+        Inspection.inspector_id,
+        func.count(Inspection.id)
+    ).filter(
+        Inspection.inspector_id.in_([inspector.id for inspector in inspectors]),
+        Inspection.status == 'scheduled',
+        Inspection.inspection_date >= start_date
+    ).group_by(Inspection.inspector_id).all())
+    
+    # Least-loaded inspector takes the next organization
+    heap = [(existing_load.get(inspector.id, 0), i, inspector) for i, inspector in enumerate(inspectors)]
+    heapq.heapify(heap)
+    assigned_counts = {inspector.id: 0 for inspector in inspectors}
+    assigned_dates = {inspector.id: [] for inspector in inspectors}
+    rows = []
+    
+    for organization_id, risk_level in organizations:
+        load, i, inspector = heapq.heappop(heap)
+        
+        inspection_date = start_date
+        if per_inspector_per_day:
+            inspection_date = _add_working_days(start_date, assigned_counts[inspector.id] // per_inspector_per_day)
+        
+        rows.append({
+            'id': uuid.uuid4(),
+            'organization_id': organization_id,
+            'inspection_date': inspection_date,
+            'inspector_id': inspector.id,
+            'inspection_type': data['inspectionType'],
+            'status': 'scheduled',
+            'recommendations': None,
+            'findings': None,
+            'document_path': None,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        })
+        assigned_counts[inspector.id] += 1
+        assigned_dates[inspector.id].append(inspection_date)
+        heapq.heappush(heap, (load + 1, i, inspector))
+    
+    dry_run = bool(data.get('dryRun', False))
+    if rows and not dry_run:
+        db.session.execute(Inspection.__table__.insert(), rows)
+        db.session.commit()
+    
+    all_dates = [row['inspection_date'] for row in rows]
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'dryRun': dry_run,
+            'inspectionsCreated': 0 if dry_run else len(rows),
+            'organizationsSelected': len(organizations),
+            'riskBreakdown': {
+                level: sum(1 for _, risk_level in organizations if risk_level == level)
+                for level in ('high', 'medium', 'low')
+            },
+            'dateRange': {
+                'from': min(all_dates).isoformat() if all_dates else None,
+                'to': max(all_dates).isoformat() if all_dates else None
+            },
+            'inspectors': [
+                {
+                    'inspectorId': str(inspector.id),
+                    'name': f'{inspector.first_name} {inspector.last_name}',
+                    'existingLoad': existing_load.get(inspector.id, 0),
+                    'assigned': assigned_counts[inspector.id],
+                    'firstDate': min(assigned_dates[inspector.id]).isoformat() if assigned_dates[inspector.id] else None,
+                    'lastDate': max(assigned_dates[inspector.id]).isoformat() if assigned_dates[inspector.id] else None
+                }
+                for inspector in inspectors
+            ]
+        },
+        'message': 'Inspection campaign previewed successfully' if dry_run else 'Inspection campaign scheduled successfully'
+    }), 200 if dry_run else 201
+
+def _select_campaign_organizations(filters, risk_levels, start_date, skip_scheduled):
+    # Most recent non-cancelled inspection per organization
+    last_inspection = db.session.query(
+        Inspection.organization_id.label('organization_id'),
+        func.max(Inspection.inspection_date).label('last_date')
+    ).filter(
+        Inspection.status != 'cancelled'
+    ).group_by(Inspection.organization_id).subquery()
+    
+    # Highest severity among unresolved issues per organization
+    severity_rank = case(
+        (NonComplianceIssue.severity == 'critical', 3),
+        (NonComplianceIssue.severity == 'major', 2),
+        else_=1
+    )
+    open_issues = db.session.query(
+        NonComplianceIssue.organization_id.label('organization_id'),
+        func.max(severity_rank).label('max_severity')
+    ).filter(
+        NonComplianceIssue.status != 'resolved'
+    ).group_by(NonComplianceIssue.organization_id).subquery()
+    
+    risk_level = case(
+        (or_(Organization.is_compliant.is_(False), open_issues.c.max_severity == 3), 'high'),
+        (open_issues.c.max_severity.isnot(None), 'medium'),
+        else_='low'
+    )
+    
+    query = db.session.query(
+        Organization.id,
+        risk_level.label('risk_level')
+    ).outerjoin(
+        last_inspection, last_inspection.c.organization_id == Organization.id
+    ).outerjoin(
+        open_issues, open_issues.c.organization_id == Organization.id
+    )
+    
+    query = apply_organization_filters(
+        query,
+        filters.get('region'),
+        filters.get('district'),
+        filters.get('type'),
+        filters.get('status', 'active')
+    )
+    
+    if filters.get('lastInspectedDaysAgo') is not None:
+        cutoff = start_date - timedelta(days=filters['lastInspectedDaysAgo'])
+        query = query.filter(or_(last_inspection.c.last_date.is_(None), last_inspection.c.last_date < cutoff))
+    
+    if risk_levels:
+        query = query.filter(risk_level.in_(risk_levels))
+    
+    if skip_scheduled:
+        already_scheduled = db.session.query(Inspection.id).filter(
+            Inspection.organization_id == Organization.id,
+            Inspection.status == 'scheduled',
+            Inspection.inspection_date >= start_date
+        ).exists()
+        query = query.filter(~already_scheduled)
+    
+    # Highest-risk organizations get the earliest slots
+    return query.order_by(
+        case((risk_level == 'high', 0), (risk_level == 'medium', 1), else_=2),
+        Organization.district_id,
+        Organization.organization_name
+    ).all()
+
+def _add_working_days(start_date, days):
+    current = start_date
+    while current.weekday() >= 5:
+        current += timedelta(days=1)
+    while days > 0:
+        current += timedelta(days=1)
+        if current.weekday() < 5:
+            days -= 1
+    return current
+
 # Update inspection
 @compliance_bp.route('/inspections/<inspection_id>', methods=['PUT'])
 @token_required
@@ -419,6 +870,15 @@ def update_inspection(current_user, inspection_id):
             'message': 'Inspection not found'
         }), 404
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user, inspection.document_path)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Update fields
     if 'organizationId' in data:
         inspection.organization_id = data['organizationId']
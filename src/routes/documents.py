@@ -4,9 +4,15 @@ import uuid
 from datetime import datetime
 import os
 
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
 from src.extensions import db
 from src.models.document import Document, DocumentType
 from src.routes.auth import token_required
+from src.utils.storage import receive_upload
+from src.utils.blobs import store_blob, stored_size, client_reference_error
+from src.utils.jobs import enqueue_job
 
 documents_bp = Blueprint('documents', __name__)
 
@@ -28,7 +34,6 @@ def get_documents(current_user):
     # Build query
     query = Document.query
     
-    # Apply filters
     if search:
         query = query.filter(
             (Document.document_name.ilike(f'%{search}%')) |
@@ -36,6 +41,89 @@ def get_documents(current_user):
             (Document.description.ilike(f'%{search}%'))
         )
     
+    query = _apply_document_filters(query, document_type_id, organization_id, agreement_id, election_id, workshop_id, is_public)
+    
+    # Paginate results
+    paginated_documents = query.order_by(Document.upload_date.desc()).paginate(page=page, per_page=per_page)
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'items': [document.to_dict() for document in paginated_documents.items],
+            'total': paginated_documents.total,
+            'page': page,
+            'pageSize': per_page,
+            'totalPages': paginated_documents.pages
+        },
+        'message': 'Documents retrieved successfully'
+    }), 200
+
+# Full-text search across document names, descriptions and extracted contents
+@documents_bp.route('/search', methods=['GET'])
+@token_required
+def search_documents(current_user):
+    search = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('pageSize', 10, type=int), 1), 100)
+    document_type_id = request.args.get('type', None, type=int)
+    organization_id = request.args.get('organization', None)
+    agreement_id = request.args.get('agreement', None)
+    election_id = request.args.get('election', None)
+    workshop_id = request.args.get('workshop', None)
+    is_public = request.args.get('isPublic', None)
+    
+    if not search:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'Search query is required'
+        }), 400
+    
+    # websearch syntax: quoted phrases, OR, and -exclusions
+    ts_query = func.websearch_to_tsquery('english', search)
+    rank = func.ts_rank_cd(Document.search_vector, ts_query)
+    
+    query = db.session.query(Document.id, rank.label('rank')).filter(Document.search_vector.op('@@')(ts_query))
+    query = _apply_document_filters(query, document_type_id, organization_id, agreement_id, election_id, workshop_id, is_public)
+    
+    # Users without a role only ever see public documents
+    if not current_user.role:
+        query = query.filter(Document.is_public == True)
+    
+    total = query.order_by(None).count()
+    
+    # Headlines are costly on long texts, so only the page being returned gets them
+    page_ids = query.order_by(rank.desc(), Document.upload_date.desc()).limit(per_page).offset((page - 1) * per_page).subquery()
+    headline = func.ts_headline(
+        'english',
+        func.left(func.coalesce(func.nullif(Document.content_text, ''), Document.description, Document.document_name), 500000),
+        ts_query,
+        'MaxFragments=2, MaxWords=30, MinWords=10, StartSel=<mark>, StopSel=</mark>'
+    )
+    rows = db.session.query(Document, page_ids.c.rank, headline.label('snippet')).join(
+        page_ids, page_ids.c.id == Document.id
+    ).order_by(page_ids.c.rank.desc(), Document.upload_date.desc()).all()
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'items': [
+                {
+                    **document.to_dict(),
+                    'rank': float(row_rank),
+                    'snippet': snippet
+                }
+                for document, row_rank, snippet in rows
+            ],
+            'total': total,
+            'page': page,
+            'pageSize': per_page,
+            'totalPages': (total + per_page - 1) // per_page
+        },
+        'message': 'Documents retrieved successfully'
+    }), 200
+
+def _apply_document_filters(query, document_type_id, organization_id, agreement_id, election_id, workshop_id, is_public):
     if document_type_id:
         query = query.filter(Document.document_type_id == document_type_id)
     
@@ -55,20 +143,7 @@ def get_documents(current_user):
         is_public_bool = is_public.lower() == 'true'
         query = query.filter(Document.is_public == is_public_bool)
     
-    # Paginate results
-    paginated_documents = query.order_by(Document.upload_date.desc()).paginate(page=page, per_page=per_page)
-    
-    return jsonify({
-        'success': True,
-        'data': {
-            'items': [document.to_dict() for document in paginated_documents.items],
-            'total': paginated_documents.total,
-            'page': page,
-            'pageSize': per_page,
-            'totalPages': paginated_documents.pages
-        },
-        'message': 'Documents retrieved successfully'
-    }), 200
+    return query
 
 # Get document by ID
 @documents_bp.route('/<document_id>', methods=['GET'])
@@ -143,8 +218,17 @@ def create_document(current_user):
     file_type = None
     file_path = data['filePath']
     
-    if os.path.exists(file_path):
-        file_size = os.path.getsize(file_path)
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(file_path, current_user)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
+    file_size = stored_size(file_path)
+    if file_size is not None:
         _, file_extension = os.path.splitext(file_path)
         file_type = file_extension.lstrip('.')
     
@@ -176,6 +260,127 @@ def create_document(current_user):
         'message': 'Document created successfully'
     }), 201
 
+# Upload a document file, streamed to storage while size, SHA-256 and MIME type are computed
+@documents_bp.route('/upload', methods=['POST'])
+@token_required
+def upload_document(current_user):
+    # Raw-body uploads carry their metadata in the query string, so reject
+    # duplicates before reading the body
+    if request.mimetype != 'multipart/form-data':
+        error = validate_document_metadata(request.args)
+        if error:
+            return error
+    
+    writer, form = receive_upload(request)
+    
+    if writer is None:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'No file provided'
+        }), 400
+    
+    error = validate_document_metadata(form)
+    if error:
+        writer.discard()
+        return error
+    
+    try:
+        new_document = create_document_from_upload(current_user, writer, form)
+    except IntegrityError as e:
+        # The pre-check above races with concurrent uploads; the rollback
+        # drops the blob reference, leaving the content to the collector
+        db.session.rollback()
+        if getattr(e.orig, 'pgcode', None) == '23505':
+            return jsonify({
+                'success': False,
+                'error': 'Conflict',
+                'message': 'Document number already exists'
+            }), 409
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'Linked organization, agreement, election or workshop not found'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'data': new_document.to_dict(),
+        'message': 'Document uploaded successfully'
+    }), 201
+
+def create_document_from_upload(current_user, writer, form):
+    upload_date = datetime.utcnow()
+    if form.get('uploadDate'):
+        upload_date = datetime.fromisoformat(form['uploadDate'].replace('Z', '+00:00'))
+    
+    _, file_extension = os.path.splitext(writer.filename or '')
+    
+    new_document = Document(
+        id=uuid.uuid4(),
+        document_number=form['documentNumber'],
+        document_name=form['documentName'],
+        document_type_id=form.get('documentTypeId', type=int),
+        organization_id=form.get('organizationId') or None,
+        agreement_id=form.get('agreementId') or None,
+        election_id=form.get('electionId') or None,
+        workshop_id=form.get('workshopId') or None,
+        file_path=store_blob(writer),
+        file_size=writer.size,
+        file_type=file_extension.lstrip('.') or None,
+        mime_type=writer.mime_type,
+        sha256=writer.sha256,
+        upload_date=upload_date.date(),
+        uploaded_by=current_user.id,
+        is_public=str(form.get('isPublic', 'false')).lower() == 'true',
+        description=form.get('description')
+    )
+    
+    db.session.add(new_document)
+    enqueue_job('extract_text', 'document', new_document.id)
+    db.session.commit()
+    
+    return new_document
+
+def validate_document_metadata(form):
+    for field in ['documentNumber', 'documentName']:
+        if not form.get(field):
+            return jsonify({
+                'success': False,
+                'error': 'Bad request',
+                'message': f'{field} is required'
+            }), 400
+    
+    if form.get('uploadDate'):
+        try:
+            datetime.fromisoformat(form['uploadDate'].replace('Z', '+00:00'))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Bad request',
+                'message': 'Invalid upload date format'
+            }), 400
+    
+    for field in ['organizationId', 'agreementId', 'electionId', 'workshopId']:
+        if form.get(field):
+            try:
+                uuid.UUID(str(form[field]))
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'Bad request',
+                    'message': f'Invalid {field}'
+                }), 400
+    
+    if Document.query.filter_by(document_number=form['documentNumber']).first():
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': 'Document number already exists'
+        }), 409
+    
+    return None
+
 # Update document
 @documents_bp.route('/<document_id>', methods=['PUT'])
 @token_required
@@ -198,6 +403,15 @@ def update_document(current_user, document_id):
             'message': 'Document not found'
         }), 404
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('filePath'), current_user, document.file_path)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Check if document number already exists for another document
     if 'documentNumber' in data and data['documentNumber'] != document.document_number:
         existing_document = Document.query.filter_by(document_number=data['documentNumber']).first()
@@ -227,8 +441,9 @@ def update_document(current_user, document_id):
         document.file_path = data['filePath']
         
         # Update file size and type if path changed
-        if os.path.exists(data['filePath']):
-            document.file_size = os.path.getsize(data['filePath'])
+        file_size = stored_size(data['filePath'])
+        if file_size is not None:
+            document.file_size = file_size
             _, file_extension = os.path.splitext(data['filePath'])
             document.file_type = file_extension.lstrip('.')
     
@@ -282,14 +497,9 @@ def delete_document(current_user, document_id):
             'message': 'You do not have permission to delete this document'
         }), 403
     
-    # Delete file if it exists
-    if os.path.exists(document.file_path):
-        try:
-            os.remove(document.file_path)
-        except Exception as e:
-            # Log error but continue with database deletion
-            print(f"Error deleting file: {e}")
-    
+    # Content is released through the blob's reference count and reclaimed
+    # by the collector once the grace period passes; legacy files are left
+    # for the reconciliation scan
     db.session.delete(document)
     db.session.commit()
     
@@ -1,41 +1,109 @@
 from flask import Blueprint, request, jsonify
 from src.models.election import UnionElection, ElectionNominee, NomineeVerification, ExecutivePosition
 from src.extensions import db
-from src.utils.auth import token_required, role_required
-from datetime import datetime
+from src.models.organization import Organization, OrganizationType
+from src.models.region import District, Region
+from src.models.membership import OrganizationMember
+from src.routes.auth import token_required
+from src.utils.cache import response_cache
+from datetime import datetime, date, timedelta
+from sqlalchemy.orm import joinedload, selectinload
 import json
+import uuid
 
 elections_bp = Blueprint('elections', __name__)
 
-@elections_bp.route('/elections', methods=['GET'])
+ELECTION_MANAGER_ROLES = ['REGISTRAR', 'DEPUTY_REGISTRAR', 'INSPECTOR']
+
+def _forbidden(current_user):
+    # Response for users outside ELECTION_MANAGER_ROLES, None for the rest
+    if current_user.role and any(role in current_user.role.role_code for role in ELECTION_MANAGER_ROLES):
+        return None
+    return jsonify({'error': 'You do not have permission to manage elections'}), 403
+
+def _flag(data, field, default):
+    # JSON booleans, or 'true'/'false' from clients that send strings
+    value = data.get(field, default)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false'):
+        return value.strip().lower() == 'true'
+    raise ValueError(f'{field} must be a boolean')
+
+@elections_bp.route('', methods=['GET'])
 @token_required
-def get_elections():
+def get_elections(current_user):
     """
-    Get all elections with optional filtering
+    Get a page of elections with optional filtering
     """
     try:
         # Parse query parameters
         year = request.args.get('year', type=int)
         status = request.args.get('status')
-        organization_id = request.args.get('organization_id', type=int)
+        organization_id = request.args.get('organization_id')
+        page = request.args.get('page', 1, type=int)
+        page_size = min(request.args.get('page_size', 20, type=int), 200)
+        include = set(filter(None, request.args.get('include', '').split(',')))
+        
+        # Nominee and position counts per election, aggregated once
+        counts = db.session.query(
+            ElectionNominee.election_id.label('election_id'),
+            db.func.count(ElectionNominee.id).label('nominees_count'),
+            db.func.count(db.distinct(ElectionNominee.position_id)).label('positions_count')
+        ).group_by(ElectionNominee.election_id).subquery()
         
         # Base query
-        query = UnionElection.query
+        query = db.session.query(
+            UnionElection,
+            db.func.coalesce(counts.c.nominees_count, 0),
+            db.func.coalesce(counts.c.positions_count, 0)
+        ).outerjoin(
+            counts, counts.c.election_id == UnionElection.id
+        ).options(
+            joinedload(UnionElection.organization),
+            joinedload(UnionElection.supervisor)
+        )
+        
+        if 'nominees' in include:
+            query = query.options(
+                selectinload(UnionElection.nominees).joinedload(ElectionNominee.position),
+                selectinload(UnionElection.nominees).joinedload(ElectionNominee.member)
+            )
         
         # Apply filters
         if year:
-            query = query.filter(db.extract('year', UnionElection.election_date) == year)
+            start, end = _year_range(year)
+            query = query.filter(UnionElection.election_date >= start, UnionElection.election_date < end)
         if status and status != 'all':
             query = query.filter(UnionElection.status == status)
         if organization_id:
+            try:
+                organization_id = uuid.UUID(organization_id)
+            except ValueError:
+                return jsonify({'error': 'organization_id must be a UUID'}), 400
             query = query.filter(UnionElection.organization_id == organization_id)
         
-        # Execute query
-        elections = query.all()
+        paginated = query.order_by(
+            UnionElection.election_date.desc(),
+            UnionElection.id.desc()
+        ).paginate(page=page, per_page=page_size, error_out=False)
         
         # Format response
         result = {
-            'elections': [election.to_dict() for election in elections],
+            'elections': [
+                election.to_dict(
+                    include_nominees='nominees' in include,
+                    positions_count=positions_count,
+                    nominees_count=nominees_count
+                )
+                for election, nominees_count, positions_count in paginated.items
+            ],
+            'pagination': {
+                'page': page,
+                'page_size': page_size,
+                'total': paginated.total,
+                'total_pages': paginated.pages
+            },
             'monthlyData': get_monthly_election_data(year if year else datetime.now().year)
         }
         
@@ -43,9 +111,9 @@ def get_elections():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@elections_bp.route('/elections/<int:election_id>', methods=['GET'])
+@elections_bp.route('/<int:election_id>', methods=['GET'])
 @token_required
-def get_election(election_id):
+def get_election(current_user, election_id):
     """
     Get a specific election by ID
     """
@@ -58,13 +126,16 @@ def get_election(election_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@elections_bp.route('/elections', methods=['POST'])
+@elections_bp.route('', methods=['POST'])
 @token_required
-@role_required(['REGISTRAR', 'DEPUTY_REGISTRAR', 'INSPECTOR'])
-def create_election():
+def create_election(current_user):
     """
     Create a new election
     """
+    forbidden = _forbidden(current_user)
+    if forbidden:
+        return forbidden
+    
     try:
         data = request.json
         
@@ -92,13 +163,16 @@ def create_election():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@elections_bp.route('/elections/<int:election_id>', methods=['PUT'])
+@elections_bp.route('/<int:election_id>', methods=['PUT'])
 @token_required
-@role_required(['REGISTRAR', 'DEPUTY_REGISTRAR', 'INSPECTOR'])
-def update_election(election_id):
+def update_election(current_user, election_id):
     """
     Update an existing election
     """
+    forbidden = _forbidden(current_user)
+    if forbidden:
+        return forbidden
+    
     try:
         election = UnionElection.query.get(election_id)
         if not election:
@@ -128,9 +202,9 @@ def update_election(election_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@elections_bp.route('/elections/<int:election_id>/nominees', methods=['GET'])
+@elections_bp.route('/<int:election_id>/nominees', methods=['GET'])
 @token_required
-def get_election_nominees(election_id):
+def get_election_nominees(current_user, election_id):
     """
     Get all nominees for a specific election
     """
@@ -141,9 +215,9 @@ def get_election_nominees(election_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@elections_bp.route('/elections/<int:election_id>/nominees', methods=['POST'])
+@elections_bp.route('/<int:election_id>/nominees', methods=['POST'])
 @token_required
-def add_election_nominee(election_id):
+def add_election_nominee(current_user, election_id):
     """
     Add a new nominee to an election
     """
@@ -188,11 +262,14 @@ def add_election_nominee(election_id):
 
 @elections_bp.route('/nominees/<int:nominee_id>/verify', methods=['POST'])
 @token_required
-@role_required(['REGISTRAR', 'DEPUTY_REGISTRAR', 'INSPECTOR'])
-def verify_nominee(nominee_id):
+def verify_nominee(current_user, nominee_id):
     """
     Verify a nominee in the verification workflow
     """
+    forbidden = _forbidden(current_user)
+    if forbidden:
+        return forbidden
+    
     try:
         data = request.json
         
@@ -211,7 +288,7 @@ def verify_nominee(nominee_id):
         verification = NomineeVerification(
             nominee_id=nominee_id,
             verification_step=data['verification_step'],
-            verified_by=data.get('verified_by'),
+            verified_by=current_user.id,
             status=data['status'],
             comments=data.get('comments', '')
         )
@@ -225,9 +302,125 @@ def verify_nominee(nominee_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@elections_bp.route('/<int:election_id>/nominees/verify-all', methods=['POST'])
+@token_required
+def verify_all_nominees(current_user, election_id):
+    """
+    Check every nominee of an election against the member register in one pass
+    """
+    forbidden = _forbidden(current_user)
+    if forbidden:
+        return forbidden
+    
+    data = request.json or {}
+    try:
+        min_membership_days = int(data.get('min_membership_days', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'min_membership_days must be an integer'}), 400
+    try:
+        require_dues = _flag(data, 'require_dues_paid', True)
+        allow_multiple_positions = _flag(data, 'allow_multiple_positions', False)
+        recheck = _flag(data, 'recheck', False)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        election = UnionElection.query.get(election_id)
+        if not election:
+            return jsonify({'error': 'Election not found'}), 404
+        
+        member = OrganizationMember
+        nominations = db.func.count(ElectionNominee.id).over(partition_by=ElectionNominee.member_id)
+        
+        # First failing rule wins; NULL means the nominee is eligible
+        reason = db.case(
+            (member.id.is_(None), 'member_not_found'),
+            (member.organization_id != UnionElection.organization_id, 'not_member_of_organization'),
+            (member.status != 'active', 'membership_not_active'),
+            (db.and_(db.literal(require_dues), db.or_(
+                member.dues_paid_until.is_(None),
+                member.dues_paid_until < UnionElection.election_date
+            )), 'dues_in_arrears'),
+            (db.and_(db.literal(min_membership_days > 0), db.or_(
+                member.join_date.is_(None),
+                member.join_date > UnionElection.election_date - timedelta(days=min_membership_days)
+            )), 'insufficient_membership_period'),
+            (db.and_(db.literal(not allow_multiple_positions), nominations > 1), 'multiple_nominations'),
+            else_=None
+        )
+        
+        query = db.session.query(
+            ElectionNominee.id,
+            ElectionNominee.member_id,
+            ElectionNominee.position_id,
+            ElectionNominee.verification_status,
+            member.first_name,
+            member.last_name,
+            reason.label('reason')
+        ).join(
+            UnionElection, UnionElection.id == ElectionNominee.election_id
+        ).outerjoin(
+            member, member.id == ElectionNominee.member_id
+        ).filter(ElectionNominee.election_id == election_id)
+        
+        # The window over all nominees still sees nominations that were already checked
+        rows = [row for row in query.all() if recheck or row.verification_status == 'pending']
+        
+        now = datetime.utcnow()
+        verifications = []
+        nominee_updates = []
+        rejects = []
+        
+        for row in rows:
+            passed = row.reason is None
+            verifications.append({
+                'nominee_id': row.id,
+                'verification_step': 'membership_check',
+                'verified_by': current_user.id,
+                'verification_date': now,
+                'status': 'passed' if passed else 'failed',
+                'comments': None if passed else row.reason,
+                'created_at': now,
+                'updated_at': now
+            })
+            nominee_updates.append({
+                'id': row.id,
+                'verification_status': 'verified' if passed else 'rejected',
+                'is_valid_member': passed,
+                'rejection_reason': None if passed else row.reason
+            })
+            if not passed:
+                rejects.append({
+                    'nominee_id': row.id,
+                    'member_id': row.member_id,
+                    'position_id': row.position_id,
+                    'member_name': f"{row.first_name} {row.last_name}" if row.first_name else None,
+                    'reason': row.reason
+                })
+        
+        if verifications:
+            db.session.execute(NomineeVerification.__table__.insert(), verifications)
+            # ORM bulk UPDATE by primary key: one executemany for all nominees
+            db.session.execute(db.update(ElectionNominee), nominee_updates)
+        db.session.commit()
+        
+        return jsonify({
+            'election_id': election_id,
+            'checked': len(rows),
+            'verified': len(rows) - len(rejects),
+            'rejected': len(rejects),
+            'rejects': rejects
+        }), 200
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @elections_bp.route('/positions', methods=['GET'])
 @token_required
-def get_executive_positions():
+def get_executive_positions(current_user):
     """
     Get all executive positions
     """
@@ -238,9 +431,9 @@ def get_executive_positions():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@elections_bp.route('/elections/calculate-quorum', methods=['POST'])
+@elections_bp.route('/calculate-quorum', methods=['POST'])
 @token_required
-def calculate_quorum():
+def calculate_quorum(current_user):
     """
     Calculate if quorum is met for an election
     """
@@ -287,38 +480,198 @@ def calculate_quorum():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+TURNOUT_STATS_CACHE = 'election_turnout_stats'
+
+@elections_bp.route('/quorum/recompute', methods=['POST'])
+@token_required
+def recompute_quorum(current_user):
+    """
+    Recompute turnout and quorum for every election matching a filter
+    """
+    forbidden = _forbidden(current_user)
+    if forbidden:
+        return forbidden
+    
+    try:
+        data = request.json or {}
+        required_percentage = float(data.get('required_percentage', 50))
+        
+        if not 0 < required_percentage <= 100:
+            return jsonify({'error': 'required_percentage must be between 0 and 100'}), 400
+        
+        turnout = UnionElection.actual_voters * 100.0 / db.func.nullif(UnionElection.total_eligible_voters, 0)
+        
+        # Single set-based UPDATE; elections without usable voter numbers are cleared
+        statement = db.update(UnionElection).where(
+            *_election_filters(data)
+        ).values(
+            voter_turnout=db.case(
+                (UnionElection.actual_voters > UnionElection.total_eligible_voters, None),
+                else_=db.func.round(turnout, 2)
+            ),
+            quorum_met=db.case(
+                (UnionElection.actual_voters > UnionElection.total_eligible_voters, None),
+                else_=turnout >= required_percentage
+            ),
+            updated_at=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+        
+        updated = db.session.execute(statement).rowcount
+        db.session.commit()
+        
+        return jsonify({
+            'updated': updated,
+            'required_percentage': required_percentage,
+            'distribution': _turnout_distribution(data)
+        }), 200
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@elections_bp.route('/turnout-stats', methods=['GET'])
+@token_required
+def get_turnout_stats(current_user):
+    """
+    Get turnout percentiles and quorum rates per organization type and region
+    """
+    try:
+        filters = {
+            'year': request.args.get('year', type=int),
+            'status': request.args.get('status'),
+            'organization_type_id': request.args.get('organization_type_id', type=int),
+            'region_id': request.args.get('region_id', type=int)
+        }
+        
+        # Served from cache only while the elections and organizations it was
+        # computed from are unchanged, whichever worker wrote to them
+        cache_key = tuple(sorted(filters.items()))
+        version = _turnout_stats_version()
+        cached = response_cache.get(TURNOUT_STATS_CACHE, cache_key)
+        if cached and cached[0] == version:
+            distribution = cached[1]
+        else:
+            distribution = _turnout_distribution(filters)
+            response_cache.set(TURNOUT_STATS_CACHE, cache_key, (version, distribution), ttl=900)
+        
+        return jsonify(distribution), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _election_filters(filters):
+    criteria = []
+    
+    if filters.get('year'):
+        start, end = _year_range(int(filters['year']))
+        criteria += [UnionElection.election_date >= start, UnionElection.election_date < end]
+    if filters.get('status') and filters['status'] != 'all':
+        criteria.append(UnionElection.status == filters['status'])
+    if filters.get('organization_id'):
+        # ValueError on a malformed id, reported as a 400 by the callers
+        criteria.append(UnionElection.organization_id == uuid.UUID(str(filters['organization_id'])))
+    if filters.get('organization_type_id'):
+        criteria.append(UnionElection.organization_id.in_(
+            db.select(Organization.id).where(Organization.organization_type_id == filters['organization_type_id'])
+        ))
+    if filters.get('region_id'):
+        criteria.append(UnionElection.organization_id.in_(
+            db.select(Organization.id).join(District, District.id == Organization.district_id).where(District.region_id == filters['region_id'])
+        ))
+    
+    return criteria
+
+def _turnout_stats_version():
+    # Counts catch deletes, max(updated_at) catches edits; one round trip
+    return tuple(db.session.query(*[
+        stat
+        for model in (UnionElection, Organization)
+        for stat in (
+            db.select(db.func.count(model.id)).scalar_subquery(),
+            db.select(db.func.max(model.updated_at)).scalar_subquery()
+        )
+    ]).one())
+
+def _turnout_distribution(filters):
+    turnout = UnionElection.voter_turnout
+    
+    def grouped(label_column, *joins):
+        query = db.session.query(
+            label_column,
+            db.func.count(UnionElection.id),
+            db.func.percentile_cont(0.25).within_group(turnout),
+            db.func.percentile_cont(0.5).within_group(turnout),
+            db.func.percentile_cont(0.75).within_group(turnout),
+            db.func.percentile_cont(0.9).within_group(turnout),
+            db.func.avg(db.case((UnionElection.quorum_met.is_(True), 1.0), else_=0.0))
+        ).select_from(UnionElection).join(
+            Organization, Organization.id == UnionElection.organization_id
+        )
+        for target, onclause in joins:
+            query = query.outerjoin(target, onclause)
+        
+        rows = query.filter(
+            turnout.isnot(None),
+            *_election_filters(filters)
+        ).group_by(label_column).order_by(label_column).all()
+        
+        return [
+            {
+                'name': name,
+                'elections': count,
+                'p25': float(p25) if p25 is not None else None,
+                'median': float(p50) if p50 is not None else None,
+                'p75': float(p75) if p75 is not None else None,
+                'p90': float(p90) if p90 is not None else None,
+                'quorum_rate': round(float(quorum_rate) * 100, 2) if quorum_rate is not None else None
+            }
+            for name, count, p25, p50, p75, p90, quorum_rate in rows
+        ]
+    
+    return {
+        'by_organization_type': grouped(
+            OrganizationType.type_name,
+            (OrganizationType, OrganizationType.id == Organization.organization_type_id)
+        ),
+        'by_region': grouped(
+            Region.region_name,
+            (District, District.id == Organization.district_id),
+            (Region, Region.id == District.region_id)
+        ),
+        'computed_at': datetime.utcnow().isoformat()
+    }
+
 def get_monthly_election_data(year):
     """
     Helper function to get monthly election data for a specific year
     """
+    start, end = _year_range(year)
+    month = db.extract('month', UnionElection.election_date)
+    
+    # One grouped query over a sargable date range instead of a count per month and status
+    rows = db.session.query(
+        month,
+        UnionElection.status,
+        db.func.count(UnionElection.id)
+    ).filter(
+        UnionElection.election_date >= start,
+        UnionElection.election_date < end,
+        UnionElection.status.in_(['completed', 'pending', 'cancelled'])
+    ).group_by(month, UnionElection.status).all()
+    
+    counts = {(int(m), s): c for m, s, c in rows}
     result = []
     
-    for month in range(1, 13):
-        # Get counts for each status
-        completed_count = UnionElection.query.filter(
-            db.extract('year', UnionElection.election_date) == year,
-            db.extract('month', UnionElection.election_date) == month,
-            UnionElection.status == 'completed'
-        ).count()
-        
-        pending_count = UnionElection.query.filter(
-            db.extract('year', UnionElection.election_date) == year,
-            db.extract('month', UnionElection.election_date) == month,
-            UnionElection.status == 'pending'
-        ).count()
-        
-        cancelled_count = UnionElection.query.filter(
-            db.extract('year', UnionElection.election_date) == year,
-            db.extract('month', UnionElection.election_date) == month,
-            UnionElection.status == 'cancelled'
-        ).count()
-        
-        # Add to result
+    for month_number in range(1, 13):
         result.append({
-            'month': datetime(year, month, 1).strftime('%b'),
-            'completed': completed_count,
-            'pending': pending_count,
-            'cancelled': cancelled_count
+            'month': datetime(year, month_number, 1).strftime('%b'),
+            'completed': counts.get((month_number, 'completed'), 0),
+            'pending': counts.get((month_number, 'pending'), 0),
+            'cancelled': counts.get((month_number, 'cancelled'), 0)
         })
     
     return result
+
+def _year_range(year):
+    return date(year, 1, 1), date(year + 1, 1, 1)
@@ -2,9 +2,7 @@ from flask import Blueprint, request, jsonify
 from functools import wraps
 import uuid
 from datetime import datetime
-import os
 import re
-from werkzeug.utils import secure_filename
 
 from src.extensions import db
 from src.models.organization import Organization, OrganizationType, OrganizationOfficial, OrganizationConstitution
@@ -557,94 +555,6 @@ def get_organization_constitutions(current_user, organization_id):
         'message': 'Organization constitutions retrieved successfully'
     }), 200
 
-# Upload organization constitution with OCR processing
-@organizations_bp.route('/<organization_id>/constitutions', methods=['POST'])
-@token_required
-def upload_organization_constitution(current_user, organization_id):
-    organization = Organization.query.filter_by(id=organization_id).first()
-    
-    if not organization:
-        return jsonify({
-            'success': False,
-            'error': 'Not found',
-            'message': 'Organization not found'
-        }), 404
-    
-    # Check if file is provided
-    if 'file' not in request.files:
-        return jsonify({
-            'success': False,
-            'error': 'Bad request',
-            'message': 'No file provided'
-        }), 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return jsonify({
-            'success': False,
-            'error': 'Bad request',
-            'message': 'No file selected'
-        }), 400
-    
-    # Get form data
-    version_number = request.form.get('versionNumber', type=int)
-    effective_date = request.form.get('effectiveDate')
-    status = request.form.get('status', 'pending')
-    notes = request.form.get('notes')
-    
-    if not version_number or not effective_date:
-        return jsonify({
-            'success': False,
-            'error': 'Bad request',
-            'message': 'Version number and effective date are required'
-        }), 400
-    
-    # Parse effective date
-    try:
-        effective_date_obj = datetime.fromisoformat(effective_date.replace('Z', '+00:00'))
-    except ValueError:
-        return jsonify({
-            'success': False,
-            'error': 'Bad request',
-            'message': 'Invalid effective date format'
-        }), 400
-    
-    # Save file
-    filename = secure_filename(f"{organization.registration_number}_constitution_v{version_number}_{int(datetime.utcnow().timestamp())}.pdf")
-    upload_folder = os.path.join(os.getcwd(), 'uploads', 'constitutions')
-    
-    # Create directory if it doesn't exist
-    os.makedirs(upload_folder, exist_ok=True)
-    
-    file_path = os.path.join(upload_folder, filename)
-    file.save(file_path)
-    
-    # Process OCR (in a real implementation, this would use a proper OCR library)
-    # For this example, we'll simulate OCR processing
-    ocr_content = "This is simulated OCR content for the constitution document."
-    
-    # Create new constitution record
-    new_constitution = OrganizationConstitution(
-        id=uuid.uuid4(),
-        organization_id=organization_id,
-        version_number=version_number,
-        effective_date=effective_date_obj.date(),
-        document_path=file_path,
-        ocr_content=ocr_content,
-        status=status,
-        notes=notes
-    )
-    
-    db.session.add(new_constitution)
-    db.session.commit()
-    
-    return jsonify({
-        'success': True,
-        'data': new_constitution.to_dict(),
-        'message': 'Constitution uploaded successfully'
-    }), 201
-
 # Search constitution by clause or content
 @organizations_bp.route('/constitutions/search', methods=['GET'])
 @token_required
@@ -682,135 +592,6 @@ def search_constitutions(current_user):
         'message': f'Found {len(results)} constitutions matching "{query}"'
     }), 200
 
-# Get membership lists for an organization
-@organizations_bp.route('/<organization_id>/membership-lists', methods=['GET'])
-@token_required
-def get_membership_lists(current_user, organization_id):
-    organization = Organization.query.filter_by(id=organization_id).first()
-    
-    if not organization:
-        return jsonify({
-            'success': False,
-            'error': 'Not found',
-            'message': 'Organization not found'
-        }), 404
-    
-    membership_lists = MembershipList.query.filter_by(organization_id=organization_id).order_by(MembershipList.submission_date.desc()).all()
-    
-    return jsonify({
-        'success': True,
-        'data': [membership_list.to_dict() for membership_list in membership_lists],
-        'message': 'Membership lists retrieved successfully'
-    }), 200
-
-# Upload membership list
-@organizations_bp.route('/<organization_id>/membership-lists', methods=['POST'])
-@token_required
-def upload_membership_list(current_user, organization_id):
-    organization = Organization.query.filter_by(id=organization_id).first()
-    
-    if not organization:
-        return jsonify({
-            'success': False,
-            'error': 'Not found',
-            'message': 'Organization not found'
-        }), 404
-    
-    # Check if file is provided
-    if 'file' not in request.files:
-        return jsonify({
-            'success': False,
-            'error': 'Bad request',
-            'message': 'No file provided'
-        }), 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return jsonify({
-            'success': False,
-            'error': 'Bad request',
-            'message': 'No file selected'
-        }), 400
-    
-    # Get form data
-    submission_date = request.form.get('submissionDate')
-    submitted_by = request.form.get('submittedBy')
-    member_count = request.form.get('memberCount', type=int)
-    notes = request.form.get('notes')
-    
-    if not submission_date or not member_count:
-        return jsonify({
-            'success': False,
-            'error': 'Bad request',
-            'message': 'Submission date and member count are required'
-        }), 400
-    
-    # Parse submission date
-    try:
-        submission_date_obj = datetime.fromisoformat(submission_date.replace('Z', '+00:00'))
-    except ValueError:
-        return jsonify({
-            'success': False,
-            'error': 'Bad request',
-            'message': 'Invalid submission date format'
-        }), 400
-    
-    # Save file
-    filename = secure_filename(f"{organization.registration_number}_membership_{int(datetime.utcnow().timestamp())}.{file.filename.split('.')[-1]}")
-    upload_folder = os.path.join(os.getcwd(), 'uploads', 'membership_lists')
-    
-    # Create directory if it doesn't exist
-    os.makedirs(upload_folder, exist_ok=True)
-    
-    file_path = os.path.join(upload_folder, filename)
-    file.save(file_path)
-    
-    # Get previous membership count
-    previous_list = MembershipList.query.filter_by(organization_id=organization_id).order_by(MembershipList.submission_date.desc()).first()
-    previous_count = previous_list.member_count if previous_list else 0
-    
-    # Calculate change percentage
-    change_percentage = ((member_count - previous_count) / previous_count * 100) if previous_count > 0 else 0
-    
-    # Create new membership list record
-    new_membership_list = MembershipList(
-        id=uuid.uuid4(),
-        organization_id=organization_id,
-        submission_date=submission_date_obj.date(),
-        submitted_by=submitted_by,
-        member_count=member_count,
-        previous_count=previous_count,
-        change_percentage=change_percentage,
-        status='submitted',
-        document_path=file_path,
-        notes=notes
-    )
-    
-    db.session.add(new_membership_list)
-    
-    # Update organization membership count
-    organization.membership_count = member_count
-    
-    # Create historical record for trend analysis
-    historical_record = OrganizationHistoricalData(
-        id=uuid.uuid4(),
-        organization_id=organization.id,
-        record_date=datetime.utcnow().date(),
-        status=organization.status,
-        membership_count=member_count,
-        is_compliant=organization.is_compliant
-    )
-    
-    db.session.add(historical_record)
-    db.session.commit()
-    
-    return jsonify({
-        'success': True,
-        'data': new_membership_list.to_dict(),
-        'message': 'Membership list uploaded successfully'
-    }), 201
-
 # Review membership list (for registrar or labor officers)
 @organizations_bp.route('/membership-lists/<list_id>/review', methods=['PUT'])
 @token_required
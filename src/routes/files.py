@@ -0,0 +1,470 @@
+from flask import Blueprint, request, jsonify, send_file, make_response, redirect, Response, current_app, stream_with_context
+import os
+import io
+import csv
+import mimetypes
+from datetime import datetime, timezone
+from functools import partial
+from urllib.parse import quote
+from werkzeug.datastructures import ContentRange
+from werkzeug.utils import secure_filename
+from sqlalchemy import or_, case, func, literal, cast, String
+
+from src.extensions import db
+from src.models.blob import StoredBlob
+from src.models.document import Document
+from src.models.organization import Organization, OrganizationConstitution
+from src.models.membership import MembershipList
+from src.models.agreement import Agreement, AgreementAmendment, Dispute
+from src.models.compliance import ComplianceRecord, Inspection
+from src.models.election import ElectionDocument
+from src.routes.auth import token_required
+from src.utils.storage import UPLOAD_CHUNK_SIZE, upload_root
+from src.utils.blobs import BLOB_PREFIX, resolve_path, blob_sha256, blob_key, blob_reference, open_stored
+from src.utils.storage_backends import get_storage
+from src.utils.filters import apply_organization_filters
+from src.utils.zipstream import stream_zip, should_compress
+
+files_bp = Blueprint('files', __name__)
+
+# Roles that may read files which are not public
+FILE_READER_ROLES = ['ADMIN', 'REGISTRAR', 'DEPUTY_REGISTRAR', 'INSPECTOR']
+
+# Records whose attached file can be downloaded, by URL segment
+ATTACHMENT_MODELS = {
+    'constitutions': (OrganizationConstitution, 'document_path'),
+    'membership-lists': (MembershipList, 'document_path'),
+    'agreements': (Agreement, 'document_path'),
+    'amendments': (AgreementAmendment, 'document_path'),
+    'disputes': (Dispute, 'document_path'),
+    'compliance-records': (ComplianceRecord, 'document_path'),
+    'inspections': (Inspection, 'document_path'),
+    'election-documents': (ElectionDocument, 'file_path'),
+}
+
+# Download a document file
+@files_bp.route('/documents/<document_id>', methods=['GET'])
+@token_required
+def download_document(current_user, document_id):
+    document = Document.query.filter_by(id=document_id).first()
+
+    if not document:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Document not found'
+        }), 404
+
+    if not document.is_public and document.uploaded_by != current_user.id and not _can_read_files(current_user):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to download this document'
+        }), 403
+
+    download_name = document.document_name
+    if document.file_type and not download_name.lower().endswith('.' + document.file_type.lower()):
+        download_name = f'{download_name}.{document.file_type}'
+
+    return _send_stored_file(
+        document.file_path,
+        download_name,
+        mime_type=document.mime_type,
+        sha256=document.sha256 or blob_sha256(document.file_path)
+    )
+
+# Stream a ZIP of every file linked to the selected organizations, with a manifest
+@files_bp.route('/bundle', methods=['GET'])
+@token_required
+def download_bundle(current_user):
+    if not _can_read_files(current_user):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to download file bundles'
+        }), 403
+
+    organization_ids = request.args.getlist('organizationId')
+    region_id = request.args.get('region', None, type=int)
+    district_id = request.args.get('district', None, type=int)
+    type_id = request.args.get('type', None, type=int)
+    status = request.args.get('status', None)
+
+    if not (organization_ids or region_id or district_id or type_id or status):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'organizationId or an organization filter (region, district, type, status) is required'
+        }), 400
+
+    organizations = db.session.query(Organization.id, Organization.registration_number)
+    if organization_ids:
+        organizations = organizations.filter(Organization.id.in_(organization_ids))
+    organizations = apply_organization_filters(organizations, region_id, district_id, type_id, status)
+
+    first_two = organizations.limit(2).all()
+    if not first_two:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'No organizations match the selection'
+        }), 404
+
+    if len(first_two) == 1:
+        filename = f'{secure_filename(first_two[0].registration_number) or "organization"}-files.zip'
+    else:
+        filename = f'organization-files-{datetime.utcnow().strftime("%Y%m%d")}.zip'
+
+    org_ids = organizations.with_entities(Organization.id).subquery()
+    rows = db.session.execute(_bundle_query(db.select(org_ids.c.id)).execution_options(yield_per=500))
+
+    response = Response(
+        stream_with_context(stream_zip(_bundle_entries(rows), chunk_size=UPLOAD_CHUNK_SIZE)),
+        mimetype='application/zip',
+        direct_passthrough=True
+    )
+    response.headers['Content-Disposition'] = _content_disposition(filename, True)
+    response.headers['Cache-Control'] = 'private, no-store'
+    # Ask nginx not to buffer, so the download starts with the first member
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# Get a rendered thumbnail or preview; URLs are content-addressed, so cacheable forever
+@files_bp.route('/previews/<sha256>/<kind>', methods=['GET'])
+@token_required
+def get_preview(current_user, sha256, kind):
+    blob = db.session.get(StoredBlob, sha256) if len(sha256) == 64 else None
+    derivative = (blob.derivatives or {}).get(kind) if blob else None
+
+    if not derivative:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Preview not available'
+        }), 404
+
+    # Staff see everything; others only previews of documents they could download
+    if not _can_read_files(current_user):
+        visible = Document.query.filter(
+            Document.file_path == blob_reference(sha256),
+            or_(Document.is_public == True, Document.uploaded_by == current_user.id)
+        ).first()
+        if not visible:
+            return jsonify({
+                'success': False,
+                'error': 'Forbidden',
+                'message': 'You do not have permission to view this preview'
+            }), 403
+
+    etag = f'{sha256}-{kind}'
+    cache_control = 'private, max-age=31536000, immutable'
+
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        return response
+
+    storage = get_storage()
+    path = storage.local_path(derivative['key'])
+    if path is not None:
+        response = send_file(path, mimetype=derivative['mimeType'], conditional=True, etag=etag)
+    elif current_app.config.get('STORAGE_REDIRECT_DOWNLOADS'):
+        response = redirect(storage.presigned_url(derivative['key'], mime_type=derivative['mimeType']), 302)
+    else:
+        body = storage.open(derivative['key'])
+        try:
+            data = body.read()
+        finally:
+            body.close()
+        response = make_response(data)
+        response.mimetype = derivative['mimeType']
+        response.set_etag(etag)
+
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+# Download the file attached to a constitution, membership list, agreement, etc.
+@files_bp.route('/<kind>/<record_id>', methods=['GET'])
+@token_required
+def download_attachment(current_user, kind, record_id):
+    if kind not in ATTACHMENT_MODELS:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Unknown file type'
+        }), 404
+
+    if not _can_read_files(current_user):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to download this file'
+        }), 403
+
+    model, column = ATTACHMENT_MODELS[kind]
+    record = model.query.filter_by(id=record_id).first()
+    reference = getattr(record, column) if record else None
+
+    if not reference:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'File not found'
+        }), 404
+
+    sha256 = blob_sha256(reference)
+    blob = db.session.get(StoredBlob, sha256) if sha256 else None
+    mime_type = blob.mime_type if blob else mimetypes.guess_type(reference)[0]
+
+    extension = os.path.splitext(reference)[1] if not sha256 else mimetypes.guess_extension(mime_type or '') or ''
+    download_name = f'{kind.rstrip("s")}-{record_id}{extension}'
+
+    return _send_stored_file(reference, download_name, mime_type=mime_type, sha256=sha256)
+
+def _bundle_query(org_ids):
+    """
+    One streamed query over every file-bearing record of the organizations,
+    with the owner's registration number and the blob metadata joined in.
+    """
+    agreement_in_orgs = or_(Agreement.primary_organization_id.in_(org_ids), Agreement.counterparty_organization_id.in_(org_ids))
+    agreement_owner = case(
+        (Agreement.primary_organization_id.in_(org_ids), Agreement.primary_organization_id),
+        else_=Agreement.counterparty_organization_id
+    )
+    document_owner = func.coalesce(
+        Document.organization_id,
+        db.select(Agreement.primary_organization_id).where(Agreement.id == Document.agreement_id).scalar_subquery()
+    )
+
+    def source(category, model, owner, label, reference, condition, *joins):
+        statement = db.select(
+            literal(category).label('category'),
+            cast(model.id, String).label('record_id'),
+            owner.label('owner_id'),
+            cast(label, String).label('label'),
+            reference.label('reference')
+        )
+        for target, on in joins:
+            statement = statement.join(target, on)
+        return statement.where(condition, reference.isnot(None), reference != '')
+
+    files = db.union_all(
+        source('documents', Document, document_owner, Document.document_name, Document.file_path,
+               or_(Document.organization_id.in_(org_ids), Document.agreement_id.in_(db.select(Agreement.id).where(agreement_in_orgs)))),
+        source('constitutions', OrganizationConstitution, OrganizationConstitution.organization_id,
+               func.concat('constitution-v', OrganizationConstitution.version_number), OrganizationConstitution.document_path,
+               OrganizationConstitution.organization_id.in_(org_ids)),
+        source('agreements', Agreement, agreement_owner, Agreement.agreement_number, Agreement.document_path, agreement_in_orgs),
+        source('amendments', AgreementAmendment, agreement_owner,
+               func.concat(Agreement.agreement_number, '-amendment-', AgreementAmendment.amendment_number), AgreementAmendment.document_path,
+               agreement_in_orgs, (Agreement, Agreement.id == AgreementAmendment.agreement_id)),
+        source('disputes', Dispute, Dispute.organization_id, Dispute.dispute_number, Dispute.document_path,
+               Dispute.organization_id.in_(org_ids)),
+        source('membership-lists', MembershipList, MembershipList.organization_id,
+               func.concat('membership-list-', MembershipList.submission_date), MembershipList.document_path,
+               MembershipList.organization_id.in_(org_ids)),
+        source('compliance-records', ComplianceRecord, ComplianceRecord.organization_id,
+               func.concat('compliance-', ComplianceRecord.requirement_id, '-', ComplianceRecord.due_date), ComplianceRecord.document_path,
+               ComplianceRecord.organization_id.in_(org_ids)),
+        source('inspections', Inspection, Inspection.organization_id,
+               func.concat('inspection-', Inspection.inspection_type, '-', Inspection.inspection_date), Inspection.document_path,
+               Inspection.organization_id.in_(org_ids)),
+    ).subquery()
+
+    return db.select(
+        files.c.category,
+        files.c.record_id,
+        files.c.label,
+        files.c.reference,
+        Organization.registration_number,
+        StoredBlob.sha256,
+        StoredBlob.mime_type,
+        StoredBlob.size
+    ).select_from(files).outerjoin(
+        Organization, Organization.id == files.c.owner_id
+    ).outerjoin(
+        StoredBlob, StoredBlob.sha256 == func.substr(files.c.reference, len(BLOB_PREFIX) + 1)
+    ).order_by(Organization.registration_number, files.c.category, files.c.label)
+
+def _bundle_entries(rows):
+    manifest = []
+    used_names = set()
+
+    for row in rows:
+        if blob_sha256(row.reference):
+            available = row.sha256 is not None
+            size, mime_type, sha256 = row.size, row.mime_type, row.sha256
+            extension = mimetypes.guess_extension(mime_type or '') or ''
+        else:
+            # None when the path leads outside the upload folder
+            path = resolve_path(row.reference)
+            available = path is not None and os.path.isfile(path)
+            size = os.path.getsize(path) if available else None
+            mime_type = mimetypes.guess_type(row.reference)[0]
+            sha256 = None
+            extension = os.path.splitext(row.reference)[1]
+
+        name = secure_filename(row.label or '') or row.record_id
+        if extension and name.lower().endswith(extension.lower()):
+            extension = ''
+        arcname = f'{secure_filename(row.registration_number or "") or "unassigned"}/{row.category}/{name}{extension}'
+        base, suffix = os.path.splitext(arcname)
+        counter = 1
+        while arcname in used_names:
+            counter += 1
+            arcname = f'{base}-{counter}{suffix}'
+        used_names.add(arcname)
+
+        manifest.append([
+            arcname if available else '', row.category, row.record_id, row.registration_number,
+            row.label, size, mime_type, sha256, 'included' if available else 'missing'
+        ])
+        if available:
+            yield arcname, partial(open_stored, row.reference), size, should_compress(mime_type)
+
+    # Written last so it can record files that were missing from storage
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(['path', 'category', 'recordId', 'registrationNumber', 'label', 'size', 'mimeType', 'sha256', 'status'])
+    writer.writerows(manifest)
+    yield 'manifest.csv', partial(io.BytesIO, text.getvalue().encode('utf-8')), None, True
+
+def _can_read_files(user):
+    return user.role and any(role in user.role.role_code for role in FILE_READER_ROLES)
+
+def _send_stored_file(reference, download_name, mime_type=None, sha256=None):
+    path = resolve_path(reference)
+    as_attachment = request.args.get('inline', 'false').lower() != 'true'
+
+    # Blob held by a remote backend
+    if path is None and blob_sha256(reference):
+        return _send_remote_blob(reference, download_name, mime_type, as_attachment)
+
+    if not path or not os.path.isfile(path):
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'File not found in storage'
+        }), 404
+
+    # Hand the transfer to the reverse proxy when it can see the file; access
+    # has already been checked, so no Python worker is held for the body
+    if current_app.config.get('FILE_SERVE_MODE') == 'x-accel-redirect':
+        root = os.path.realpath(upload_root())
+        absolute = os.path.realpath(path)
+        if absolute.startswith(root + os.sep):
+            return _accel_redirect_response(absolute[len(root) + 1:], download_name, mime_type, sha256, as_attachment)
+
+    # send_file answers Range, If-Range and If-None-Match itself; with
+    # USE_X_SENDFILE set it emits X-Sendfile instead of the body. The content
+    # hash is a strong ETag; legacy files without one fall back to werkzeug's
+    response = send_file(
+        path,
+        mimetype=mime_type,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True,
+        etag=sha256 or True
+    )
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _accel_redirect_response(relative_path, download_name, mime_type, sha256, as_attachment):
+    if sha256 and request.if_none_match.contains(sha256):
+        response = make_response('', 304)
+        response.set_etag(sha256)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    prefix = current_app.config.get('FILE_ACCEL_PREFIX', '/protected-uploads/').rstrip('/')
+    response = make_response('')
+    response.headers['X-Accel-Redirect'] = f'{prefix}/{quote(relative_path.replace(os.sep, "/"))}'
+    response.headers['Content-Type'] = mime_type or 'application/octet-stream'
+    response.headers['Content-Disposition'] = _content_disposition(download_name, as_attachment)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if sha256:
+        response.set_etag(sha256)
+    # nginx serves Range requests for the internal location itself
+    del response.headers['Content-Length']
+    return response
+
+def _send_remote_blob(reference, download_name, mime_type, as_attachment):
+    sha256 = blob_sha256(reference)
+    blob = db.session.get(StoredBlob, sha256)
+
+    if not blob:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'File not found in storage'
+        }), 404
+
+    mime_type = mime_type or blob.mime_type or 'application/octet-stream'
+
+    if request.if_none_match.contains(sha256):
+        response = make_response('', 304)
+        response.set_etag(sha256)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    # Let the client fetch straight from object storage; ranges and
+    # conditional requests are then answered by the store itself
+    if current_app.config.get('STORAGE_REDIRECT_DOWNLOADS'):
+        url = get_storage().presigned_url(blob_key(sha256), download_name=download_name, mime_type=mime_type)
+        if url:
+            response = redirect(url, 302)
+            response.headers['Cache-Control'] = 'private, no-store'
+            return response
+
+    # Content never changes under its hash, so the blob's creation time is
+    # its Last-Modified; a date If-Range must match it exactly (RFC 7233),
+    # anything else gets the full body
+    last_modified = blob.created_at.replace(microsecond=0, tzinfo=timezone.utc) if blob.created_at else None
+    if_range = request.if_range
+    if if_range.etag is not None:
+        range_valid = if_range.etag == sha256
+    elif if_range.date is not None:
+        range_valid = last_modified is not None and if_range.date == last_modified
+    else:
+        range_valid = True
+
+    start, end, status = 0, blob.size - 1, 200
+    byte_range = request.range
+    if byte_range and range_valid:
+        bounds = byte_range.range_for_length(blob.size)
+        if bounds is None:
+            response = make_response('', 416)
+            response.content_range = ContentRange('bytes', None, None, blob.size)
+            return response
+        start, end, status = bounds[0], bounds[1] - 1, 206
+
+    body = open_stored(reference, start, end)
+
+    def generate():
+        try:
+            for chunk in iter(lambda: body.read(UPLOAD_CHUNK_SIZE), b''):
+                yield chunk
+        finally:
+            body.close()
+
+    response = Response(generate(), status=status, mimetype=mime_type, direct_passthrough=True)
+    response.content_length = end - start + 1
+    response.accept_ranges = 'bytes'
+    if status == 206:
+        response.content_range = ContentRange('bytes', start, end + 1, blob.size)
+    response.set_etag(sha256)
+    response.last_modified = last_modified
+    response.headers['Content-Disposition'] = _content_disposition(download_name, as_attachment)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    filename = filename.replace('"', '')
+    try:
+        filename.encode('ascii')
+        return f'{disposition}; filename="{filename}"'
+    except UnicodeEncodeError:
+        fallback = filename.encode('ascii', 'ignore').decode('ascii') or 'download'
+        return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
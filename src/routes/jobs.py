@@ -0,0 +1,105 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+
+from src.extensions import db
+from src.models.job import ProcessingJob
+from src.routes.auth import token_required
+
+jobs_bp = Blueprint('jobs', __name__)
+
+# Get processing jobs with pagination and filtering
+@jobs_bp.route('', methods=['GET'])
+@token_required
+def get_jobs(current_user):
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('pageSize', 20, type=int), 200)
+    job_type = request.args.get('jobType', None)
+    target_type = request.args.get('targetType', None)
+    target_id = request.args.get('targetId', None)
+    status = request.args.get('status', None)
+
+    query = ProcessingJob.query
+
+    if job_type:
+        query = query.filter(ProcessingJob.job_type == job_type)
+    if target_type:
+        query = query.filter(ProcessingJob.target_type == target_type)
+    if target_id:
+        query = query.filter(ProcessingJob.target_id == target_id)
+    if status:
+        query = query.filter(ProcessingJob.status == status)
+
+    paginated_jobs = query.order_by(ProcessingJob.created_at.desc()).paginate(page=page, per_page=per_page)
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'items': [job.to_dict() for job in paginated_jobs.items],
+            'total': paginated_jobs.total,
+            'page': page,
+            'pageSize': per_page,
+            'totalPages': paginated_jobs.pages
+        },
+        'message': 'Jobs retrieved successfully'
+    }), 200
+
+# Get processing job by ID
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    job = ProcessingJob.query.filter_by(id=job_id).first()
+
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Job not found'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': job.to_dict(),
+        'message': 'Job retrieved successfully'
+    }), 200
+
+# Retry a failed processing job
+@jobs_bp.route('/<job_id>/retry', methods=['POST'])
+@token_required
+def retry_job(current_user, job_id):
+    if not current_user.role or 'ADMIN' not in current_user.role.role_code:
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to retry jobs'
+        }), 403
+
+    job = ProcessingJob.query.filter_by(id=job_id).with_for_update().first()
+
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Job not found'
+        }), 404
+
+    if job.status != 'failed':
+        status = job.status
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': f'Only failed jobs can be retried; job is {status}'
+        }), 409
+
+    job.status = 'queued'
+    job.attempts = 0
+    job.error = None
+    job.finished_at = None
+    job.run_after = datetime.utcnow()
+    db.session.commit()
+
+    return jsonify({
+        'success': True,
+        'data': job.to_dict(),
+        'message': 'Job queued for retry'
+    }), 200
@@ -1,15 +1,59 @@
 from flask import Blueprint, request, jsonify
 from functools import wraps
+import os
 import uuid
 from datetime import datetime
+from sqlalchemy.orm import aliased, joinedload
 
 from src.extensions import db
 from src.models.organization import Organization, OrganizationType, OrganizationOfficial, OrganizationConstitution
+from src.models.membership import MembershipList, MembershipListEntry, MembershipListChange, MemberIdentityIndex
 from src.models.region import Region, District
 from src.routes.auth import token_required
+from src.utils.blobs import client_reference_error, store_blob
+from src.utils.export import export_format_error, export_response
+from src.utils.extraction import UnsupportedContent
+from src.utils.jobs import enqueue_job
+from src.utils.member_index import overlapping_entries
+from src.utils.organization_import import import_organizations
+from src.utils.storage import upload_path, receive_upload
 
 organizations_bp = Blueprint('organizations', __name__)
 
+# Roles that may see members' details across organizations
+MEMBER_VETTING_ROLES = ['ADMIN', 'REGISTRAR', 'DEPUTY_REGISTRAR', 'INSPECTOR']
+
+# Aliased so they cannot clash with the join made by the region filter
+EXPORT_TYPE = aliased(OrganizationType)
+EXPORT_DISTRICT = aliased(District)
+EXPORT_REGION = aliased(Region)
+
+ORGANIZATION_EXPORT_COLUMNS = [
+    ('registrationNumber', Organization.registration_number),
+    ('organizationName', Organization.organization_name),
+    ('organizationType', EXPORT_TYPE.type_name),
+    ('registrationDate', Organization.registration_date),
+    ('expiryDate', Organization.expiry_date),
+    ('status', Organization.status),
+    ('address', Organization.address),
+    ('district', EXPORT_DISTRICT.district_name),
+    ('region', EXPORT_REGION.region_name),
+    ('contactPerson', Organization.contact_person),
+    ('contactEmail', Organization.contact_email),
+    ('contactPhone', Organization.contact_phone),
+    ('website', Organization.website),
+    ('membershipCount', Organization.membership_count),
+    ('isCompliant', Organization.is_compliant),
+    ('lastComplianceCheck', Organization.last_compliance_check),
+    ('id', Organization.id),
+]
+
+ORGANIZATION_EXPORT_JOINS = [
+    (EXPORT_TYPE, EXPORT_TYPE.id == Organization.organization_type_id),
+    (EXPORT_DISTRICT, EXPORT_DISTRICT.id == Organization.district_id),
+    (EXPORT_REGION, EXPORT_REGION.id == EXPORT_DISTRICT.region_id),
+]
+
 # Get all organizations with pagination and filtering
 @organizations_bp.route('', methods=['GET'])
 @token_required
@@ -23,6 +67,14 @@ def get_organizations(current_user):
     district_id = request.args.get('district', None, type=int)
     region_id = request.args.get('region', None, type=int)
     is_compliant = request.args.get('isCompliant', None)
+    export_format = request.args.get('format', None)
+    
+    if export_format and export_format_error(export_format):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': export_format_error(export_format)
+        }), 400
     
     # Build query
     query = Organization.query
@@ -50,6 +102,16 @@ def get_organizations(current_user):
         is_compliant_bool = is_compliant.lower() == 'true'
         query = query.filter(Organization.is_compliant == is_compliant_bool)
     
+    # Stream every matching row instead of a page
+    if export_format:
+        return export_response(
+            query.order_by(Organization.organization_name),
+            ORGANIZATION_EXPORT_COLUMNS,
+            'organizations',
+            export_format,
+            joins=ORGANIZATION_EXPORT_JOINS
+        )
+    
     # Paginate results
     paginated_orgs = query.order_by(Organization.organization_name).paginate(page=page, per_page=per_page)
     
@@ -172,6 +234,48 @@ def create_organization(current_user):
         'message': 'Organization created successfully'
     }), 201
 
+# Import organizations from a CSV/XLSX registry file, upserting by registration number
+@organizations_bp.route('/import', methods=['POST'])
+@token_required
+def import_organizations_file(current_user):
+    if not current_user.role or not any(role in current_user.role.role_code for role in ['ADMIN', 'REGISTRAR']):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to import organizations'
+        }), 403
+    
+    if 'file' not in request.files or request.files['file'].filename == '':
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'No file provided'
+        }), 400
+    
+    file = request.files['file']
+    dry_run = str(request.values.get('dryRun', 'false')).lower() == 'true'
+    
+    _, extension = os.path.splitext(file.filename)
+    temp_path = upload_path('tmp', f'organization-import-{uuid.uuid4().hex}{extension.lower()}')
+    file.save(temp_path)
+    
+    try:
+        report = import_organizations(temp_path, file.mimetype, dry_run=dry_run)
+    except UnsupportedContent as e:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': str(e)
+        }), 400
+    finally:
+        os.remove(temp_path)
+    
+    return jsonify({
+        'success': True,
+        'data': report,
+        'message': 'Organization import checked' if dry_run else 'Organizations imported successfully'
+    }), 200
+
 # Update organization
 @organizations_bp.route('/<organization_id>', methods=['PUT'])
 @token_required
@@ -524,6 +628,10 @@ def get_organization_constitutions(current_user, organization_id):
 @organizations_bp.route('/<organization_id>/constitutions', methods=['POST'])
 @token_required
 def create_organization_constitution(current_user, organization_id):
+    # A file sent with the form is stored and OCR'd in one step
+    if request.mimetype == 'multipart/form-data':
+        return _upload_organization_constitution(organization_id)
+    
     data = request.get_json()
     
     if not data:
@@ -587,6 +695,15 @@ def create_organization_constitution(current_user, organization_id):
                 'message': 'Invalid approval date format'
             }), 400
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Create new constitution
     new_constitution = OrganizationConstitution(
         id=uuid.uuid4(),
@@ -601,6 +718,11 @@ def create_organization_constitution(current_user, organization_id):
     )
     
     db.session.add(new_constitution)
+    
+    # Text extraction / OCR runs in the background workers; previews were
+    # queued when the referenced content was first stored
+    if new_constitution.document_path:
+        enqueue_job('extract_text', 'constitution', new_constitution.id)
     db.session.commit()
     
     return jsonify({
@@ -609,6 +731,77 @@ def create_organization_constitution(current_user, organization_id):
         'message': 'Organization constitution created successfully'
     }), 201
 
+def _upload_organization_constitution(organization_id):
+    organization = Organization.query.filter_by(id=organization_id).first()
+    
+    if not organization:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Organization not found'
+        }), 404
+    
+    writer, form = receive_upload(request)
+    
+    if writer is None:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'No file provided'
+        }), 400
+    
+    version_number = form.get('versionNumber', type=int)
+    effective_date = form.get('effectiveDate')
+    
+    if not version_number or not effective_date:
+        writer.discard()
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'Version number and effective date are required'
+        }), 400
+    
+    try:
+        effective_date_obj = datetime.fromisoformat(effective_date.replace('Z', '+00:00'))
+    except ValueError:
+        writer.discard()
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'Invalid effective date format'
+        }), 400
+    
+    if OrganizationConstitution.query.filter_by(organization_id=organization.id, version_number=version_number).first():
+        writer.discard()
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': 'Version number already exists for this organization'
+        }), 409
+    
+    new_constitution = OrganizationConstitution(
+        id=uuid.uuid4(),
+        organization_id=organization.id,
+        version_number=version_number,
+        effective_date=effective_date_obj.date(),
+        document_path=store_blob(writer),
+        status=form.get('status', 'pending'),
+        notes=form.get('notes')
+    )
+    
+    db.session.add(new_constitution)
+    
+    # Text extraction / OCR runs in the background workers; ocr_content is
+    # filled in when the job completes
+    enqueue_job('extract_text', 'constitution', new_constitution.id)
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'data': new_constitution.to_dict(),
+        'message': 'Constitution uploaded successfully'
+    }), 201
+
 # Update organization constitution
 @organizations_bp.route('/constitutions/<constitution_id>', methods=['PUT'])
 @token_required
@@ -631,6 +824,15 @@ def update_organization_constitution(current_user, constitution_id):
             'message': 'Constitution not found'
         }), 404
     
+    # Only files the caller uploaded can be attached
+    reference_error = client_reference_error(data.get('documentPath'), current_user, constitution.document_path)
+    if reference_error:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': reference_error
+        }), 400
+    
     # Check if version number already exists for another constitution
     if 'versionNumber' in data and data['versionNumber'] != constitution.version_number:
         existing_constitution = OrganizationConstitution.query.filter_by(
@@ -651,6 +853,9 @@ def update_organization_constitution(current_user, constitution_id):
     if 'status' in data:
         constitution.status = data['status']
     if 'documentPath' in data:
+        if data['documentPath'] and data['documentPath'] != constitution.document_path:
+            # New content needs its text extracted again
+            enqueue_job('extract_text', 'constitution', constitution.id)
         constitution.document_path = data['documentPath']
     if 'notes' in data:
         constitution.notes = data['notes']
@@ -713,6 +918,338 @@ def delete_organization_constitution(current_user, constitution_id):
         'message': 'Organization constitution deleted successfully'
     }), 200
 
+# Get membership lists for an organization
+@organizations_bp.route('/<organization_id>/membership-lists', methods=['GET'])
+@token_required
+def get_membership_lists(current_user, organization_id):
+    organization = Organization.query.filter_by(id=organization_id).first()
+    
+    if not organization:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Organization not found'
+        }), 404
+    
+    membership_lists = MembershipList.query.filter_by(organization_id=organization_id).order_by(MembershipList.submission_date.desc()).all()
+    
+    return jsonify({
+        'success': True,
+        'data': [membership_list.to_dict() for membership_list in membership_lists],
+        'message': 'Membership lists retrieved successfully'
+    }), 200
+
+# Upload a membership list, streamed to storage and imported in the background
+@organizations_bp.route('/<organization_id>/membership-lists', methods=['POST'])
+@token_required
+def upload_membership_list(current_user, organization_id):
+    organization = Organization.query.filter_by(id=organization_id).first()
+    
+    if not organization:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Organization not found'
+        }), 404
+    
+    writer, form = receive_upload(request)
+    
+    if writer is None:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'No file provided'
+        }), 400
+    
+    submission_date = form.get('submissionDate')
+    declared_count = form.get('memberCount')
+    
+    if not submission_date:
+        writer.discard()
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'Submission date is required'
+        }), 400
+    
+    try:
+        submission_date_obj = datetime.fromisoformat(submission_date.replace('Z', '+00:00'))
+        declared_count = int(declared_count) if declared_count not in (None, '') else None
+    except ValueError:
+        writer.discard()
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'Invalid submission date or member count'
+        }), 400
+    
+    # Counts and change percentage are filled in from the parsed file by
+    # the import job
+    new_membership_list = MembershipList(
+        id=uuid.uuid4(),
+        organization_id=organization.id,
+        submission_date=submission_date_obj.date(),
+        submitted_by=form.get('submittedBy') or current_user.username,
+        member_count=declared_count or 0,
+        declared_count=declared_count,
+        status='submitted',
+        document_path=store_blob(writer),
+        notes=form.get('notes'),
+        import_status='pending'
+    )
+    
+    db.session.add(new_membership_list)
+    enqueue_job('import_members', 'membership_list', new_membership_list.id)
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'data': new_membership_list.to_dict(),
+        'message': 'Membership list uploaded successfully; members are being imported'
+    }), 201
+
+# Get the import result of a membership list, including row errors
+@organizations_bp.route('/membership-lists/<list_id>/import', methods=['GET'])
+@token_required
+def get_membership_list_import(current_user, list_id):
+    membership_list = MembershipList.query.filter_by(id=list_id).first()
+    
+    if not membership_list:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Membership list not found'
+        }), 404
+    
+    data = membership_list.to_dict()
+    data['importErrors'] = membership_list.import_errors or []
+    
+    return jsonify({
+        'success': True,
+        'data': data,
+        'message': 'Membership list import retrieved successfully'
+    }), 200
+
+# Get the members parsed from a membership list
+@organizations_bp.route('/membership-lists/<list_id>/members', methods=['GET'])
+@token_required
+def get_membership_list_members(current_user, list_id):
+    if not current_user.role or not any(role in current_user.role.role_code for role in MEMBER_VETTING_ROLES):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to view membership list members'
+        }), 403
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('pageSize', 50, type=int), 500)
+    search = request.args.get('search', '')
+    
+    membership_list = MembershipList.query.filter_by(id=list_id).first()
+    
+    if not membership_list:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Membership list not found'
+        }), 404
+    
+    query = MembershipListEntry.query.filter_by(membership_list_id=membership_list.id)
+    
+    if search:
+        query = query.filter(
+            (MembershipListEntry.first_name.ilike(f'%{search}%')) |
+            (MembershipListEntry.last_name.ilike(f'%{search}%')) |
+            (MembershipListEntry.member_number.ilike(f'%{search}%')) |
+            (MembershipListEntry.national_id.ilike(f'%{search}%'))
+        )
+    
+    paginated_entries = query.order_by(MembershipListEntry.row_number).paginate(page=page, per_page=per_page)
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'items': [entry.to_dict() for entry in paginated_entries.items],
+            'total': paginated_entries.total,
+            'page': page,
+            'pageSize': per_page,
+            'totalPages': paginated_entries.pages
+        },
+        'message': 'Membership list members retrieved successfully'
+    }), 200
+
+# Get who joined, left or changed since the previous membership list
+@organizations_bp.route('/membership-lists/<list_id>/changes', methods=['GET'])
+@token_required
+def get_membership_list_changes(current_user, list_id):
+    if not current_user.role or not any(role in current_user.role.role_code for role in MEMBER_VETTING_ROLES):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to view membership list changes'
+        }), 403
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('pageSize', 50, type=int), 500)
+    change_type = request.args.get('changeType', None)
+    
+    membership_list = MembershipList.query.filter_by(id=list_id).first()
+    
+    if not membership_list:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Membership list not found'
+        }), 404
+    
+    query = MembershipListChange.query.filter_by(membership_list_id=membership_list.id).options(
+        joinedload(MembershipListChange.entry),
+        joinedload(MembershipListChange.previous_entry),
+        joinedload(MembershipListChange.duplicate_of)
+    )
+    
+    if change_type:
+        query = query.filter(MembershipListChange.change_type == change_type)
+    
+    paginated_changes = query.order_by(MembershipListChange.id).paginate(page=page, per_page=per_page)
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'summary': membership_list.diff_summary,
+            'items': [change.to_dict() for change in paginated_changes.items],
+            'total': paginated_changes.total,
+            'page': page,
+            'pageSize': per_page,
+            'totalPages': paginated_changes.pages
+        },
+        'message': 'Membership list changes retrieved successfully'
+    }), 200
+
+# Get members of a membership list that other organizations also list
+@organizations_bp.route('/membership-lists/<list_id>/overlaps', methods=['GET'])
+@token_required
+def get_membership_list_overlaps(current_user, list_id):
+    if not current_user.role or not any(role in current_user.role.role_code for role in MEMBER_VETTING_ROLES):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to view membership overlaps'
+        }), 403
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('pageSize', 50, type=int), 500)
+    
+    membership_list = MembershipList.query.filter_by(id=list_id).first()
+    
+    if not membership_list:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Membership list not found'
+        }), 404
+    
+    overlaps = overlapping_entries(membership_list)
+    total = db.session.query(db.func.count()).select_from(overlaps).scalar()
+    rows = db.session.execute(
+        db.select(overlaps).order_by(overlaps.c.entry_id, overlaps.c.organization_id, overlaps.c.key_type)
+        .limit(per_page).offset((page - 1) * per_page)
+    ).all()
+    
+    entry_ids = {row.entry_id for row in rows} | {row.other_entry_id for row in rows}
+    entries = {entry.id: entry for entry in MembershipListEntry.query.filter(MembershipListEntry.id.in_(entry_ids))}
+    organizations = {
+        organization.id: organization
+        for organization in Organization.query.filter(Organization.id.in_({row.organization_id for row in rows}))
+    }
+    
+    items = [{
+        'entry': entries[row.entry_id].to_dict(),
+        'matchedOn': row.key_type,
+        'organizationId': str(row.organization_id),
+        'organizationName': organizations[row.organization_id].organization_name,
+        'otherEntry': entries[row.other_entry_id].to_dict()
+    } for row in rows]
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'summary': membership_list.overlap_summary,
+            'items': items,
+            'total': total,
+            'page': page,
+            'pageSize': per_page,
+            'totalPages': (total + per_page - 1) // per_page
+        },
+        'message': 'Membership overlaps retrieved successfully'
+    }), 200
+
+# Report people listed as members of more than one organization
+@organizations_bp.route('/dual-memberships', methods=['GET'])
+@token_required
+def get_dual_memberships(current_user):
+    if not current_user.role or not any(role in current_user.role.role_code for role in MEMBER_VETTING_ROLES):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden',
+            'message': 'You do not have permission to view dual memberships'
+        }), 403
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('pageSize', 20, type=int), 200)
+    key_type = request.args.get('matchedOn', None)
+    organization_id = request.args.get('organizationId', None)
+    
+    organization_count = db.func.count(MemberIdentityIndex.organization_id)
+    groups = db.session.query(
+        MemberIdentityIndex.key_type, MemberIdentityIndex.block_key, organization_count.label('organizations')
+    ).group_by(MemberIdentityIndex.key_type, MemberIdentityIndex.block_key).having(organization_count > 1)
+    
+    if key_type:
+        groups = groups.filter(MemberIdentityIndex.key_type == key_type)
+    if organization_id:
+        groups = groups.having(db.func.bool_or(MemberIdentityIndex.organization_id == organization_id))
+    
+    total = groups.order_by(None).count()
+    page_groups = groups.order_by(organization_count.desc(), MemberIdentityIndex.block_key).limit(per_page).offset((page - 1) * per_page).all()
+    
+    # Everyone in this page's groups, in one query
+    members = {}
+    if page_groups:
+        rows = MemberIdentityIndex.query.options(
+            joinedload(MemberIdentityIndex.entry),
+            joinedload(MemberIdentityIndex.organization)
+        ).filter(
+            db.tuple_(MemberIdentityIndex.key_type, MemberIdentityIndex.block_key).in_(
+                [(group.key_type, group.block_key) for group in page_groups]
+            )
+        ).all()
+        for row in rows:
+            members.setdefault((row.key_type, row.block_key), []).append({
+                'organizationId': str(row.organization_id),
+                'organizationName': row.organization.organization_name,
+                'membershipListId': str(row.membership_list_id),
+                'entry': row.entry.to_dict()
+            })
+    
+    items = [{
+        'matchedOn': group.key_type,
+        'organizations': group.organizations,
+        'members': members.get((group.key_type, group.block_key), [])
+    } for group in page_groups]
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'items': items,
+            'total': total,
+            'page': page,
+            'pageSize': per_page,
+            'totalPages': (total + per_page - 1) // per_page
+        },
+        'message': 'Dual memberships retrieved successfully'
+    }), 200
+
 # Get regions
 @organizations_bp.route('/regions', methods=['GET'])
 @token_required
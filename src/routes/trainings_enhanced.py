@@ -4,12 +4,31 @@ import uuid
 from datetime import datetime
 
 from src.extensions import db
+from src.models.organization import Organization
 from src.models.training import TrainingWorkshop, WorkshopParticipant
 from src.models.user import User
 from src.routes.auth import token_required
+from src.utils.export import export_format_error, export_response
 
 trainings_enhanced_bp = Blueprint('trainings_enhanced', __name__)
 
+PARTICIPANT_EXPORT_COLUMNS = [
+    ('firstName', WorkshopParticipant.first_name),
+    ('lastName', WorkshopParticipant.last_name),
+    ('email', WorkshopParticipant.email),
+    ('phone', WorkshopParticipant.phone),
+    ('organizationRegistrationNumber', Organization.registration_number),
+    ('organization', Organization.organization_name),
+    ('attendanceStatus', WorkshopParticipant.attendance_status),
+    ('certificateIssued', WorkshopParticipant.certificate_issued),
+    ('notes', WorkshopParticipant.notes),
+    ('id', WorkshopParticipant.id),
+]
+
+PARTICIPANT_EXPORT_JOINS = [
+    (Organization, Organization.id == WorkshopParticipant.organization_id),
+]
+
 # Get all training workshops with pagination and filtering
 @trainings_enhanced_bp.route('', methods=['GET'])
 @token_required
@@ -257,6 +276,15 @@ def delete_training_workshop(current_user, workshop_id):
 @trainings_enhanced_bp.route('/<workshop_id>/participants', methods=['GET'])
 @token_required
 def get_workshop_participants(current_user, workshop_id):
+    export_format = request.args.get('format', None)
+    
+    if export_format and export_format_error(export_format):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': export_format_error(export_format)
+        }), 400
+    
     workshop = TrainingWorkshop.query.filter_by(id=workshop_id).first()
     
     if not workshop:
@@ -266,7 +294,18 @@ def get_workshop_participants(current_user, workshop_id):
             'message': 'Training workshop not found'
         }), 404
     
-    participants = WorkshopParticipant.query.filter_by(workshop_id=workshop_id).all()
+    query = WorkshopParticipant.query.filter_by(workshop_id=workshop_id)
+    
+    if export_format:
+        return export_response(
+            query.order_by(WorkshopParticipant.last_name, WorkshopParticipant.first_name),
+            PARTICIPANT_EXPORT_COLUMNS,
+            'workshop-participants',
+            export_format,
+            joins=PARTICIPANT_EXPORT_JOINS
+        )
+    
+    participants = query.all()
     
     return jsonify({
         'success': True,
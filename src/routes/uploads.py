@@ -0,0 +1,484 @@
+from flask import Blueprint, request, jsonify, current_app
+import os
+import uuid
+import hashlib
+import threading
+from datetime import datetime, timedelta, date
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_content_range_header
+
+from src.extensions import db
+from src.models.upload import UploadSession
+from src.models.organization import Organization, OrganizationConstitution
+from src.models.membership import MembershipList
+from src.routes.auth import token_required
+from src.routes.documents import validate_document_metadata, create_document_from_upload
+from src.utils.storage import UPLOAD_CHUNK_SIZE, HashingFileWriter, upload_path, file_sha256
+from src.utils.blobs import store_blob
+from src.utils.jobs import enqueue_job
+
+uploads_bp = Blueprint('uploads', __name__)
+
+UPLOAD_TARGETS = ['document', 'constitution', 'membership_list']
+
+# Running SHA-256 per session, keyed by session id as (offset, hash, expires_at).
+# Lets completion skip re-reading the assembled file when every chunk went
+# through this process; otherwise the file is hashed once at completion.
+# Sessions abandoned, or expired by another process, are swept on later
+# writes and the map never holds more than MAX_HASH_STATES entries.
+_hash_states = {}
+_hash_states_lock = threading.Lock()
+MAX_HASH_STATES = 1000
+
+# Create an upload session
+@uploads_bp.route('', methods=['POST'])
+@token_required
+def create_upload_session(current_user):
+    data = request.get_json()
+
+    if not data:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'No data provided'
+        }), 400
+
+    target = data.get('target')
+    if target not in UPLOAD_TARGETS:
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': f'target must be one of: {", ".join(UPLOAD_TARGETS)}'
+        }), 400
+
+    if not data.get('fileName'):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'fileName is required'
+        }), 400
+
+    try:
+        total_size = int(data.get('totalSize'))
+    except (TypeError, ValueError):
+        total_size = 0
+    max_size = current_app.config.get('MAX_RESUMABLE_UPLOAD_BYTES')
+    if total_size <= 0 or (max_size and total_size > max_size):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'totalSize must be a positive number of bytes within the upload limit'
+        }), 400
+
+    metadata = data.get('metadata') or {}
+    error = _validate_target_metadata(target, metadata)
+    if error:
+        return error
+
+    # Sweep abandoned sessions while we are here so the temp area stays small
+    expire_stale_upload_sessions()
+
+    session_id = uuid.uuid4()
+    temp_path = upload_path('sessions', f'{session_id.hex}.part')
+    open(temp_path, 'wb').close()
+
+    upload = UploadSession(
+        id=session_id,
+        target=target,
+        file_name=data['fileName'],
+        total_size=total_size,
+        received_size=0,
+        temp_path=temp_path,
+        status='active',
+        upload_metadata=metadata,
+        created_by=current_user.id,
+        expires_at=_next_expiry()
+    )
+
+    db.session.add(upload)
+    db.session.commit()
+
+    return jsonify({
+        'success': True,
+        'data': upload.to_dict(),
+        'message': 'Upload session created successfully'
+    }), 201
+
+# Get upload session status and the offset to resume from
+@uploads_bp.route('/<session_id>', methods=['GET'])
+@token_required
+def get_upload_session(current_user, session_id):
+    upload = _get_session(current_user, session_id)
+
+    if not upload:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Upload session not found'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': upload.to_dict(),
+        'message': 'Upload session retrieved successfully'
+    }), 200
+
+# Append a chunk at the given offset (query parameter or Content-Range header)
+@uploads_bp.route('/<session_id>', methods=['PUT', 'PATCH'])
+@token_required
+def upload_chunk(current_user, session_id):
+    # Row lock serialises concurrent chunks for the same session
+    upload = _get_session(current_user, session_id, lock=True)
+
+    if not upload:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Upload session not found'
+        }), 404
+
+    error = _check_active(upload)
+    if error:
+        return error
+
+    offset = request.args.get('offset', None, type=int)
+    content_range = parse_content_range_header(request.headers.get('Content-Range'))
+    if offset is None and content_range:
+        offset = content_range.start
+        if content_range.length is not None and content_range.length != upload.total_size:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': 'Bad request',
+                'message': 'Content-Range length does not match the session totalSize'
+            }), 400
+
+    if offset is None:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'offset or Content-Range is required'
+        }), 400
+
+    # Only the next expected byte is accepted; the client resumes from the
+    # returned offset after a lost response or a duplicate send
+    if offset != upload.received_size:
+        data = upload.to_dict()
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': f'Expected offset {data["offset"]}',
+            'data': data
+        }), 409
+
+    state = _hash_states.get(upload.id)
+    if offset == 0:
+        running = hashlib.sha256()
+    elif state and state[0] == offset:
+        running = state[1].copy()
+    else:
+        running = None
+
+    remaining = upload.total_size - offset
+    written = 0
+    with open(upload.temp_path, 'r+b') as f:
+        f.seek(offset)
+        while True:
+            chunk = request.stream.read(min(UPLOAD_CHUNK_SIZE, remaining - written + 1))
+            if not chunk:
+                break
+            if written + len(chunk) > remaining:
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'error': 'Bad request',
+                    'message': 'Chunk extends past the session totalSize'
+                }), 400
+            f.write(chunk)
+            if running is not None:
+                running.update(chunk)
+            written += len(chunk)
+        # Drop bytes left over from an earlier attempt that never committed
+        f.truncate(offset + written)
+
+    upload.received_size = offset + written
+    upload.expires_at = _next_expiry()
+    db.session.commit()
+
+    if running is not None:
+        _remember_hash_state(upload, running)
+    else:
+        _hash_states.pop(upload.id, None)
+
+    return jsonify({
+        'success': True,
+        'data': upload.to_dict(),
+        'message': 'Chunk received successfully'
+    }), 200
+
+# Finalize an upload session and create the target record
+@uploads_bp.route('/<session_id>/complete', methods=['POST'])
+@token_required
+def complete_upload_session(current_user, session_id):
+    upload = _get_session(current_user, session_id, lock=True)
+
+    if not upload:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Upload session not found'
+        }), 404
+
+    error = _check_active(upload)
+    if error:
+        return error
+
+    if upload.received_size != upload.total_size:
+        data = upload.to_dict()
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': f'Upload incomplete: {data["offset"]} of {data["totalSize"]} bytes received',
+            'data': data
+        }), 409
+
+    # Metadata may have gone stale (e.g. document number taken) since creation
+    error = _validate_target_metadata(upload.target, upload.upload_metadata)
+    if error:
+        db.session.rollback()
+        return error
+
+    state = _hash_states.pop(upload.id, None)
+    if state and state[0] == upload.total_size:
+        sha256 = state[1].hexdigest()
+    else:
+        sha256 = file_sha256(upload.temp_path)
+
+    writer = HashingFileWriter.adopt(upload.temp_path, upload.file_name, upload.total_size, sha256)
+    form = MultiDict(upload.upload_metadata)
+
+    # Marked completed in the same transaction that creates the record, so a
+    # concurrent completion waiting on the row lock sees it as finished
+    upload.status = 'completed'
+
+    if upload.target == 'document':
+        record = create_document_from_upload(current_user, writer, form)
+    elif upload.target == 'constitution':
+        record = _create_constitution(writer, form)
+    else:
+        record = _create_membership_list(current_user, writer, form)
+
+    upload.result_id = str(record.id)
+    db.session.commit()
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'session': upload.to_dict(),
+            'result': record.to_dict()
+        },
+        'message': 'Upload completed successfully'
+    }), 201
+
+# Cancel an upload session
+@uploads_bp.route('/<session_id>', methods=['DELETE'])
+@token_required
+def cancel_upload_session(current_user, session_id):
+    upload = _get_session(current_user, session_id, lock=True)
+
+    if not upload:
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Upload session not found'
+        }), 404
+
+    error = _check_active(upload)
+    if error:
+        return error
+
+    _discard_session_file(upload)
+    upload.status = 'cancelled'
+    db.session.commit()
+
+    return jsonify({
+        'success': True,
+        'message': 'Upload session cancelled successfully'
+    }), 200
+
+def expire_stale_upload_sessions():
+    """
+    Mark active sessions past their expiry as expired and delete their
+    partial files. Returns the number of sessions expired.
+    """
+    stale = UploadSession.query.filter(
+        UploadSession.status == 'active',
+        UploadSession.expires_at < datetime.utcnow()
+    ).with_for_update(skip_locked=True).all()
+
+    for upload in stale:
+        _discard_session_file(upload)
+        upload.status = 'expired'
+
+    db.session.commit()
+    return len(stale)
+
+def _get_session(current_user, session_id, lock=False):
+    try:
+        session_uuid = uuid.UUID(session_id)
+    except ValueError:
+        return None
+
+    query = UploadSession.query.filter_by(id=session_uuid, created_by=current_user.id)
+    if lock:
+        query = query.with_for_update()
+    return query.first()
+
+def _check_active(upload):
+    if upload.status == 'active' and upload.expires_at < datetime.utcnow():
+        _discard_session_file(upload)
+        upload.status = 'expired'
+        db.session.commit()
+
+    if upload.status != 'active':
+        status = upload.status
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Conflict',
+            'message': f'Upload session is {status}'
+        }), 409
+
+    return None
+
+def _next_expiry():
+    return datetime.utcnow() + timedelta(hours=current_app.config.get('UPLOAD_SESSION_TTL_HOURS', 24))
+
+def _remember_hash_state(upload, running):
+    now = datetime.utcnow()
+    with _hash_states_lock:
+        for session_id in [k for k, state in _hash_states.items() if state[2] < now]:
+            del _hash_states[session_id]
+        _hash_states.pop(upload.id, None)
+        # Oldest write first; a dropped session just rehashes at completion
+        while len(_hash_states) >= MAX_HASH_STATES:
+            del _hash_states[next(iter(_hash_states))]
+        _hash_states[upload.id] = (upload.received_size, running, upload.expires_at)
+
+def _discard_session_file(upload):
+    _hash_states.pop(upload.id, None)
+    if os.path.exists(upload.temp_path):
+        os.remove(upload.temp_path)
+
+def _validate_target_metadata(target, metadata):
+    if not isinstance(metadata, dict):
+        return jsonify({
+            'success': False,
+            'error': 'Bad request',
+            'message': 'metadata must be an object'
+        }), 400
+
+    if target == 'document':
+        return validate_document_metadata(MultiDict(metadata))
+
+    if not metadata.get('organizationId') or not Organization.query.filter_by(id=metadata['organizationId']).first():
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Organization not found'
+        }), 404
+
+    if target == 'constitution':
+        required = ['effectiveDate']
+        dates = ['effectiveDate']
+    else:
+        required = []
+        dates = ['submissionDate']
+
+    for field in required:
+        if metadata.get(field) in (None, ''):
+            return jsonify({
+                'success': False,
+                'error': 'Bad request',
+                'message': f'{field} is required'
+            }), 400
+
+    for field in dates:
+        if metadata.get(field):
+            try:
+                date.fromisoformat(str(metadata[field])[:10])
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'Bad request',
+                    'message': f'Invalid {field} format'
+                }), 400
+
+    for field in ['memberCount', 'versionNumber']:
+        if metadata.get(field) not in (None, ''):
+            try:
+                int(metadata[field])
+            except (TypeError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'error': 'Bad request',
+                    'message': f'{field} must be an integer'
+                }), 400
+
+    return None
+
+def _create_constitution(writer, form):
+    organization_id = form['organizationId']
+    version_number = form.get('versionNumber', type=int)
+    if version_number is None:
+        latest = db.session.query(db.func.max(OrganizationConstitution.version_number)).filter(
+            OrganizationConstitution.organization_id == organization_id
+        ).scalar()
+        version_number = (latest or 0) + 1
+
+    constitution = OrganizationConstitution(
+        id=uuid.uuid4(),
+        organization_id=organization_id,
+        version_number=version_number,
+        effective_date=date.fromisoformat(str(form['effectiveDate'])[:10]),
+        document_path=store_blob(writer),
+        status='pending',
+        notes=form.get('notes')
+    )
+
+    db.session.add(constitution)
+    enqueue_job('extract_text', 'constitution', constitution.id)
+    db.session.commit()
+
+    return constitution
+
+def _create_membership_list(current_user, writer, form):
+    declared_count = form.get('memberCount', type=int)
+
+    submission_date = date.today()
+    if form.get('submissionDate'):
+        submission_date = date.fromisoformat(str(form['submissionDate'])[:10])
+
+    # Counts and change percentage are filled in from the parsed file by the
+    # import job
+    membership_list = MembershipList(
+        id=uuid.uuid4(),
+        organization_id=form['organizationId'],
+        submission_date=submission_date,
+        submitted_by=current_user.username,
+        member_count=declared_count or 0,
+        declared_count=declared_count,
+        status='submitted',
+        document_path=store_blob(writer),
+        notes=form.get('notes'),
+        import_status='pending'
+    )
+
+    db.session.add(membership_list)
+    enqueue_job('import_members', 'membership_list', membership_list.id)
+    db.session.commit()
+
+    return membership_list
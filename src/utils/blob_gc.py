@@ -0,0 +1,219 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import func, case, and_, or_
+
+from src.extensions import db
+from src.models.blob import StoredBlob
+from src.models.training import TrainingWorkshop
+from src.utils.blobs import BLOB_PREFIX, BLOB_REFERENCE_COLUMNS, blob_key, resolve_path
+from src.utils.storage import upload_root
+from src.utils.storage_backends import LocalStorage, get_storage
+
+# Local scratch areas whose leftovers are safe to remove once old enough
+SCRATCH_PREFIXES = ['tmp/']
+
+# Upload folder areas where per-record files were saved before the blob store
+LEGACY_PREFIXES = ['constitutions/', 'membership_lists/']
+
+# Plain path columns outside the blob store; files they name are never orphans
+LEGACY_PATH_COLUMNS = [
+    (TrainingWorkshop, 'materials_path'),
+]
+
+
+def collect_garbage(grace_hours=24, batch_size=500, dry_run=False, log=print):
+    """
+    Delete blobs (and their derivatives) that have had no references for at
+    least ``grace_hours``, one locked batch at a time.
+
+    Each batch re-checks the live references before deleting, so a count
+    that drifted low never costs content that is still in use.
+    """
+    storage = get_storage()
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    collectable = [StoredBlob.ref_count <= 0, StoredBlob.unreferenced_since < cutoff]
+
+    if dry_run:
+        count, size = db.session.query(
+            func.count(StoredBlob.sha256), func.coalesce(func.sum(StoredBlob.size), 0)
+        ).filter(*collectable).one()
+        log(f'Would delete {count} blobs ({size} bytes)')
+        return {'deleted': count, 'bytes': size}
+
+    deleted = 0
+    freed = 0
+
+    while True:
+        # SKIP LOCKED passes over blobs an upload is re-referencing right now
+        blobs = StoredBlob.query.filter(*collectable).order_by(StoredBlob.unreferenced_since).limit(batch_size).with_for_update(skip_locked=True).all()
+
+        if not blobs:
+            break
+
+        live = _referenced_shas([blob.sha256 for blob in blobs])
+        for blob in blobs:
+            if blob.sha256 in live:
+                log(f'Blob {blob.sha256} has {live[blob.sha256]} references; correcting its count')
+                blob.ref_count = live[blob.sha256]
+                blob.unreferenced_since = None
+                continue
+
+            # Content goes before the row: if the commit fails the row
+            # survives without content, and the next upload of the same
+            # bytes puts it back
+            for derivative in (blob.derivatives or {}).values():
+                storage.delete(derivative['key'])
+            storage.delete(blob_key(blob.sha256))
+            db.session.delete(blob)
+            deleted += 1
+            freed += blob.size or 0
+
+        db.session.commit()
+
+        if len(blobs) < batch_size:
+            break
+
+    log(f'Deleted {deleted} blobs ({freed} bytes)')
+    return {'deleted': deleted, 'bytes': freed}
+
+
+def reconcile_storage(fix=False, delete_orphans=False, grace_hours=24, log=print):
+    """
+    Compare rows with stored content.
+
+    Reports (and with ``fix``, corrects) reference counts that drifted through
+    bulk statements or database-level cascades, rows whose content is missing,
+    legacy paths that point nowhere, and (with ``delete_orphans``, removes)
+    stored objects that no row knows about.
+    """
+    storage = get_storage()
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    report = {}
+
+    # 1. Reference counts against the live references
+    actual = _reference_counts().subquery()
+    report['driftedCounts'] = db.session.query(func.count(StoredBlob.sha256)).outerjoin(
+        actual, actual.c.sha256 == StoredBlob.sha256
+    ).filter(StoredBlob.ref_count != func.coalesce(actual.c.references, 0)).scalar()
+
+    if fix and report['driftedCounts']:
+        db.session.execute(
+            db.update(StoredBlob).where(
+                StoredBlob.sha256 == actual.c.sha256,
+                StoredBlob.ref_count != actual.c.references
+            ).values(ref_count=actual.c.references)
+        )
+        db.session.execute(
+            db.update(StoredBlob).where(
+                StoredBlob.ref_count != 0,
+                StoredBlob.sha256.notin_(db.select(actual.c.sha256))
+            ).values(ref_count=0)
+        )
+        db.session.execute(
+            db.update(StoredBlob).where(or_(
+                and_(StoredBlob.ref_count > 0, StoredBlob.unreferenced_since.isnot(None)),
+                and_(StoredBlob.ref_count == 0, StoredBlob.unreferenced_since.is_(None))
+            )).values(
+                unreferenced_since=case((StoredBlob.ref_count > 0, None), else_=datetime.utcnow())
+            )
+        )
+        db.session.commit()
+        log(f'Corrected {report["driftedCounts"]} reference counts')
+
+    # 2. Rows whose content is gone
+    missing_blobs = []
+    for (sha256,) in db.session.query(StoredBlob.sha256).yield_per(1000):
+        if not storage.exists(blob_key(sha256)):
+            missing_blobs.append(sha256)
+    report['missingContent'] = missing_blobs
+    for sha256 in missing_blobs[:50]:
+        log(f'Blob row without content: {sha256}')
+
+    missing_legacy = []
+    legacy_paths = set()
+    for model, column in BLOB_REFERENCE_COLUMNS:
+        attribute = getattr(model, column)
+        rows = db.session.query(model.id, attribute).filter(
+            attribute.isnot(None), attribute != '', ~attribute.startswith(BLOB_PREFIX)
+        ).yield_per(1000)
+        for record_id, reference in rows:
+            path = resolve_path(reference)
+            legacy_paths.add(path)
+            if path is None or not os.path.isfile(path):
+                missing_legacy.append({'table': model.__tablename__, 'id': str(record_id), 'path': reference})
+    for model, column in LEGACY_PATH_COLUMNS:
+        attribute = getattr(model, column)
+        for (reference,) in db.session.query(attribute).filter(attribute.isnot(None), attribute != '').yield_per(1000):
+            legacy_paths.add(resolve_path(reference))
+    report['missingLegacyFiles'] = missing_legacy
+    for item in missing_legacy[:50]:
+        log(f'Legacy path without file: {item["table"]} {item["id"]} {item["path"]}')
+
+    # 3. Stored objects no row knows about, checked a page of keys at a time
+    orphans = []
+    batch = []
+    for key, modified in storage.iter_keys('blobs/'):
+        batch.append((key, modified))
+        if len(batch) >= 1000:
+            orphans.extend(_orphaned_keys(batch))
+            batch = []
+    orphans.extend(_orphaned_keys(batch))
+
+    # Young objects may belong to an upload whose row is not committed yet
+    old_orphans = [key for key, modified in orphans if modified < cutoff]
+
+    # Staging and legacy files always live on local disk, whatever the backend
+    scratch = LocalStorage(upload_root())
+    stale_local = [
+        key for prefix in SCRATCH_PREFIXES for key, modified in scratch.iter_keys(prefix) if modified < cutoff
+    ]
+    # Legacy files no row points at, e.g. left behind by deletes or
+    # migrate-blobs; only the folders the old upload code wrote to are
+    # scanned, anything else under the upload folder is not ours to remove
+    for prefix in LEGACY_PREFIXES:
+        for key, modified in scratch.iter_keys(prefix):
+            if modified < cutoff and os.path.realpath(scratch.local_path(key)) not in legacy_paths:
+                stale_local.append(key)
+
+    report['orphanedObjects'] = len(orphans)
+    report['deletableOrphans'] = len(old_orphans)
+    report['staleLocalFiles'] = len(stale_local)
+    for key in (old_orphans + stale_local)[:50]:
+        log(f'Orphaned object: {key}')
+
+    if delete_orphans:
+        for key in old_orphans:
+            storage.delete(key)
+        for key in stale_local:
+            scratch.delete(key)
+        report['deletedOrphans'] = len(old_orphans) + len(stale_local)
+
+    return report
+
+
+def _reference_counts():
+    references = db.union_all(*[
+        db.select(func.substr(getattr(model, column), len(BLOB_PREFIX) + 1).label('sha256')).where(
+            getattr(model, column).startswith(BLOB_PREFIX)
+        )
+        for model, column in BLOB_REFERENCE_COLUMNS
+    ]).subquery()
+    return db.select(references.c.sha256, func.count().label('references')).group_by(references.c.sha256)
+
+
+def _referenced_shas(shas):
+    counts = _reference_counts().subquery()
+    rows = db.session.execute(db.select(counts.c.sha256, counts.c.references).where(counts.c.sha256.in_(shas)))
+    return {sha256: references for sha256, references in rows}
+
+
+def _orphaned_keys(batch):
+    if not batch:
+        return []
+
+    # Derivatives are named '<sha256>.<kind>.<ext>' next to their blob
+    shas = {key.rsplit('/', 1)[-1].split('.', 1)[0] for key, _ in batch}
+    known = {
+        sha256 for (sha256,) in db.session.query(StoredBlob.sha256).filter(StoredBlob.sha256.in_(shas))
+    }
+    return [(key, modified) for key, modified in batch if key.rsplit('/', 1)[-1].split('.', 1)[0] not in known]
@@ -0,0 +1,285 @@
+import os
+import re
+import shutil
+from datetime import datetime
+from sqlalchemy import event, update, case, func, inspect, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.extensions import db
+from src.models.blob import StoredBlob
+from src.models.document import Document
+from src.models.organization import OrganizationConstitution
+from src.models.membership import MembershipList
+from src.models.agreement import Agreement, AgreementAmendment, Dispute
+from src.models.compliance import ComplianceRecord, Inspection
+from src.models.election import ElectionDocument
+from src.utils.storage import HashingFileWriter, upload_root, upload_path, file_sha256
+from src.utils.storage_backends import get_storage
+
+BLOB_PREFIX = 'blob:'
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# Every column that points at stored file content
+BLOB_REFERENCE_COLUMNS = [
+    (Document, 'file_path'),
+    (OrganizationConstitution, 'document_path'),
+    (MembershipList, 'document_path'),
+    (Agreement, 'document_path'),
+    (AgreementAmendment, 'document_path'),
+    (Dispute, 'document_path'),
+    (ComplianceRecord, 'document_path'),
+    (Inspection, 'document_path'),
+    (ElectionDocument, 'file_path'),
+]
+
+
+class MissingBlob(Exception):
+    pass
+
+
+def blob_reference(sha256):
+    return BLOB_PREFIX + sha256
+
+
+def blob_sha256(reference):
+    # Anything else after the prefix could walk out of the blob directory
+    if reference and reference.startswith(BLOB_PREFIX) and SHA256_PATTERN.match(reference[len(BLOB_PREFIX):]):
+        return reference[len(BLOB_PREFIX):]
+    return None
+
+
+def blob_key(sha256):
+    # Two levels of fan-out keep every directory (or key prefix) to at most
+    # 256 entries
+    return f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def resolve_path(reference):
+    """
+    Map a stored ``file_path``/``document_path`` value to a local path.
+
+    Blob references resolve through the storage backend and are None when it
+    is not local; anything else is a legacy path, absolute or relative to
+    the upload folder, and is None unless it resolves to a file inside it.
+    """
+    if not reference:
+        return None
+    sha256 = blob_sha256(reference)
+    if sha256:
+        return get_storage().local_path(blob_key(sha256))
+    root = os.path.realpath(upload_root())
+    path = os.path.realpath(os.path.join(root, reference))
+    if not path.startswith(root + os.sep):
+        return None
+    return path
+
+
+def client_reference_error(reference, user, current=None):
+    """
+    Return why ``reference``, taken from a request body, may not be stored
+    on a record by ``user``, or None when it may.
+
+    Clients may keep the record's ``current`` value, clear it, or point it
+    at content they uploaded as a document. Anything else would let them
+    download a file they were never given.
+    """
+    if not reference or reference == current:
+        return None
+    if not blob_sha256(reference):
+        return 'File references must be blob references returned by an upload'
+    uploaded = db.session.query(Document.id).filter(
+        Document.file_path == reference,
+        Document.uploaded_by == user.id
+    ).first()
+    if not uploaded:
+        return 'File reference does not match a file you uploaded'
+    return None
+
+
+def stored_size(reference):
+    sha256 = blob_sha256(reference)
+    if sha256:
+        blob = db.session.get(StoredBlob, sha256)
+        return blob.size if blob else None
+    path = resolve_path(reference)
+    return os.path.getsize(path) if path and os.path.isfile(path) else None
+
+
+def open_stored(reference, start=None, end=None):
+    """
+    Open stored content for streaming reads, optionally limited to the
+    inclusive byte range ``start``-``end``.
+    """
+    sha256 = blob_sha256(reference)
+    if sha256:
+        return get_storage().open(blob_key(sha256), start, end)
+    path = resolve_path(reference)
+    if path is None:
+        raise FileNotFoundError(f'{reference} is outside the upload folder')
+    f = open(path, 'rb')
+    if start:
+        f.seek(start)
+    return f
+
+
+def store_blob(writer):
+    """
+    Move a finished HashingFileWriter into the blob store and return its
+    reference. Content already in the store is not written twice.
+
+    The reference count is taken by the row that stores the reference, when
+    it is flushed, so this only has to make sure the blob row exists.
+    """
+    writer.close()
+    sha256 = writer.sha256
+    key = blob_key(sha256)
+    storage = get_storage()
+
+    # Row first: it stays locked until the caller commits, so the collector
+    # cannot delete the content between the existence check and the commit
+    _ensure_blob_row(sha256, writer.size, writer.mime_type)
+
+    if storage.exists(key):
+        writer.discard()
+    else:
+        storage.put_file(writer.path, key, content_type=writer.mime_type)
+    writer.path = storage.local_path(key)
+
+    return blob_reference(sha256)
+
+
+def _ensure_blob_row(sha256, size, mime_type):
+    statement = pg_insert(StoredBlob).values(
+        sha256=sha256,
+        size=size,
+        mime_type=mime_type,
+        ref_count=0,
+        unreferenced_since=datetime.utcnow()
+    )
+    # Touching an unreferenced blob restarts its grace period
+    statement = statement.on_conflict_do_update(
+        index_elements=['sha256'],
+        set_={'unreferenced_since': case(
+            (StoredBlob.ref_count == 0, datetime.utcnow()),
+            else_=StoredBlob.unreferenced_since
+        )}
+    ).returning(literal_column('(xmax = 0)').label('inserted'))
+    inserted = db.session.execute(statement).scalar()
+
+    # Derivatives are keyed by content, so only new content needs rendering
+    if inserted:
+        from src.utils.jobs import enqueue_previews
+        enqueue_previews(sha256, mime_type)
+
+
+def _adjust_ref_count(connection, reference, delta):
+    sha256 = blob_sha256(reference)
+    if not sha256:
+        return
+
+    ref_count = func.greatest(StoredBlob.ref_count + delta, 0)
+    updated = connection.execute(
+        update(StoredBlob).where(
+            StoredBlob.sha256 == sha256
+        ).values(
+            ref_count=ref_count,
+            # Stamp the moment a blob loses its last reference; the collector
+            # only removes blobs that have stayed unreferenced for a while
+            unreferenced_since=case(
+                (StoredBlob.ref_count + delta > 0, None),
+                (StoredBlob.unreferenced_since.is_(None), datetime.utcnow()),
+                else_=StoredBlob.unreferenced_since
+            )
+        )
+    )
+
+    # The collector deletes a row (and its content) under a row lock; an
+    # UPDATE that waited on it finds nothing. Failing the flush keeps a new
+    # reference from pointing at content that is gone. Once the UPDATE has
+    # matched, its lock keeps the collector away until this commit.
+    if delta > 0 and updated.rowcount == 0:
+        raise MissingBlob(f'Blob {sha256} no longer exists')
+
+
+def _listen_for_references(model, column):
+    def after_insert(mapper, connection, target):
+        _adjust_ref_count(connection, getattr(target, column), 1)
+
+    def after_update(mapper, connection, target):
+        history = inspect(target).attrs[column].history
+        if not history.has_changes():
+            return
+        for reference in history.deleted:
+            _adjust_ref_count(connection, reference, -1)
+        for reference in history.added:
+            _adjust_ref_count(connection, reference, 1)
+
+    def after_delete(mapper, connection, target):
+        _adjust_ref_count(connection, getattr(target, column), -1)
+
+    event.listen(model, 'after_insert', after_insert)
+    event.listen(model, 'after_update', after_update)
+    event.listen(model, 'after_delete', after_delete)
+
+
+# Reference counts follow the ORM, so every route that sets or clears a path
+# keeps them right. Core-level bulk statements bypass these hooks.
+for _model, _column in BLOB_REFERENCE_COLUMNS:
+    _listen_for_references(_model, _column)
+
+
+def migrate_legacy_files(batch_size=200, log=print):
+    """
+    Move files referenced by plain paths into the blob store and rewrite
+    the referencing columns. Files under the upload folder are removed once
+    every row pointing at them has been rewritten.
+    """
+    migrated = {}
+    root = os.path.abspath(upload_root())
+
+    for model, column in BLOB_REFERENCE_COLUMNS:
+        attribute = getattr(model, column)
+        last_id = None
+        while True:
+            query = model.query.filter(
+                attribute.isnot(None),
+                ~attribute.startswith(BLOB_PREFIX)
+            ).order_by(model.id)
+            if last_id is not None:
+                query = query.filter(model.id > last_id)
+            rows = query.limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            for row in rows:
+                path = resolve_path(getattr(row, column))
+                if path not in migrated:
+                    if path is None or not os.path.isfile(path):
+                        log(f'Missing file for {model.__tablename__} {row.id}: {getattr(row, column)}')
+                        migrated[path] = None
+                        continue
+                    migrated[path] = _copy_into_store(path)
+                if migrated[path]:
+                    setattr(row, column, migrated[path])
+
+            db.session.commit()
+
+    removed = 0
+    for path, reference in migrated.items():
+        if reference and os.path.abspath(path).startswith(root + os.sep):
+            os.remove(path)
+            removed += 1
+
+    return sum(1 for reference in migrated.values() if reference), removed
+
+
+def _copy_into_store(path):
+    sha256 = file_sha256(path)
+    size = os.path.getsize(path)
+
+    # Copy rather than move: other legacy rows may still point at the file
+    staging = upload_path('tmp', f'{sha256}.migrating')
+    shutil.copyfile(path, staging)
+    return store_blob(HashingFileWriter.adopt(staging, os.path.basename(path), size, sha256))
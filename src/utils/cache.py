@@ -0,0 +1,62 @@
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    Small in-process TTL cache for computed API payloads.
+
+    Entries are grouped by namespace so that a write to the underlying tables
+    can drop every cached variant (filters, pages) of a payload in one call.
+    """
+
+    def __init__(self, default_ttl=300):
+        self.default_ttl = default_ttl
+        self._entries = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, namespace):
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[(namespace, key)]
+                return None
+            return value
+
+    def set(self, namespace, key, value, ttl=None, version=None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        with self._lock:
+            # A value computed before an invalidation must not be stored after it
+            if version is not None and version != self._versions.get(namespace, 0):
+                return
+            self._entries[(namespace, key)] = (expires_at, value)
+
+    def get_or_set(self, namespace, key, producer, ttl=None):
+        value = self.get(namespace, key)
+        if value is None:
+            version = self.version(namespace)
+            value = producer()
+            self.set(namespace, key, value, ttl, version=version)
+        return value
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            self._entries.pop((namespace, key), None)
+
+    def invalidate(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            for k in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[k]
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,211 @@
+"""
+Streaming CSV, XLSX and Parquet exports of list queries.
+
+Rows come from a server-side cursor (``yield_per``) and are written out in
+batches, so an export of a whole table keeps memory flat. CSV and Parquet
+start sending as soon as the first batch is encoded; XLSX is a zip archive
+whose directory is only known at the end, so every row is spooled to a
+temporary file first and the response starts once the workbook is saved.
+"""
+import csv
+import io
+import os
+import tempfile
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Response, stream_with_context
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+EXPORT_MIME_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 2000
+
+# Rows per Parquet row group; each group is sent as soon as it is written
+PARQUET_ROW_GROUP_SIZE = 20000
+
+FILE_CHUNK_SIZE = 1024 * 1024
+
+
+class _ChunkSink:
+    """
+    Append-only file object whose contents are handed out and dropped as
+    they are produced, while tell() keeps counting for writers that record
+    offsets.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def export_format_error(export_format):
+    """
+    Return a message when ``export_format`` cannot be produced here, else None.
+    """
+    if export_format not in EXPORT_MIME_TYPES:
+        return f'format must be one of: {", ".join(EXPORT_MIME_TYPES)}'
+    if export_format == 'xlsx' and Workbook is None:
+        return 'XLSX export requires openpyxl'
+    if export_format == 'parquet' and pa is None:
+        return 'Parquet export requires pyarrow'
+    return None
+
+
+def export_response(query, columns, name, export_format, joins=()):
+    """
+    Stream ``query`` as a downloadable file.
+
+    ``query`` is the endpoint's filtered and ordered ORM query; ``columns``
+    lists ``(header, column expression)`` pairs selected in its place, and
+    ``joins`` lists ``(target, onclause)`` outer joins those columns need.
+    Use aliased targets so they cannot clash with joins made by filters.
+    """
+    rows = query.with_entities(*[expression for _, expression in columns])
+    for target, onclause in joins:
+        rows = rows.outerjoin(target, onclause)
+    rows = rows.yield_per(EXPORT_BATCH_SIZE)
+
+    headers = [header for header, _ in columns]
+    if export_format == 'csv':
+        chunks = _csv_chunks(headers, rows)
+    elif export_format == 'xlsx':
+        chunks = _xlsx_chunks(headers, rows, name)
+    else:
+        chunks = _parquet_chunks(columns, rows)
+
+    filename = f'{name}-{datetime.utcnow().strftime("%Y%m%d-%H%M%S")}.{export_format}'
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_MIME_TYPES[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def _plain(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _csv_chunks(headers, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # The BOM makes Excel read the file as UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([
+            value.isoformat() if isinstance(value, (date, datetime)) else _plain(value)
+            for value in row
+        ])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _xlsx_chunks(headers, rows, name):
+    # Write-only mode spools rows to disk instead of building the sheet in
+    # memory; the archive can only be assembled once every row is written
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=name[:31])
+    sheet.append(headers)
+    for row in rows:
+        sheet.append([_plain(value) for value in row])
+
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    try:
+        workbook.save(path)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(FILE_CHUNK_SIZE), b''):
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def _arrow_type(sql_type):
+    try:
+        python_type = sql_type.python_type
+    except NotImplementedError:
+        return pa.string()
+
+    # bool before int and datetime before date: both are subclasses
+    for base, arrow_type in [
+        (bool, pa.bool_()),
+        (int, pa.int64()),
+        ((float, Decimal), pa.float64()),
+        (datetime, pa.timestamp('us')),
+        (date, pa.date32()),
+    ]:
+        if issubclass(python_type, base):
+            return arrow_type
+    return pa.string()
+
+
+def _arrow_table(batch, schema):
+    return pa.Table.from_pydict(dict(zip(schema.names, batch)), schema=schema)
+
+
+def _parquet_chunks(columns, rows):
+    # Declared up front from the column types, so an all-NULL first batch
+    # cannot fix a column to the null type
+    schema = pa.schema([(header, _arrow_type(expression.type)) for header, expression in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+
+    batch = [[] for _ in columns]
+    try:
+        for count, row in enumerate(rows, start=1):
+            for values, value in zip(batch, row):
+                values.append(_plain(value))
+            if count % PARQUET_ROW_GROUP_SIZE == 0:
+                writer.write_table(_arrow_table(batch, schema))
+                batch = [[] for _ in columns]
+                yield sink.drain()
+
+        if batch[0]:
+            writer.write_table(_arrow_table(batch, schema))
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,92 @@
+"""
+Text extraction that runs inside worker processes.
+
+Functions here take a local file path and return plain data, and must not
+touch the database or the Flask app, so they can run in a spawned process.
+"""
+import mimetypes
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+try:
+    import pytesseract
+    from PIL import Image, ImageSequence
+except ImportError:
+    pytesseract = None
+
+try:
+    from pdf2image import convert_from_path
+except ImportError:
+    convert_from_path = None
+
+# Below this many characters per page a PDF is treated as a scan
+MIN_TEXT_CHARS_PER_PAGE = 40
+
+
+class UnsupportedContent(Exception):
+    pass
+
+
+def run_extraction(path, mime_type, settings):
+    return extract_text(path, mime_type, settings.get('languages', 'eng'))
+
+
+def extract_text(path, mime_type=None, languages='eng'):
+    """
+    Return ``{'text', 'method', 'pages'}`` for the file at ``path``.
+
+    PDFs use their text layer and fall back to OCR when it is (nearly)
+    empty; images are OCRed; text files are read as-is.
+    """
+    mime_type = mime_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if mime_type == 'application/pdf':
+        return _extract_pdf(path, languages)
+    if mime_type.startswith('image/'):
+        return _ocr_image(path, languages)
+    if mime_type.startswith('text/'):
+        with open(path, 'rb') as f:
+            return {'text': f.read().decode('utf-8', errors='replace'), 'method': 'plain', 'pages': None}
+
+    raise UnsupportedContent(f'No text extractor for {mime_type}')
+
+
+def _extract_pdf(path, languages):
+    if PdfReader is None:
+        raise UnsupportedContent('pypdf is not installed')
+
+    reader = PdfReader(path)
+    pages = [page.extract_text() or '' for page in reader.pages]
+    text = '\n\n'.join(pages).strip()
+
+    if len(text) >= MIN_TEXT_CHARS_PER_PAGE * max(len(pages), 1):
+        return {'text': text, 'method': 'pdf_text', 'pages': len(pages)}
+
+    if pytesseract is None or convert_from_path is None:
+        # Best effort: keep whatever text layer there is
+        return {'text': text, 'method': 'pdf_text', 'pages': len(pages)}
+
+    # Render and OCR one page at a time to keep memory flat on long scans
+    ocr_pages = []
+    for number in range(1, len(pages) + 1):
+        for image in convert_from_path(path, dpi=300, first_page=number, last_page=number):
+            ocr_pages.append(pytesseract.image_to_string(image, lang=languages))
+            image.close()
+
+    return {'text': '\n\n'.join(ocr_pages).strip(), 'method': 'ocr', 'pages': len(pages)}
+
+
+def _ocr_image(path, languages):
+    if pytesseract is None:
+        raise UnsupportedContent('pytesseract and Pillow are not installed')
+
+    texts = []
+    with Image.open(path) as image:
+        # Multi-page TIFFs are common for scanned submissions
+        for frame in ImageSequence.Iterator(image):
+            texts.append(pytesseract.image_to_string(frame.convert('RGB'), lang=languages))
+
+    return {'text': '\n\n'.join(texts).strip(), 'method': 'ocr', 'pages': len(texts)}
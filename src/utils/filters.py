@@ -0,0 +1,22 @@
+from src.models.organization import Organization
+from src.models.region import District
+
+
+def apply_organization_filters(query, region_id, district_id, type_id, status):
+    """
+    Narrow a query that selects from (or joins) organizations by region,
+    district, organization type and status.
+    """
+    if region_id:
+        query = query.join(District, District.id == Organization.district_id).filter(District.region_id == region_id)
+    
+    if district_id:
+        query = query.filter(Organization.district_id == district_id)
+    
+    if type_id:
+        query = query.filter(Organization.organization_type_id == type_id)
+    
+    if status:
+        query = query.filter(Organization.status == status)
+    
+    return query
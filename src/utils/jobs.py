@@ -0,0 +1,461 @@
+import os
+import time
+import socket
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+
+from src.extensions import db
+from src.models.job import ProcessingJob
+from src.models.blob import StoredBlob
+from src.models.document import Document
+from src.models.organization import Organization, OrganizationConstitution
+from src.models.membership import MembershipList, MembershipListEntry
+from src.utils.storage import upload_root, upload_path
+from src.utils.blobs import resolve_path, blob_sha256, blob_key, blob_reference
+from src.utils.storage_backends import get_storage
+from src.utils.extraction import run_extraction, UnsupportedContent
+from src.utils.previews import render_previews, is_previewable, DERIVATIVE_FORMATS
+from src.utils.members import parse_membership_file, ENTRY_COLUMNS, MAX_IMPORT_ERRORS
+from src.utils.membership_diff import previous_membership_list, compute_membership_diff
+from src.utils.member_index import index_membership_list, compute_overlap_summary
+from src.utils.member_register import sync_member_register
+
+# Where extracted text is stored, by target type: model, text column, file column
+EXTRACTION_TARGETS = {
+    'document': (Document, 'content_text', 'file_path'),
+    'constitution': (OrganizationConstitution, 'ocr_content', 'document_path'),
+}
+
+# File column of other job targets
+TARGET_FILES = {
+    'membership_list': (MembershipList, 'document_path'),
+}
+
+# Read buffer for COPY ... FROM STDIN
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def enqueue_job(job_type, target_type, target_id, run_after=None):
+    """
+    Add a job to the session; it becomes visible to workers when the caller
+    commits, together with the record it refers to.
+    """
+    job = ProcessingJob(
+        job_type=job_type,
+        target_type=target_type,
+        target_id=str(target_id),
+        status='queued',
+        run_after=run_after or datetime.utcnow()
+    )
+    db.session.add(job)
+    return job
+
+
+def claim_jobs(limit, worker_id, job_types=None):
+    """
+    Lock up to ``limit`` due jobs for this worker. SKIP LOCKED lets several
+    workers poll the same table without handing out a job twice.
+    """
+    query = ProcessingJob.query.filter(
+        ProcessingJob.status == 'queued',
+        ProcessingJob.run_after <= datetime.utcnow()
+    )
+    if job_types:
+        query = query.filter(ProcessingJob.job_type.in_(job_types))
+
+    jobs = query.order_by(ProcessingJob.run_after).limit(limit).with_for_update(skip_locked=True).all()
+
+    now = datetime.utcnow()
+    for job in jobs:
+        job.status = 'running'
+        job.locked_by = worker_id
+        job.started_at = now
+        job.attempts += 1
+
+    claimed = [(job.id, job.job_type, job.target_type, job.target_id) for job in jobs]
+    db.session.commit()
+    return claimed
+
+
+def requeue_stalled_jobs(timeout_minutes, worker_id=None):
+    """
+    Put back jobs whose worker died mid-run. Jobs held by ``worker_id`` are
+    left alone: that worker is alive and still waiting on them.
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=timeout_minutes)
+    query = ProcessingJob.query.filter(
+        ProcessingJob.status == 'running',
+        ProcessingJob.started_at < cutoff
+    )
+    if worker_id:
+        query = query.filter(ProcessingJob.locked_by.is_distinct_from(worker_id))
+
+    stalled = query.with_for_update(skip_locked=True).all()
+
+    for job in stalled:
+        _mark_failed(job, 'Worker timed out')
+        _record_target_failure(job)
+
+    db.session.commit()
+    return len(stalled)
+
+
+def run_worker(processes=None, batch_size=None, poll_interval=5, once=False, log=print):
+    """
+    Claim jobs and run them on a process pool sized to the CPU count.
+
+    The parent process owns all database and storage access; children only
+    run the CPU-bound extraction on a local file. If a child dies (e.g. killed
+    for memory) the pool breaks: its in-flight jobs are requeued with backoff
+    and a fresh pool is started. Jobs still unfinished JOB_TIMEOUT_MINUTES after
+    their claim, when other workers would requeue them, are failed the same
+    way and the pool's children killed, so one hung conversion cannot stall
+    the worker.
+    """
+    processes = processes or os.cpu_count() or 1
+    batch_size = batch_size or processes * 2
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    timeout = current_app.config.get('JOB_TIMEOUT_MINUTES', 30)
+    # Passed to every handler; children have no app context to read config from
+    settings = {
+        'languages': current_app.config.get('OCR_LANGUAGES', 'eng'),
+        'work_dir': os.path.join(upload_root(), 'tmp')
+    }
+    os.makedirs(settings['work_dir'], exist_ok=True)
+
+    # Spawned children do not inherit the parent's database connections
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+    try:
+        while True:
+            requeue_stalled_jobs(timeout, worker_id)
+            claimed = claim_jobs(batch_size, worker_id, job_types=list(JOB_HANDLERS))
+            claimed_at = time.monotonic()
+            if not claimed:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            broken = False
+            futures = {}
+            for job_id, job_type, target_type, target_id in claimed:
+                try:
+                    path, mime_type, cleanup = _materialize(job_id, target_type, target_id)
+                except Exception as e:
+                    db.session.rollback()
+                    _finish(job_id, worker_id, error=e)
+                    continue
+                try:
+                    future = pool.submit(JOB_HANDLERS[job_type], path, mime_type, dict(settings, target_id=target_id))
+                except BrokenProcessPool as e:
+                    broken = True
+                    _finish(job_id, worker_id, error=e)
+                    if cleanup:
+                        os.remove(cleanup)
+                    continue
+                futures[future] = (job_id, job_type, target_type, target_id, cleanup)
+
+            # Same limit requeue_stalled_jobs applies from the claim onwards
+            deadline = max(timeout * 60 - (time.monotonic() - claimed_at), 0)
+            pending = dict(futures)
+            try:
+                for future in as_completed(futures, timeout=deadline):
+                    job_id, job_type, target_type, target_id, cleanup = pending.pop(future)
+                    result = None
+                    try:
+                        result = future.result()
+                        # A job that outran its timeout may have been handed to
+                        # another worker; only its current holder applies a result
+                        if _owned_job(job_id, worker_id) is None:
+                            db.session.rollback()
+                            log(f'Dropped the result of job {job_id}: no longer held by this worker')
+                            continue
+                        JOB_APPLIERS[job_type](target_type, target_id, result)
+                        _finish(job_id, worker_id, result={k: v for k, v in result.items() if k not in ('text', 'outputs', 'errors')})
+                    except Exception as e:
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                        db.session.rollback()
+                        _finish(job_id, worker_id, error=e)
+                    finally:
+                        if cleanup:
+                            os.remove(cleanup)
+                        for output in (result or {}).get('outputs', {}).values():
+                            if os.path.exists(output):
+                                os.remove(output)
+            except FuturesTimeout:
+                broken = True
+                _terminate_children(pool)
+                for job_id, job_type, target_type, target_id, cleanup in pending.values():
+                    _finish(job_id, worker_id, error=TimeoutError(f'No result within {timeout} minutes'))
+                    if cleanup and os.path.exists(cleanup):
+                        os.remove(cleanup)
+
+            log(f'Processed {len(claimed)} jobs')
+            if broken:
+                log('Process pool broke or timed out; requeued its jobs and starting a new pool')
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+            if once:
+                break
+    finally:
+        pool.shutdown()
+
+
+def _materialize(job_id, target_type, target_id):
+    """
+    Return ``(local_path, mime_type, temp_path_to_remove)`` for a job target,
+    downloading from a remote backend when needed.
+    """
+    if target_type == 'blob':
+        reference = blob_reference(target_id)
+    else:
+        if target_type in TARGET_FILES:
+            model, file_column = TARGET_FILES[target_type]
+        else:
+            model, _, file_column = EXTRACTION_TARGETS[target_type]
+        record = model.query.filter_by(id=target_id).first()
+        reference = getattr(record, file_column) if record else None
+    if not reference:
+        raise UnsupportedContent(f'{target_type} {target_id} has no file')
+
+    sha256 = blob_sha256(reference)
+    blob = db.session.get(StoredBlob, sha256) if sha256 else None
+    if sha256 and blob is None:
+        raise UnsupportedContent(f'Blob {sha256} no longer exists')
+    mime_type = blob.mime_type if blob else None
+
+    path = resolve_path(reference)
+    if path is not None:
+        return path, mime_type, None
+    if not sha256:
+        raise UnsupportedContent(f'{target_type} {target_id} points outside the upload folder')
+
+    temp_path = upload_path('tmp', f'job-{job_id.hex}')
+    get_storage().download_file(blob_key(sha256), temp_path)
+    return temp_path, mime_type, temp_path
+
+
+def _store_extracted_text(target_type, target_id, result):
+    model, text_column, _ = EXTRACTION_TARGETS[target_type]
+    db.session.execute(
+        db.update(model).where(model.id == target_id).values({text_column: result['text']})
+    )
+
+
+def derivative_key(sha256, kind):
+    # Stored next to the blob, so the derivative changes exactly when the content does
+    extension, _ = DERIVATIVE_FORMATS[kind]
+    return f'{blob_key(sha256)}.{kind}.{extension}'
+
+
+def enqueue_previews(sha256, mime_type):
+    if is_previewable(mime_type):
+        return enqueue_job('render_previews', 'blob', sha256)
+    return None
+
+
+def enqueue_missing_previews(limit=None):
+    """
+    Queue rendering for previewable blobs that have no derivatives and no
+    pending job. Returns the number of jobs queued.
+    """
+    pending = db.select(ProcessingJob.target_id).where(
+        ProcessingJob.job_type == 'render_previews',
+        ProcessingJob.status.in_(['queued', 'running'])
+    )
+    query = db.session.query(StoredBlob.sha256, StoredBlob.mime_type).filter(
+        StoredBlob.derivatives_rendered_at.is_(None),
+        StoredBlob.ref_count > 0,
+        (StoredBlob.mime_type == 'application/pdf') | StoredBlob.mime_type.like('image/%'),
+        StoredBlob.sha256.notin_(pending)
+    )
+    if limit:
+        query = query.limit(limit)
+
+    queued = 0
+    for sha256, mime_type in query.all():
+        if enqueue_previews(sha256, mime_type):
+            queued += 1
+    db.session.commit()
+    return queued
+
+
+def _store_previews(target_type, target_id, result):
+    storage = get_storage()
+    derivatives = {}
+    for kind, path in result['outputs'].items():
+        _, mime_type = DERIVATIVE_FORMATS[kind]
+        size = os.path.getsize(path)
+        key = derivative_key(target_id, kind)
+        storage.put_file(path, key, content_type=mime_type)
+        derivatives[kind] = {'key': key, 'mimeType': mime_type, 'size': size}
+
+    db.session.execute(
+        db.update(StoredBlob).where(StoredBlob.sha256 == target_id).values(
+            derivatives=derivatives,
+            derivatives_rendered_at=datetime.utcnow()
+        )
+    )
+
+
+def _load_membership_entries(target_type, target_id, result):
+    membership_list = db.session.get(MembershipList, target_id, with_for_update=True)
+    if membership_list is None:
+        return
+
+    # A retried job replaces whatever an earlier attempt loaded
+    db.session.execute(
+        db.delete(MembershipListEntry).where(MembershipListEntry.membership_list_id == membership_list.id)
+    )
+
+    # COPY streams the file in one statement, far faster than row inserts,
+    # and runs inside the session's transaction
+    columns = ', '.join(['membership_list_id'] + ENTRY_COLUMNS)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        with open(result['outputs']['entries'], 'r', encoding='utf-8') as f:
+            cursor.copy_expert(
+                f'COPY {MembershipListEntry.__tablename__} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                f,
+                size=COPY_BUFFER_SIZE
+            )
+    finally:
+        cursor.close()
+
+    previous = previous_membership_list(membership_list)
+
+    member_count = result['imported']
+    membership_list.member_count = member_count
+    membership_list.previous_count = previous.member_count if previous else None
+    membership_list.change_percentage = None
+    if previous and previous.member_count:
+        membership_list.change_percentage = round(
+            (member_count - previous.member_count) * 100.0 / previous.member_count, 2
+        )
+    membership_list.import_status = 'completed'
+    membership_list.import_error_count = result['errorCount']
+    membership_list.import_errors = result['errors'][:MAX_IMPORT_ERRORS]
+    membership_list.imported_at = datetime.utcnow()
+
+    # Stored with the import so review pages read it instead of computing it;
+    # a list from before imports has no entries to compare against
+    compute_membership_diff(membership_list, previous if previous and previous.import_status == 'completed' else None)
+
+    # The organization's count, its member register and its entry in the
+    # identity index follow its most recent list. Lock the organization before looking, so an
+    # import of a newer list cannot commit between the check and the index
+    # update; a concurrent import waits here and then sees this one.
+    db.session.query(Organization.id).filter(
+        Organization.id == membership_list.organization_id
+    ).with_for_update().first()
+    latest = MembershipList.query.filter(
+        MembershipList.organization_id == membership_list.organization_id,
+        MembershipList.import_status.is_(None)
+        | (MembershipList.import_status == 'completed')
+        | (MembershipList.id == membership_list.id)
+    ).order_by(MembershipList.submission_date.desc(), MembershipList.created_at.desc()).first()
+    if latest is None or latest.id == membership_list.id:
+        db.session.execute(
+            db.update(Organization).where(Organization.id == membership_list.organization_id).values(
+                membership_count=member_count
+            )
+        )
+        sync_member_register(membership_list)
+        index_membership_list(membership_list)
+
+    # Flags members other organizations also list, for the reviewer
+    compute_overlap_summary(membership_list)
+
+
+def _mark_import_failed(target_type, target_id, message):
+    db.session.execute(
+        db.update(MembershipList).where(MembershipList.id == target_id).values(
+            import_status='failed',
+            import_errors=[{'row': None, 'field': None, 'message': message}],
+            imported_at=datetime.utcnow()
+        )
+    )
+
+
+def _terminate_children(pool):
+    # ProcessPoolExecutor has no public way to stop a running task before
+    # Python 3.14's terminate_workers(); killing its processes breaks the pool
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+
+
+def _owned_job(job_id, worker_id):
+    """
+    Lock and return the job while ``worker_id`` still holds it, else None:
+    a job requeued after a timeout belongs to whoever claimed it next.
+    """
+    job = db.session.get(ProcessingJob, job_id, with_for_update=True, populate_existing=True)
+    if job is None or job.status != 'running' or job.locked_by != worker_id:
+        return None
+    return job
+
+
+def _finish(job_id, worker_id, result=None, error=None):
+    job = _owned_job(job_id, worker_id)
+    if job is None:
+        db.session.rollback()
+        return
+
+    if error is None:
+        job.status = 'completed'
+        job.result = result
+        job.error = None
+        job.finished_at = datetime.utcnow()
+    elif isinstance(error, UnsupportedContent):
+        # Retrying cannot help
+        job.status = 'failed'
+        job.error = str(error)
+        job.finished_at = datetime.utcnow()
+    else:
+        _mark_failed(job, f'{type(error).__name__}: {error}')
+
+    _record_target_failure(job)
+
+    job.locked_by = None
+    db.session.commit()
+
+
+def _mark_failed(job, message):
+    job.error = message
+    job.locked_by = None
+    if job.attempts < job.max_attempts:
+        # Exponential backoff: 1, 2, 4... minutes
+        job.status = 'queued'
+        job.run_after = datetime.utcnow() + timedelta(minutes=2 ** (job.attempts - 1))
+    else:
+        job.status = 'failed'
+        job.finished_at = datetime.utcnow()
+
+
+def _record_target_failure(job):
+    if job.status == 'failed' and job.job_type in JOB_FAILURE_HANDLERS:
+        JOB_FAILURE_HANDLERS[job.job_type](job.target_type, job.target_id, job.error)
+
+
+# CPU-bound work, run in the pool, by job type
+JOB_HANDLERS = {
+    'extract_text': run_extraction,
+    'render_previews': render_previews,
+    'import_members': parse_membership_file,
+}
+
+# Writes a handler's result back, run in the parent, by job type
+JOB_APPLIERS = {
+    'extract_text': _store_extracted_text,
+    'render_previews': _store_previews,
+    'import_members': _load_membership_entries,
+}
+
+# Records a permanent failure on the target, by job type
+JOB_FAILURE_HANDLERS = {
+    'import_members': _mark_import_failed,
+}
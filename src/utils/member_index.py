@@ -0,0 +1,114 @@
+from sqlalchemy import func, literal
+
+from src.extensions import db
+from src.models.organization import Organization
+from src.models.membership import MembershipList, MembershipListEntry, MemberIdentityIndex
+
+INDEX_COLUMNS = ['key_type', 'block_key', 'organization_id', 'membership_list_id', 'entry_id']
+
+# Organizations listed in a membership list's overlap summary
+MAX_OVERLAP_ORGANIZATIONS = 20
+
+
+def index_membership_list(membership_list):
+    """
+    Make ``membership_list`` the organization's entry in the identity index,
+    replacing the list indexed before it. Runs in the caller's transaction.
+    """
+    db.session.execute(
+        db.delete(MemberIdentityIndex).where(MemberIdentityIndex.organization_id == membership_list.organization_id)
+    )
+
+    for key_type, column, condition in [
+        ('national_id', MembershipListEntry.member_key, MembershipListEntry.national_id.isnot(None)),
+        ('name_dob', MembershipListEntry.name_key, MembershipListEntry.name_key.isnot(None)),
+    ]:
+        # One row per identifier; repeats within a list are the diff's business
+        select = db.select(
+            literal(key_type),
+            column,
+            literal(membership_list.organization_id),
+            literal(membership_list.id),
+            MembershipListEntry.id
+        ).where(
+            MembershipListEntry.membership_list_id == membership_list.id,
+            condition
+        ).distinct(column).order_by(column, MembershipListEntry.row_number)
+
+        db.session.execute(db.insert(MemberIdentityIndex).from_select(INDEX_COLUMNS, select))
+
+
+def overlapping_entries(membership_list):
+    """
+    Select ``(entry_id, key_type, organization_id, other_entry_id)`` for every
+    entry of ``membership_list`` that another organization also lists.
+
+    Each identifier is an equality join on the index, so the check costs one
+    index probe per member instead of a scan of every other list.
+    """
+    matches = [
+        db.select(
+            MembershipListEntry.id.label('entry_id'),
+            MemberIdentityIndex.key_type,
+            MemberIdentityIndex.organization_id,
+            MemberIdentityIndex.entry_id.label('other_entry_id')
+        ).join(
+            MemberIdentityIndex,
+            (MemberIdentityIndex.key_type == key_type) & (MemberIdentityIndex.block_key == column)
+        ).where(
+            MembershipListEntry.membership_list_id == membership_list.id,
+            MemberIdentityIndex.organization_id != membership_list.organization_id,
+            condition
+        )
+        for key_type, column, condition in [
+            ('national_id', MembershipListEntry.member_key, MembershipListEntry.national_id.isnot(None)),
+            ('name_dob', MembershipListEntry.name_key, MembershipListEntry.name_key.isnot(None)),
+        ]
+    ]
+    return db.union_all(*matches).subquery()
+
+
+def compute_overlap_summary(membership_list):
+    """
+    Count the members of ``membership_list`` that other organizations also
+    list, store it on the list and return it.
+    """
+    overlaps = overlapping_entries(membership_list)
+
+    total = db.session.query(func.count(func.distinct(overlaps.c.entry_id))).scalar()
+    members = func.count(func.distinct(overlaps.c.entry_id)).label('members')
+    by_organization = db.session.query(
+        Organization.id, Organization.organization_name, members
+    ).join(overlaps, overlaps.c.organization_id == Organization.id).group_by(
+        Organization.id, Organization.organization_name
+    ).order_by(members.desc()).limit(MAX_OVERLAP_ORGANIZATIONS).all()
+
+    summary = {
+        'members': total,
+        'organizations': [
+            {'organizationId': str(organization_id), 'organizationName': name, 'members': count}
+            for organization_id, name, count in by_organization
+        ]
+    }
+    membership_list.overlap_summary = summary
+    return summary
+
+
+def rebuild_member_index(log=print):
+    """
+    Rebuild the whole index from each organization's latest imported list.
+    """
+    db.session.execute(db.delete(MemberIdentityIndex))
+
+    latest = db.session.query(MembershipList).filter(
+        MembershipList.import_status == 'completed'
+    ).distinct(MembershipList.organization_id).order_by(
+        MembershipList.organization_id, MembershipList.submission_date.desc(), MembershipList.created_at.desc()
+    ).all()
+
+    for membership_list in latest:
+        index_membership_list(membership_list)
+    db.session.commit()
+
+    log(f'Indexed the latest membership lists of {len(latest)} organizations')
+    return len(latest)
@@ -0,0 +1,96 @@
+from datetime import datetime
+from sqlalchemy import func, literal, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.extensions import db
+from src.models.membership import OrganizationMember, MembershipList, MembershipListEntry
+
+REGISTER_COLUMNS = [
+    'organization_id', 'member_number', 'first_name', 'last_name', 'national_id',
+    'date_of_birth', 'gender', 'join_date', 'status', 'created_at', 'updated_at'
+]
+
+# Statuses a member returns from by appearing on a new list; suspensions,
+# resignations and expulsions are decisions a list cannot undo
+RELISTED_STATUSES = ['lapsed']
+
+
+def sync_member_register(membership_list):
+    """
+    Bring the organization's member register in line with
+    ``membership_list``, its latest imported list: listed members are
+    upserted by member number and active members it no longer lists are
+    marked lapsed. Entries without a member number cannot be keyed and are
+    left out. Runs in the caller's transaction.
+    """
+    now = datetime.utcnow()
+    entries = MembershipListEntry.membership_list_id == membership_list.id
+    numbered = MembershipListEntry.member_number.isnot(None) & (MembershipListEntry.member_number != '')
+
+    # One row per member number; a number listed twice keeps its first row
+    select = db.select(
+        literal(membership_list.organization_id),
+        MembershipListEntry.member_number,
+        func.left(MembershipListEntry.first_name, 50),
+        func.left(MembershipListEntry.last_name, 50),
+        MembershipListEntry.national_id,
+        MembershipListEntry.date_of_birth,
+        MembershipListEntry.gender,
+        MembershipListEntry.join_date,
+        literal('active'),
+        literal(now),
+        literal(now)
+    ).where(entries, numbered).distinct(
+        MembershipListEntry.member_number
+    ).order_by(MembershipListEntry.member_number, MembershipListEntry.row_number)
+
+    upsert = pg_insert(OrganizationMember).from_select(REGISTER_COLUMNS, select)
+    upsert = upsert.on_conflict_do_update(
+        constraint='uq_organization_members_org_number',
+        set_={
+            'first_name': upsert.excluded.first_name,
+            'last_name': upsert.excluded.last_name,
+            'national_id': func.coalesce(upsert.excluded.national_id, OrganizationMember.national_id),
+            'date_of_birth': func.coalesce(upsert.excluded.date_of_birth, OrganizationMember.date_of_birth),
+            'gender': func.coalesce(upsert.excluded.gender, OrganizationMember.gender),
+            'join_date': func.coalesce(OrganizationMember.join_date, upsert.excluded.join_date),
+            'status': case(
+                (OrganizationMember.status.in_(RELISTED_STATUSES), 'active'),
+                else_=OrganizationMember.status
+            ),
+            'updated_at': now
+        }
+    )
+    db.session.execute(upsert)
+
+    listed = db.select(MembershipListEntry.id).where(
+        entries,
+        MembershipListEntry.member_number == OrganizationMember.member_number
+    ).exists()
+    db.session.execute(
+        db.update(OrganizationMember).where(
+            OrganizationMember.organization_id == membership_list.organization_id,
+            OrganizationMember.status == 'active',
+            OrganizationMember.member_number.isnot(None),
+            ~listed
+        ).values(status='lapsed', updated_at=now).execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_member_register(log=print):
+    """
+    Sync every organization's register with its latest imported list, e.g.
+    for lists imported before the register was kept.
+    """
+    latest = db.session.query(MembershipList).filter(
+        MembershipList.import_status == 'completed'
+    ).distinct(MembershipList.organization_id).order_by(
+        MembershipList.organization_id, MembershipList.submission_date.desc(), MembershipList.created_at.desc()
+    ).all()
+
+    for membership_list in latest:
+        sync_member_register(membership_list)
+    db.session.commit()
+
+    log(f'Synced the member registers of {len(latest)} organizations')
+    return len(latest)
@@ -0,0 +1,219 @@
+"""
+Membership list parsing that runs inside worker processes.
+
+The file is read row by row, each row is validated and normalized, and
+valid rows are written to a CSV ready for ``COPY``; the parent process loads
+it into ``membership_list_entries``. Memory use does not grow with the list.
+"""
+import csv
+import hashlib
+import os
+import re
+import unicodedata
+import uuid
+from datetime import date, datetime
+
+from src.utils.tabular import iter_rows
+
+# Canonical field -> other header names seen in submitted lists
+MEMBER_COLUMNS = {
+    'member_number': ['member no', 'membership number', 'membership no', 'member id', 'no'],
+    'first_name': ['firstname', 'given name', 'given names', 'other names', 'forename'],
+    'last_name': ['lastname', 'surname', 'family name'],
+    'full_name': ['name', 'member name', 'names'],
+    'national_id': ['nid', 'national id number', 'id number', 'nin', 'id no'],
+    'date_of_birth': ['dob', 'birth date', 'birthdate'],
+    'gender': ['sex'],
+    'join_date': ['date joined', 'joined', 'membership date', 'date of joining'],
+}
+
+# Column order of the COPY file, after membership_list_id
+ENTRY_COLUMNS = [
+    'row_number', 'member_key', 'name_key', 'member_number', 'first_name', 'last_name',
+    'national_id', 'date_of_birth', 'gender', 'join_date'
+]
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d', '%d %b %Y', '%d %B %Y']
+
+GENDERS = {'m': 'male', 'male': 'male', 'f': 'female', 'female': 'female'}
+
+# Row errors kept for the submitter; the count is always exact
+MAX_IMPORT_ERRORS = 500
+
+
+class RowError(ValueError):
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+
+
+def clean_text(value, limit=None):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheet cells turn member numbers into floats
+        value = int(value)
+    text = re.sub(r'\s+', ' ', str(value)).strip()
+    if limit and len(text) > limit:
+        raise ValueError(f'longer than {limit} characters')
+    return text or None
+
+
+def normalize_national_id(value):
+    text = clean_text(value)
+    if not text:
+        return None
+    return re.sub(r'[\s\-/.]', '', text).upper()
+
+
+def normalize_name(value):
+    """
+    Case-, accent- and spacing-insensitive form of a name for matching.
+    """
+    if not value:
+        return ''
+    text = unicodedata.normalize('NFKD', value)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'[^a-z]+', ' ', text.casefold()).strip()
+
+
+def parse_date(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    text = str(value).strip()
+    if not text:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f'unrecognised date {text!r}')
+
+
+def member_key(national_id, first_name, last_name, date_of_birth):
+    """
+    Stable identity for a member across submissions: the national ID when
+    there is one, otherwise the normalized name and date of birth.
+    """
+    if national_id:
+        return hashlib.sha256(f'nid:{national_id}'.encode('utf-8')).hexdigest()
+    return name_key(first_name, last_name, date_of_birth) or hashlib.sha256(
+        'name:{}|{}|'.format(normalize_name(last_name), normalize_name(first_name)).encode('utf-8')
+    ).hexdigest()
+
+
+def name_key(first_name, last_name, date_of_birth):
+    """
+    Name and date of birth identity, used to spot the same person listed
+    with and without a national ID. None without a date of birth, where a
+    name alone is too weak to match on.
+    """
+    if not date_of_birth:
+        return None
+    identity = 'name:{}|{}|{}'.format(normalize_name(last_name), normalize_name(first_name), date_of_birth.isoformat())
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+
+def normalize_member(record):
+    """
+    Validate one parsed row and return the entry fields, raising RowError
+    for the first problem found.
+    """
+    first_name = clean_text(record.get('first_name'))
+    last_name = clean_text(record.get('last_name'))
+
+    if not first_name and not last_name and record.get('full_name'):
+        # 'Surname, Given names' or 'Given names Surname'
+        full_name = clean_text(record['full_name'])
+        if ',' in full_name:
+            last_name, first_name = [part.strip() for part in full_name.split(',', 1)]
+        elif ' ' in full_name:
+            first_name, last_name = full_name.rsplit(' ', 1)
+
+    if not first_name:
+        raise RowError('firstName', 'First name is required')
+    if not last_name:
+        raise RowError('lastName', 'Last name is required')
+    if len(first_name) > 100 or len(last_name) > 100:
+        raise RowError('name', 'Names are limited to 100 characters')
+
+    values = {'first_name': first_name, 'last_name': last_name}
+    for field, name, parser in [
+        ('member_number', 'memberNumber', lambda v: clean_text(v, 50)),
+        ('national_id', 'nationalId', normalize_national_id),
+        ('date_of_birth', 'dateOfBirth', parse_date),
+        ('join_date', 'joinDate', parse_date),
+    ]:
+        try:
+            values[field] = parser(record.get(field))
+        except ValueError as e:
+            raise RowError(name, f'Invalid {name}: {e}')
+
+    if values['national_id'] and len(values['national_id']) > 50:
+        raise RowError('nationalId', 'National ID is limited to 50 characters')
+    if values['date_of_birth'] and values['date_of_birth'] > date.today():
+        raise RowError('dateOfBirth', 'Date of birth is in the future')
+
+    gender = clean_text(record.get('gender'))
+    values['gender'] = GENDERS.get(gender.lower(), 'other') if gender else None
+
+    values['member_key'] = member_key(
+        values['national_id'], first_name, last_name, values['date_of_birth']
+    )
+    values['name_key'] = name_key(first_name, last_name, values['date_of_birth'])
+    return values
+
+
+def parse_membership_file(path, mime_type, settings):
+    """
+    Worker handler: parse the list at ``path`` into a COPY-ready CSV for
+    membership list ``settings['target_id']``.
+
+    Returns ``{'outputs': {'entries': path}, 'rows', 'imported',
+    'errorCount', 'errors'}``.
+    """
+    list_id = str(uuid.UUID(settings['target_id']))
+    output_path = os.path.join(settings['work_dir'], f'members-{uuid.uuid4().hex}.csv')
+
+    rows = 0
+    imported = 0
+    error_count = 0
+    errors = []
+
+    try:
+        with open(output_path, 'w', encoding='utf-8', newline='') as output:
+            writer = csv.writer(output)
+            for row_number, record in iter_rows(path, mime_type, aliases=MEMBER_COLUMNS):
+                rows += 1
+                try:
+                    values = normalize_member(record)
+                except RowError as e:
+                    error_count += 1
+                    if len(errors) < MAX_IMPORT_ERRORS:
+                        errors.append({'row': row_number, 'field': e.field, 'message': str(e)})
+                    continue
+
+                values['row_number'] = row_number
+                # None is written unquoted and loads as NULL
+                writer.writerow([list_id] + [
+                    value.isoformat() if isinstance(value, date) else value
+                    for value in (values[column] for column in ENTRY_COLUMNS)
+                ])
+                imported += 1
+    except Exception:
+        os.remove(output_path)
+        raise
+
+    return {
+        'outputs': {'entries': output_path},
+        'rows': rows,
+        'imported': imported,
+        'errorCount': error_count,
+        'errors': errors
+    }
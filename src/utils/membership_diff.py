@@ -0,0 +1,161 @@
+from datetime import datetime
+from sqlalchemy import func, case, cast, literal, null, and_, or_
+from sqlalchemy.dialects.postgresql import array
+
+from src.extensions import db
+from src.models.membership import MembershipList, MembershipListEntry, MembershipListChange
+
+# Entry columns compared for 'changed', with the name reported to clients
+COMPARED_FIELDS = [
+    ('member_number', 'memberNumber'),
+    ('first_name', 'firstName'),
+    ('last_name', 'lastName'),
+    ('national_id', 'nationalId'),
+    ('date_of_birth', 'dateOfBirth'),
+    ('gender', 'gender'),
+    ('join_date', 'joinDate'),
+]
+
+# INSERT ... SELECT needs typed NULLs; untyped ones resolve to text
+NULL_ENTRY = cast(null(), db.BigInteger)
+NULL_JSON = cast(null(), db.JSON)
+NULL_TEXT = cast(null(), db.String)
+
+CHANGE_COLUMNS = [
+    'membership_list_id', 'change_type', 'member_key', 'entry_id', 'previous_entry_id',
+    'duplicate_of_id', 'changed_fields', 'match_reason'
+]
+
+
+def previous_membership_list(membership_list):
+    """
+    The list this one is compared against: the organization's latest list
+    submitted on or before it that was imported successfully, or that
+    predates imports (no import status) and only has a declared count.
+    Pending and failed lists have no trustworthy count.
+    """
+    return MembershipList.query.filter(
+        MembershipList.organization_id == membership_list.organization_id,
+        MembershipList.id != membership_list.id,
+        MembershipList.submission_date <= membership_list.submission_date,
+        or_(MembershipList.import_status.is_(None), MembershipList.import_status == 'completed')
+    ).order_by(MembershipList.submission_date.desc(), MembershipList.created_at.desc()).first()
+
+
+def compute_membership_diff(membership_list, previous=None):
+    """
+    Replace the stored changes of ``membership_list`` with a fresh diff
+    against ``previous`` and return the summary. Runs in the caller's
+    transaction.
+
+    Members are matched on ``member_key`` with a full outer join, which
+    PostgreSQL runs as a hash join, so the cost grows linearly with the two
+    lists instead of with their product.
+    """
+    db.session.execute(
+        db.delete(MembershipListChange).where(MembershipListChange.membership_list_id == membership_list.id)
+    )
+
+    if previous is not None:
+        _insert_changes(membership_list.id, previous.id)
+    _insert_duplicates(membership_list.id)
+
+    counts = dict(db.session.query(
+        MembershipListChange.change_type, func.count(MembershipListChange.id)
+    ).filter(MembershipListChange.membership_list_id == membership_list.id).group_by(
+        MembershipListChange.change_type
+    ).all())
+    distinct_members = db.session.query(func.count(func.distinct(MembershipListEntry.member_key))).filter(
+        MembershipListEntry.membership_list_id == membership_list.id
+    ).scalar()
+
+    summary = {
+        'previousListId': str(previous.id) if previous else None,
+        'added': counts.get('added', 0),
+        'removed': counts.get('removed', 0),
+        'changed': counts.get('changed', 0),
+        'unchanged': distinct_members - counts.get('added', 0) - counts.get('changed', 0) if previous else None,
+        'duplicates': counts.get('duplicate', 0),
+        'computedAt': datetime.utcnow().isoformat()
+    }
+    membership_list.diff_summary = summary
+    return summary
+
+
+def _first_entries(list_id):
+    # One row per member; repeats within a list are reported as duplicates
+    return db.select(MembershipListEntry).where(
+        MembershipListEntry.membership_list_id == list_id
+    ).distinct(MembershipListEntry.member_key).order_by(
+        MembershipListEntry.member_key, MembershipListEntry.row_number
+    ).subquery()
+
+
+def _insert_changes(list_id, previous_id):
+    current = _first_entries(list_id)
+    prior = _first_entries(previous_id)
+
+    differences = []
+    for column, name in COMPARED_FIELDS:
+        left, right = current.c[column], prior.c[column]
+        if column in ('first_name', 'last_name'):
+            left, right = func.lower(left), func.lower(right)
+        differences.append((left.is_distinct_from(right), name))
+
+    changed_fields = func.array_to_json(func.array_remove(
+        array([case((condition, name), else_=None) for condition, name in differences]),
+        None
+    ))
+
+    select = db.select(
+        literal(list_id),
+        case((prior.c.id.is_(None), 'added'), (current.c.id.is_(None), 'removed'), else_='changed'),
+        func.coalesce(current.c.member_key, prior.c.member_key),
+        current.c.id,
+        prior.c.id,
+        NULL_ENTRY,
+        case((and_(current.c.id.isnot(None), prior.c.id.isnot(None)), changed_fields), else_=NULL_JSON),
+        NULL_TEXT
+    ).select_from(
+        current.join(prior, current.c.member_key == prior.c.member_key, full=True)
+    ).where(or_(
+        current.c.id.is_(None),
+        prior.c.id.is_(None),
+        *[condition for condition, _ in differences]
+    ))
+
+    db.session.execute(db.insert(MembershipListChange).from_select(CHANGE_COLUMNS, select))
+
+
+def _insert_duplicates(list_id):
+    for key, reason in [('member_key', 'member_key'), ('name_key', 'name_dob')]:
+        column = getattr(MembershipListEntry, key)
+        window = {'partition_by': column, 'order_by': MembershipListEntry.row_number}
+        ranked = db.select(
+            MembershipListEntry.id,
+            MembershipListEntry.member_key,
+            func.row_number().over(**window).label('position'),
+            func.first_value(MembershipListEntry.id).over(**window).label('first_id'),
+            func.first_value(MembershipListEntry.member_key).over(**window).label('first_member_key')
+        ).where(
+            MembershipListEntry.membership_list_id == list_id,
+            column.isnot(None)
+        ).subquery()
+
+        conditions = [ranked.c.position > 1]
+        if key == 'name_key':
+            # Same member_key is already reported above
+            conditions.append(ranked.c.member_key != ranked.c.first_member_key)
+
+        select = db.select(
+            literal(list_id),
+            literal('duplicate'),
+            ranked.c.member_key,
+            ranked.c.id,
+            NULL_ENTRY,
+            ranked.c.first_id,
+            NULL_JSON,
+            literal(reason)
+        ).where(*conditions)
+
+        db.session.execute(db.insert(MembershipListChange).from_select(CHANGE_COLUMNS, select))
@@ -0,0 +1,252 @@
+import re
+import uuid
+from datetime import datetime
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.extensions import db
+from src.models.organization import Organization, OrganizationType
+from src.models.region import Region, District
+from src.utils.tabular import iter_rows
+from src.utils.members import RowError, clean_text, parse_date
+
+# Canonical field -> other header names seen in registry exports
+ORGANIZATION_COLUMNS = {
+    'registration_number': ['registration no', 'reg no', 'reg number', 'registration'],
+    'organization_name': ['name', 'organisation name', 'organization', 'organisation'],
+    'organization_type': ['type', 'organisation type', 'organization type id'],
+    'registration_date': ['date registered', 'registered on'],
+    'expiry_date': ['expiry', 'expires', 'expires on', 'valid until'],
+    'status': [],
+    'address': ['physical address', 'postal address'],
+    'region': ['province'],
+    'district': ['district id'],
+    'contact_person': ['contact', 'contact name'],
+    'contact_email': ['email', 'e-mail'],
+    'contact_phone': ['phone', 'telephone', 'contact number'],
+    'website': ['web', 'url'],
+    'membership_count': ['members', 'member count', 'membership'],
+    'is_compliant': ['compliant'],
+}
+
+# A new organization cannot be created without these
+REQUIRED_COLUMNS = ['registration_number', 'organization_name', 'organization_type', 'registration_date', 'status']
+
+ORGANIZATION_STATUSES = ['active', 'suspended', 'deregistered']
+
+BOOLEANS = {'true': True, 'yes': True, 'y': True, '1': True, 'false': False, 'no': False, 'n': False, '0': False}
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Row errors returned in the report; the count is always exact
+MAX_IMPORT_ERRORS = 1000
+
+
+class OrganizationLookups:
+    """
+    Organization types and districts, loaded once per import so rows are
+    resolved from memory instead of with a query each.
+    """
+
+    def __init__(self):
+        self.types_by_id = {}
+        self.types_by_name = {}
+        for organization_type in OrganizationType.query.all():
+            self.types_by_id[organization_type.id] = organization_type.id
+            self.types_by_name[organization_type.type_name.strip().lower()] = organization_type.id
+
+        self.district_ids = set()
+        self.districts_by_name = {}
+        rows = db.session.query(District.id, District.district_name, Region.region_name).join(
+            Region, District.region_id == Region.id
+        )
+        for district_id, district_name, region_name in rows:
+            self.district_ids.add(district_id)
+            self.districts_by_name.setdefault(district_name.strip().lower(), {})[region_name.strip().lower()] = district_id
+
+    def organization_type(self, value):
+        text = clean_text(value)
+        if not text:
+            raise RowError('organizationType', 'Organization type is required')
+        if text.isdigit() and int(text) in self.types_by_id:
+            return int(text)
+        if text.lower() in self.types_by_name:
+            return self.types_by_name[text.lower()]
+        raise RowError('organizationType', f'Unknown organization type {text!r}')
+
+    def district(self, value, region=None):
+        text = clean_text(value)
+        if not text:
+            return None
+        if text.isdigit() and int(text) in self.district_ids:
+            return int(text)
+
+        by_region = self.districts_by_name.get(text.lower())
+        if not by_region:
+            raise RowError('district', f'Unknown district {text!r}')
+        region = clean_text(region)
+        if region:
+            if region.lower() not in by_region:
+                raise RowError('district', f'District {text!r} is not in region {region!r}')
+            return by_region[region.lower()]
+        if len(by_region) > 1:
+            raise RowError('district', f'District {text!r} exists in several regions; add a region column')
+        return next(iter(by_region.values()))
+
+
+def normalize_organization(record, lookups):
+    """
+    Validate one parsed row into Organization column values, raising
+    RowError for the first problem found.
+    """
+    values = {}
+
+    for field, name, limit in [
+        ('registration_number', 'registrationNumber', 50),
+        ('organization_name', 'organizationName', 255),
+        ('address', 'address', None),
+        ('contact_person', 'contactPerson', 100),
+        ('contact_email', 'contactEmail', 100),
+        ('contact_phone', 'contactPhone', 20),
+        ('website', 'website', 255),
+    ]:
+        if field not in record:
+            continue
+        try:
+            values[field] = clean_text(record[field], limit)
+        except ValueError as e:
+            raise RowError(name, f'Invalid {name}: {e}')
+
+    if not values.get('registration_number'):
+        raise RowError('registrationNumber', 'Registration number is required')
+    if not values.get('organization_name'):
+        raise RowError('organizationName', 'Organization name is required')
+    if values.get('contact_email') and not EMAIL_PATTERN.match(values['contact_email']):
+        raise RowError('contactEmail', 'Invalid contactEmail')
+
+    values['organization_type_id'] = lookups.organization_type(record.get('organization_type'))
+
+    for field, name in [('registration_date', 'registrationDate'), ('expiry_date', 'expiryDate')]:
+        if field not in record:
+            continue
+        try:
+            values[field] = parse_date(record[field])
+        except ValueError as e:
+            raise RowError(name, f'Invalid {name}: {e}')
+    if not values.get('registration_date'):
+        raise RowError('registrationDate', 'Registration date is required')
+    if values.get('expiry_date') and values['expiry_date'] < values['registration_date']:
+        raise RowError('expiryDate', 'Expiry date is before the registration date')
+
+    status = (clean_text(record.get('status')) or '').lower()
+    if status not in ORGANIZATION_STATUSES:
+        raise RowError('status', f'status must be one of: {", ".join(ORGANIZATION_STATUSES)}')
+    values['status'] = status
+
+    if 'district' in record:
+        values['district_id'] = lookups.district(record['district'], record.get('region'))
+
+    if 'membership_count' in record:
+        count = clean_text(record['membership_count'])
+        if count is None:
+            values['membership_count'] = None
+        elif count.isdigit():
+            values['membership_count'] = int(count)
+        else:
+            raise RowError('membershipCount', 'membershipCount must be a whole number')
+
+    if 'is_compliant' in record:
+        compliant = record['is_compliant']
+        if isinstance(compliant, bool):
+            values['is_compliant'] = compliant
+        else:
+            # Blank means the model default, compliant
+            text = (clean_text(compliant) or 'yes').lower()
+            if text not in BOOLEANS:
+                raise RowError('isCompliant', 'isCompliant must be yes or no')
+            values['is_compliant'] = BOOLEANS[text]
+
+    return values
+
+
+def import_organizations(path, mime_type=None, dry_run=False, chunk_size=1000, log=None):
+    """
+    Create or update organizations from a CSV/XLSX registry file, keyed by
+    registration number.
+
+    Rows are streamed and upserted with INSERT ... ON CONFLICT in one
+    transaction per ``chunk_size`` rows; invalid rows are skipped and
+    reported. Columns missing from the file are left untouched on existing
+    organizations. With ``dry_run`` nothing is written and the report says
+    what would have been created or updated.
+    """
+    # PostgreSQL allows 65535 parameters per statement, about 15 per row here
+    chunk_size = max(1, min(chunk_size, 2000))
+    lookups = OrganizationLookups()
+    report = {'rows': 0, 'created': 0, 'updated': 0, 'errorCount': 0, 'errors': [], 'dryRun': dry_run}
+    seen = set()
+    chunk = []
+    columns = None
+
+    def add_error(row_number, error):
+        report['errorCount'] += 1
+        if len(report['errors']) < MAX_IMPORT_ERRORS:
+            report['errors'].append({'row': row_number, 'field': error.field, 'message': str(error)})
+
+    for row_number, record in iter_rows(path, mime_type, aliases=ORGANIZATION_COLUMNS, required=REQUIRED_COLUMNS):
+        report['rows'] += 1
+        try:
+            values = normalize_organization(record, lookups)
+        except RowError as e:
+            add_error(row_number, e)
+            continue
+
+        # ON CONFLICT cannot touch the same row twice in one statement
+        if values['registration_number'] in seen:
+            add_error(row_number, RowError('registrationNumber', 'Registration number appears earlier in the file'))
+            continue
+        seen.add(values['registration_number'])
+
+        if columns is None:
+            columns = [column for column in values if column != 'registration_number']
+        chunk.append(values)
+
+        if len(chunk) >= chunk_size:
+            _flush(chunk, columns, dry_run, report)
+            chunk = []
+            if log:
+                log(f'{report["rows"]} rows processed')
+
+    if chunk:
+        _flush(chunk, columns, dry_run, report)
+
+    return report
+
+
+def _flush(chunk, columns, dry_run, report):
+    if dry_run:
+        existing = {
+            number for (number,) in db.session.query(Organization.registration_number).filter(
+                Organization.registration_number.in_([values['registration_number'] for values in chunk])
+            )
+        }
+        report['updated'] += len(existing)
+        report['created'] += len(chunk) - len(existing)
+        db.session.rollback()
+        return
+
+    now = datetime.utcnow()
+    # Rows share the file's header, so every row has the same keys
+    rows = [dict(values, id=uuid.uuid4(), created_at=now, updated_at=now) for values in chunk]
+
+    statement = pg_insert(Organization).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=['registration_number'],
+        set_=dict({column: statement.excluded[column] for column in columns}, updated_at=now)
+    ).returning(literal_column('(xmax = 0)'))
+
+    inserted = [row[0] for row in db.session.execute(statement)]
+    db.session.commit()
+
+    report['created'] += sum(1 for value in inserted if value)
+    report['updated'] += sum(1 for value in inserted if not value)
@@ -0,0 +1,77 @@
+"""
+Thumbnail and preview rendering that runs inside worker processes.
+
+Like extraction, these functions work on local files only and return plain
+data, so they can run in a spawned process.
+"""
+import os
+import uuid
+
+from src.utils.extraction import UnsupportedContent
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    from pdf2image import convert_from_path
+except ImportError:
+    convert_from_path = None
+
+THUMBNAIL_SIZE = (256, 256)
+PREVIEW_WIDTH = 1024
+
+# kind -> (file extension, MIME type)
+DERIVATIVE_FORMATS = {
+    'thumbnail': ('png', 'image/png'),
+    'preview': ('jpg', 'image/jpeg'),
+}
+
+
+def is_previewable(mime_type):
+    return bool(mime_type) and (mime_type == 'application/pdf' or mime_type.startswith('image/'))
+
+
+def render_previews(path, mime_type, settings):
+    """
+    Render the first page of a PDF or image as a PNG thumbnail and a JPEG
+    preview in ``settings['work_dir']``.
+
+    Returns ``{'outputs': {kind: path}, 'width', 'height'}``.
+    """
+    if Image is None:
+        raise UnsupportedContent('Pillow is not installed')
+
+    if mime_type == 'application/pdf':
+        if convert_from_path is None:
+            raise UnsupportedContent('pdf2image is not installed')
+        pages = convert_from_path(path, first_page=1, last_page=1, size=(PREVIEW_WIDTH, None))
+        if not pages:
+            raise UnsupportedContent('PDF has no pages')
+        page = pages[0]
+    elif mime_type and mime_type.startswith('image/'):
+        with Image.open(path) as image:
+            # First frame only for multi-page TIFFs and animated GIFs
+            image.seek(0)
+            page = image.convert('RGB')
+        page.thumbnail((PREVIEW_WIDTH, PREVIEW_WIDTH * 4))
+    else:
+        raise UnsupportedContent(f'No previews for {mime_type}')
+
+    page = page.convert('RGB')
+    stem = os.path.join(settings['work_dir'], uuid.uuid4().hex)
+
+    preview_path = f'{stem}.preview.jpg'
+    page.save(preview_path, 'JPEG', quality=80, optimize=True, progressive=True)
+
+    thumbnail = page.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE)
+    thumbnail_path = f'{stem}.thumbnail.png'
+    thumbnail.save(thumbnail_path, 'PNG', optimize=True)
+
+    return {
+        'outputs': {'thumbnail': thumbnail_path, 'preview': preview_path},
+        'width': page.width,
+        'height': page.height
+    }
@@ -0,0 +1,71 @@
+from sqlalchemy import text
+
+from src.extensions import db
+
+# Columns and indexes added to tables that existed before, which
+# db.create_all() leaves alone. Every statement is safe to run again.
+COLUMN_UPGRADES = [
+    "ALTER TABLE ballot_elections ADD COLUMN IF NOT EXISTS certified_at TIMESTAMP WITHOUT TIME ZONE",
+    "ALTER TABLE organization_constitutions ADD COLUMN IF NOT EXISTS ocr_content TEXT",
+    "ALTER TABLE documents ALTER COLUMN file_size TYPE BIGINT",
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS mime_type VARCHAR(100)",
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS sha256 VARCHAR(64)",
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_text TEXT",
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(document_number, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(document_name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', left(coalesce(content_text, ''), 500000)), 'C')"
+    ") STORED",
+    "CREATE INDEX IF NOT EXISTS ix_documents_sha256 ON documents (sha256)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_search_vector ON documents USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_union_elections_organization_id ON union_elections (organization_id)",
+    "CREATE INDEX IF NOT EXISTS ix_union_elections_election_date ON union_elections (election_date)",
+    "CREATE INDEX IF NOT EXISTS ix_election_nominees_election_id ON election_nominees (election_id)",
+]
+
+# Result rows saved twice for the same candidate; the last write is the
+# one the old update-in-place endpoint would have kept
+DEDUPE_BALLOT_RESULTS = """
+    DELETE FROM ballot_results
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY election_id, position_id, candidate_id
+                ORDER BY updated_at DESC NULLS LAST, created_at DESC NULLS LAST, id
+            ) AS position
+            FROM ballot_results
+        ) ranked
+        WHERE position > 1
+    )
+"""
+
+BALLOT_RESULTS_CONSTRAINT = 'uq_ballot_results_election_position_candidate'
+
+
+def upgrade_schema(log=print):
+    """
+    Bring an existing database up to the current models: add the columns and
+    indexes create_all() skips on existing tables, and remove duplicate ballot
+    results so their unique constraint, which the tally upserts rely on, can
+    be added. Runs in a single transaction.
+    """
+    for statement in COLUMN_UPGRADES:
+        db.session.execute(text(statement))
+
+    exists = db.session.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+        {'name': BALLOT_RESULTS_CONSTRAINT}
+    ).first()
+    removed = 0
+    if not exists:
+        db.session.execute(text("LOCK TABLE ballot_results IN SHARE ROW EXCLUSIVE MODE"))
+        removed = db.session.execute(text(DEDUPE_BALLOT_RESULTS)).rowcount
+        db.session.execute(text(
+            f"ALTER TABLE ballot_results ADD CONSTRAINT {BALLOT_RESULTS_CONSTRAINT} "
+            "UNIQUE (election_id, position_id, candidate_id)"
+        ))
+    db.session.commit()
+
+    log(f'Schema upgraded; removed {removed} duplicate ballot results')
+    return removed
@@ -0,0 +1,180 @@
+import os
+import uuid
+import hashlib
+import mimetypes
+from flask import current_app
+from werkzeug.formparser import FormDataParser
+from werkzeug.utils import secure_filename
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes of the formats we expect from district offices
+MAGIC_NUMBERS = [
+    (b'%PDF', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),
+]
+
+
+def upload_root():
+    return current_app.config['UPLOAD_FOLDER']
+
+
+def upload_path(*parts):
+    path = os.path.join(upload_root(), *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def sniff_mime_type(head, filename=None):
+    guessed = mimetypes.guess_type(filename)[0] if filename else None
+
+    for magic, mime_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            # Office formats are containers; the extension tells which one
+            if mime_type in ('application/zip', 'application/x-ole-storage') and guessed:
+                return guessed
+            return mime_type
+
+    return guessed or 'application/octet-stream'
+
+
+class HashingFileWriter:
+    """
+    File-like sink that streams an upload to disk while computing its size,
+    SHA-256 digest and MIME type, so the body is never held in memory.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.size = 0
+        self.path = upload_path('tmp', uuid.uuid4().hex)
+        self._hash = hashlib.sha256()
+        self._head = b''
+        self._file = open(self.path, 'wb')
+
+    def write(self, data):
+        if len(self._head) < 16:
+            self._head += data[:16 - len(self._head)]
+        self._hash.update(data)
+        self.size += len(data)
+        self._file.write(data)
+        return len(data)
+
+    # Werkzeug rewinds the container once a part is complete
+    def seek(self, offset, whence=0):
+        self._file.flush()
+        return self.size
+
+    def tell(self):
+        return self.size
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    @classmethod
+    def adopt(cls, path, filename, size, sha256):
+        # Wrap a file that was assembled elsewhere (e.g. a resumable upload)
+        writer = cls.__new__(cls)
+        writer.filename = filename
+        writer.size = size
+        writer.path = path
+        writer._hash = None
+        writer._digest = sha256
+        with open(path, 'rb') as f:
+            writer._head = f.read(16)
+        writer._file = f
+        return writer
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest() if self._hash is not None else self._digest
+
+    @property
+    def mime_type(self):
+        return sniff_mime_type(self._head, self.filename)
+
+    def save_as(self, *parts):
+        self.close()
+        destination = upload_path(*parts)
+        os.replace(self.path, destination)
+        self.path = destination
+        return destination
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def receive_upload(request, field='file'):
+    """
+    Stream the file in ``field`` of a multipart request, or the raw request
+    body for any other content type, through a HashingFileWriter.
+
+    Returns ``(writer, form)``; ``writer`` is None when no file was sent.
+    """
+    if request.mimetype == 'multipart/form-data':
+        writers = []
+
+        def stream_factory(total_content_length, content_type, filename, content_length=None):
+            writer = HashingFileWriter(filename)
+            writers.append(writer)
+            return writer
+
+        parser = FormDataParser(
+            stream_factory=stream_factory,
+            max_content_length=current_app.config.get('MAX_CONTENT_LENGTH')
+        )
+        try:
+            _, form, files = parser.parse(request.stream, request.mimetype, request.content_length, request.mimetype_params)
+        except Exception:
+            for writer in writers:
+                writer.discard()
+            raise
+
+        upload = files.get(field)
+        writer = upload.stream if upload and upload.filename else None
+        for other in writers:
+            if other is not writer:
+                other.discard()
+        if writer:
+            writer.close()
+        return writer, form
+
+    filename = request.headers.get('X-File-Name') or request.args.get('fileName')
+    writer = HashingFileWriter(filename)
+    try:
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+    except Exception:
+        writer.discard()
+        raise
+    writer.close()
+
+    if writer.size == 0:
+        writer.discard()
+        return None, request.args
+    return writer, request.args
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stored_filename(filename, default='upload'):
+    return secure_filename(filename or '') or default
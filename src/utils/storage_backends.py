@@ -0,0 +1,205 @@
+import os
+import shutil
+from datetime import datetime
+from flask import current_app
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # only needed for STORAGE_BACKEND=s3
+    boto3 = None
+
+
+class LocalStorage:
+    """
+    Objects stored as files under a root directory. Keys are relative paths.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def local_path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def exists(self, key):
+        return os.path.isfile(self.local_path(key))
+
+    def size(self, key):
+        return os.path.getsize(self.local_path(key))
+
+    def put_file(self, source_path, key, content_type=None):
+        # Moves the file; a rename within the same volume copies nothing
+        destination = self.local_path(key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(source_path, destination)
+
+    def open(self, key, start=None, end=None):
+        f = open(self.local_path(key), 'rb')
+        if start:
+            f.seek(start)
+        if end is None:
+            return f
+        return _LimitedReader(f, end - (start or 0) + 1)
+
+    def download_file(self, key, destination_path):
+        shutil.copyfile(self.local_path(key), destination_path)
+
+    def delete(self, key):
+        path = self.local_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def presigned_url(self, key, expires_in=None, download_name=None, mime_type=None):
+        return None
+
+    def iter_keys(self, prefix):
+        """
+        Yield ``(key, last_modified)`` for every object under ``prefix``.
+        """
+        base = self.local_path(prefix)
+        for directory, _, filenames in os.walk(base):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                yield key, datetime.utcfromtimestamp(os.path.getmtime(path))
+
+
+class S3Storage:
+    """
+    Objects stored in an S3-compatible bucket (AWS, MinIO, Ceph RGW).
+
+    Large files are sent as parallel multipart uploads, reads are streamed
+    from the response body, and downloads can be redirected to presigned URLs.
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, access_key=None, secret_key=None,
+                 multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024, max_concurrency=8,
+                 presign_expires=300):
+        if boto3 is None:
+            raise RuntimeError('boto3 is required for the s3 storage backend')
+
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.presign_expires = presign_expires
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            # Path-style addressing works with local stand-ins that have no
+            # wildcard DNS for bucket subdomains
+            config=BotoConfig(s3={'addressing_style': 'path' if endpoint_url else 'auto'})
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency,
+            use_threads=True
+        )
+
+    def _key(self, key):
+        return f'{self.prefix}/{key}' if self.prefix else key
+
+    def local_path(self, key):
+        return None
+
+    def _head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def size(self, key):
+        head = self._head(key)
+        return head['ContentLength'] if head else None
+
+    def put_file(self, source_path, key, content_type=None):
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_file(
+            source_path, self.bucket, self._key(key),
+            ExtraArgs=extra_args, Config=self.transfer_config
+        )
+        os.remove(source_path)
+
+    def open(self, key, start=None, end=None):
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if start is not None or end is not None:
+            params['Range'] = f'bytes={start or 0}-{"" if end is None else end}'
+        return self.client.get_object(**params)['Body']
+
+    def download_file(self, key, destination_path):
+        self.client.download_file(self.bucket, self._key(key), destination_path, Config=self.transfer_config)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def presigned_url(self, key, expires_in=None, download_name=None, mime_type=None):
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if download_name:
+            params['ResponseContentDisposition'] = 'attachment; filename="{}"'.format(download_name.replace('"', ''))
+        if mime_type:
+            params['ResponseContentType'] = mime_type
+        return self.client.generate_presigned_url(
+            'get_object', Params=params, ExpiresIn=expires_in or self.presign_expires
+        )
+
+    def iter_keys(self, prefix):
+        paginator = self.client.get_paginator('list_objects_v2')
+        full_prefix = self._key(prefix)
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=full_prefix):
+            for item in page.get('Contents', []):
+                # Naive UTC, like the timestamps stored in the database
+                yield item['Key'][strip:], item['LastModified'].replace(tzinfo=None)
+
+
+class _LimitedReader:
+    def __init__(self, f, remaining):
+        self._file = f
+        self._remaining = remaining
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def get_storage():
+    """
+    Return the configured storage backend, created once per application.
+    """
+    storage = current_app.extensions.get('storage')
+    if storage is None:
+        config = current_app.config
+        if config.get('STORAGE_BACKEND', 'local') == 's3':
+            storage = S3Storage(
+                bucket=config['S3_BUCKET'],
+                prefix=config.get('S3_PREFIX', ''),
+                endpoint_url=config.get('S3_ENDPOINT_URL'),
+                region=config.get('S3_REGION'),
+                access_key=config.get('S3_ACCESS_KEY_ID'),
+                secret_key=config.get('S3_SECRET_ACCESS_KEY'),
+                multipart_threshold=config.get('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024),
+                multipart_chunksize=config.get('S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024),
+                max_concurrency=config.get('S3_MAX_CONCURRENCY', 8),
+                presign_expires=config.get('S3_PRESIGN_EXPIRES', 300)
+            )
+        else:
+            storage = LocalStorage(config['UPLOAD_FOLDER'])
+        current_app.extensions['storage'] = storage
+    return storage
@@ -0,0 +1,127 @@
+"""
+Streaming readers for uploaded spreadsheets.
+
+Rows are yielded one at a time as ``(row_number, {column: value})`` with
+normalized header names, so a file of any length is read in constant memory.
+Nothing here touches the database, so the readers also run in worker
+processes.
+"""
+import csv
+import io
+import re
+
+from src.utils.extraction import UnsupportedContent
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+XLSX_MIME_TYPES = [
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'application/zip',
+]
+
+
+def normalize_header(name):
+    """
+    'First Name', 'first-name' and 'FIRST_NAME ' all become 'first_name'.
+    """
+    return re.sub(r'[^a-z0-9]+', '_', str(name or '').strip().lower()).strip('_')
+
+
+def resolve_columns(headers, aliases):
+    """
+    Map each normalized header to its canonical field using ``aliases``
+    (``{field: [accepted header names]}``); unknown headers are dropped.
+    """
+    lookup = {}
+    for field, names in aliases.items():
+        for name in [field] + list(names):
+            lookup[normalize_header(name)] = field
+
+    return {index: lookup[normalize_header(header)] for index, header in enumerate(headers)
+            if normalize_header(header) in lookup}
+
+
+def iter_rows(path, mime_type=None, aliases=None, required=None):
+    """
+    Yield ``(row_number, record)`` for each non-empty data row, where
+    ``row_number`` is the 1-based line or sheet row as the submitter sees it.
+
+    With ``aliases`` the record is keyed by canonical field names, otherwise
+    by normalized headers. Raises UnsupportedContent when a ``required``
+    column is missing from the header row.
+    """
+    if _is_xlsx(path, mime_type):
+        rows = _xlsx_rows(path)
+    else:
+        rows = _csv_rows(path)
+
+    headers = None
+    columns = None
+    for row_number, values in rows:
+        if headers is None:
+            headers = values
+            columns = resolve_columns(headers, aliases) if aliases else {
+                index: normalize_header(header) for index, header in enumerate(headers) if normalize_header(header)
+            }
+            missing = [field for field in (required or []) if field not in columns.values()]
+            if missing:
+                raise UnsupportedContent(f'Missing required columns: {", ".join(missing)}')
+            continue
+
+        if all(value is None or (isinstance(value, str) and not value.strip()) for value in values):
+            continue
+
+        yield row_number, {
+            field: values[index] if index < len(values) else None for index, field in columns.items()
+        }
+
+    if headers is None:
+        raise UnsupportedContent('The file has no header row')
+
+
+def _is_xlsx(path, mime_type):
+    if mime_type in XLSX_MIME_TYPES or str(path).lower().endswith('.xlsx'):
+        return True
+    # Uploads are stored without an extension; XLSX is a ZIP container
+    with open(path, 'rb') as f:
+        return f.read(4) == b'PK\x03\x04'
+
+
+def _csv_rows(path):
+    with open(path, 'rb') as raw:
+        sample = raw.read(64 * 1024)
+    encoding = 'utf-8-sig'
+    try:
+        sample.decode(encoding)
+    except UnicodeDecodeError as e:
+        # A character cut at the end of the sample is not a decoding error;
+        # anything else is most likely a cp1252 export from Windows Excel
+        if e.start < len(sample) - 3:
+            encoding = 'cp1252'
+
+    try:
+        dialect = csv.Sniffer().sniff(sample.decode(encoding, errors='replace'), delimiters=',;\t|')
+    except csv.Error:
+        dialect = csv.excel
+
+    with io.open(path, 'r', encoding=encoding, errors='replace', newline='') as f:
+        reader = csv.reader(f, dialect)
+        for values in reader:
+            yield reader.line_num, values
+
+
+def _xlsx_rows(path):
+    if load_workbook is None:
+        raise UnsupportedContent('openpyxl is required to read XLSX files')
+
+    # read_only streams the sheet XML instead of building the whole workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        for row_number, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+            yield row_number, list(values)
+    finally:
+        workbook.close()
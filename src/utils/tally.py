@@ -0,0 +1,199 @@
+from datetime import datetime
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from src.extensions import db
+from src.models.ballot import BallotPosition, BallotCandidate, BallotResult, BallotStationReturn
+from src.utils.cache import response_cache
+
+TALLY_CACHE = 'ballot_tally'
+
+
+def get_election_tally(election_id):
+    """
+    Return the tally summary for an election.
+
+    The cached summary is only served while its database version still
+    matches, so every worker sees the latest committed returns. Reading
+    never writes; winners are persisted by refresh_election_tally.
+    """
+    version = tally_version(election_id)
+    cached = response_cache.get(TALLY_CACHE, str(election_id))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    summary = _build_summary(election_id, _compute_positions(election_id))
+    response_cache.set(TALLY_CACHE, str(election_id), (version, summary), ttl=3600)
+    return summary
+
+
+def refresh_election_tally(election_id, position_ids=None):
+    """
+    Recompute winners for the given positions (all when None) and persist
+    is_elected after their votes changed.
+
+    Runs in the caller's transaction, which must hold the election row lock
+    and commit: winners are then ranked from, and written with, the votes
+    they reflect, and concurrent writers cannot apply them out of order.
+    """
+    db.session.flush()
+    positions = _compute_positions(election_id, position_ids)
+    _persist_winners(election_id, positions, position_ids)
+
+
+def discard_election_tally(election_id):
+    response_cache.delete(TALLY_CACHE, str(election_id))
+
+
+def results_digest(election_id):
+    """
+    Scalar subquery hashing every result's votes and winner flag, so it
+    changes with the tally whatever the row timestamps say.
+    """
+    state = func.concat(BallotResult.id, ':', BallotResult.votes_received, ':', BallotResult.is_elected)
+    return select(
+        func.md5(func.string_agg(state, aggregate_order_by(literal(','), BallotResult.id)))
+    ).where(BallotResult.election_id == election_id).scalar_subquery()
+
+
+def tally_version(election_id):
+    """
+    Database version of everything a tally summary is built from, read in
+    one round trip.
+    """
+    position_ids = select(BallotPosition.id).where(BallotPosition.election_id == election_id)
+    returns = BallotStationReturn.election_id == election_id
+    positions = BallotPosition.election_id == election_id
+    candidates = BallotCandidate.position_id.in_(position_ids)
+
+    return tuple(db.session.query(
+        results_digest(election_id),
+        select(func.count(BallotStationReturn.id)).where(returns).scalar_subquery(),
+        select(func.max(BallotStationReturn.updated_at)).where(returns).scalar_subquery(),
+        select(func.count(BallotPosition.id)).where(positions).scalar_subquery(),
+        select(func.max(BallotPosition.updated_at)).where(positions).scalar_subquery(),
+        select(func.count(BallotCandidate.id)).where(candidates).scalar_subquery(),
+        select(func.max(BallotCandidate.updated_at)).where(candidates).scalar_subquery()
+    ).one())
+
+
+def _compute_positions(election_id, position_ids=None):
+    votes = func.coalesce(BallotResult.votes_received, 0)
+    partition = BallotPosition.id
+
+    # One pass over the results: window functions rank candidates and total
+    # votes per position without a second grouped query
+    query = db.session.query(
+        BallotPosition.id.label('position_id'),
+        BallotPosition.position_name,
+        BallotResult.id.label('result_id'),
+        BallotResult.candidate_id,
+        BallotCandidate.first_name,
+        BallotCandidate.last_name,
+        votes.label('votes'),
+        func.rank().over(partition_by=partition, order_by=votes.desc()).label('rank'),
+        func.sum(votes).over(partition_by=partition).label('position_total')
+    ).outerjoin(
+        BallotResult,
+        (BallotResult.position_id == BallotPosition.id) & (BallotResult.election_id == BallotPosition.election_id)
+    ).outerjoin(
+        BallotCandidate, BallotCandidate.id == BallotResult.candidate_id
+    ).filter(
+        BallotPosition.election_id == election_id
+    )
+
+    if position_ids:
+        query = query.filter(BallotPosition.id.in_(list(position_ids)))
+
+    positions = {}
+    for row in query.order_by(BallotPosition.position_name, votes.desc()).all():
+        position = positions.setdefault(str(row.position_id), {
+            'positionId': str(row.position_id),
+            'positionName': row.position_name,
+            'totalVotes': int(row.position_total or 0),
+            'candidates': []
+        })
+        if row.result_id is None:
+            continue
+        position['candidates'].append({
+            'resultId': str(row.result_id),
+            'candidateId': str(row.candidate_id),
+            'name': f'{row.first_name} {row.last_name}',
+            'votes': int(row.votes),
+            'share': round(row.votes * 100.0 / row.position_total, 2) if row.position_total else 0.0,
+            'rank': int(row.rank),
+            'isElected': False
+        })
+
+    for position in positions.values():
+        candidates = position['candidates']
+        leaders = [c for c in candidates if c['rank'] == 1]
+        runner_up = next((c for c in candidates if c['rank'] > 1), None)
+
+        if not candidates or position['totalVotes'] == 0:
+            position.update(status='no_votes', winnerCandidateId=None, margin=None, marginPercentage=None)
+        elif len(leaders) > 1:
+            position.update(status='tie', winnerCandidateId=None, margin=0, marginPercentage=0.0)
+        else:
+            winner = leaders[0]
+            winner['isElected'] = True
+            margin = winner['votes'] - (runner_up['votes'] if runner_up else 0)
+            position.update(
+                status='decided',
+                winnerCandidateId=winner['candidateId'],
+                margin=margin,
+                marginPercentage=round(margin * 100.0 / position['totalVotes'], 2)
+            )
+
+    return positions
+
+
+def _persist_winners(election_id, positions, position_ids=None):
+    winner_ids = [
+        candidate['resultId']
+        for position in positions.values()
+        for candidate in position['candidates']
+        if candidate['isElected']
+    ]
+
+    # Single UPDATE flips is_elected for the results of the affected positions
+    # whose flag actually changes, bumping updated_at like an ORM write would
+    elected = BallotResult.id.in_(winner_ids)
+    statement = update(BallotResult).where(
+        BallotResult.election_id == election_id,
+        BallotResult.is_elected.is_distinct_from(elected)
+    ).values(
+        is_elected=elected,
+        updated_at=datetime.utcnow()
+    ).execution_options(synchronize_session=False)
+
+    if position_ids:
+        statement = statement.where(BallotResult.position_id.in_(list(position_ids)))
+
+    db.session.execute(statement)
+
+
+def _build_summary(election_id, positions_by_id):
+    stations = db.session.query(
+        func.count(BallotStationReturn.id),
+        func.sum(BallotStationReturn.ballots_cast),
+        func.sum(BallotStationReturn.registered_voters)
+    ).filter(BallotStationReturn.election_id == election_id).one()
+
+    stations_reported, ballots_cast, registered_voters = stations
+    positions = sorted(positions_by_id.values(), key=lambda p: p['positionName'])
+
+    return {
+        'electionId': str(election_id),
+        'turnout': {
+            'stationsReported': stations_reported,
+            'ballotsCast': int(ballots_cast) if ballots_cast is not None else None,
+            'registeredVoters': int(registered_voters) if registered_voters is not None else None,
+            'turnoutPercentage': round(ballots_cast * 100.0 / registered_voters, 2) if ballots_cast and registered_voters else None
+        },
+        'totalVotes': sum(p['totalVotes'] for p in positions),
+        'decidedPositions': sum(1 for p in positions if p['status'] == 'decided'),
+        'tiedPositions': sum(1 for p in positions if p['status'] == 'tie'),
+        'positions': positions,
+        'computedAt': datetime.utcnow().isoformat()
+    }
@@ -0,0 +1,73 @@
+import time
+import zipfile
+
+# Formats that are already compressed gain nothing from deflate
+STORED_MIME_PREFIXES = ('image/', 'video/', 'audio/', 'application/pdf', 'application/zip',
+                        'application/vnd.openxmlformats-officedocument')
+
+
+class _ZipSink:
+    """
+    Write-only, unseekable target for ZipFile. Without seek() zipfile writes
+    data descriptors after each member, so nothing is ever rewritten and the
+    bytes can be handed to the client as soon as they are produced.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def should_compress(mime_type):
+    return not (mime_type and mime_type.startswith(STORED_MIME_PREFIXES))
+
+
+def stream_zip(entries, chunk_size=1024 * 1024):
+    """
+    Yield a ZIP archive piece by piece.
+
+    ``entries`` yields ``(arcname, open_source, size, compress)``, where
+    ``open_source()`` returns a readable file-like object and ``size`` may be
+    None when unknown. Memory use is bounded by ``chunk_size``.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode='w', allowZip64=True) as archive:
+        for arcname, open_source, size, compress in entries:
+            info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            if size is not None:
+                info.file_size = size
+
+            source = open_source()
+            try:
+                with archive.open(info, mode='w', force_zip64=size is None) as member:
+                    for chunk in iter(lambda: source.read(chunk_size), b''):
+                        member.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            finally:
+                source.close()
+
+            data = sink.drain()
+            if data:
+                yield data
+
+    # Central directory, written on close
+    yield sink.drain()